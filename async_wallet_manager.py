@@ -0,0 +1,203 @@
+import asyncio
+
+from dotenv import load_dotenv
+from solana.publickey import PublicKey
+from solana.system_program import TransferParams, transfer
+from solana.transaction import Transaction
+from spl.token.constants import TOKEN_PROGRAM_ID
+from spl.token.instructions import TransferCheckedParams, transfer_checked
+
+from instrumentation import log
+from compute_budget import ComputeBudget
+from keystore import KEYSTORE_FILE, open_key_source
+from key_registry import get_associated_token_address, get_registry
+from mint_cache import MINT_CACHE_FILE, MintCache
+from rpc_batch import AsyncBatchRpc
+from rpc_codec import TokenAmount
+from transport import PUMPAPI_URL, RPC_URL, make_async_client, make_async_http
+from tx_pipeline import BlockhashRefresher
+
+DEFAULT_CONCURRENCY = 4
+
+
+class AsyncWalletManager:
+    """Non-blocking WalletManager; fleet-wide operations fan out under a semaphore and report per wallet."""
+
+    def __init__(self, env_file='wallet_keys.env', concurrency=DEFAULT_CONCURRENCY, http=None, keystore_path=KEYSTORE_FILE,
+                 mint_cache_path=MINT_CACHE_FILE):
+        load_dotenv(env_file)
+        self.registry = get_registry()
+        self.key_source = open_key_source(env_file, keystore_path)
+        self.keys = self.key_source.private_keys()
+        self.public_keys = self.key_source.public_keys()
+        self.concurrency = concurrency
+        self.rpc_url = RPC_URL
+        self.http = http or make_async_http()
+        self.client = make_async_client(self.rpc_url, self.http)
+        self.mint_cache = MintCache(mint_cache_path)
+        self.batch_rpc = AsyncBatchRpc(self.rpc_url, self.http, mint_cache=self.mint_cache)
+        self.blockhashes = BlockhashRefresher(self.rpc_url)
+        self.compute_budget = ComputeBudget(self.rpc_url, self.blockhashes.transport)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        self.blockhashes.stop()
+        self.compute_budget.close()
+        self.mint_cache.close()
+        await self.http.aclose()
+
+    async def send_transaction(self, transaction, *signers):
+        # The refresher keeps a blockhash warm in the background; only a cold start waits for one
+        blockhash, _ = await asyncio.to_thread(self.blockhashes.get)
+        # Likewise the compute budget: only the first transaction of a shape is simulated
+        await asyncio.to_thread(self.compute_budget.apply, transaction)
+        response = await self.client.send_transaction(transaction, *signers, recent_blockhash=blockhash)
+        if response.get('result'):
+            return response['result']
+        raise Exception(f"Transaction failed: {response}")
+
+    def get_public_key_from_private(self, private_key_str):
+        return self.registry.public_key(private_key_str)
+
+    def bot_names(self):
+        return [name for name in self.keys if name != 'HEAD_HUNCHO_PRIVATE_KEY']
+
+    async def run_fleet(self, names, operation, concurrency=None):
+        """Await `operation(name)` for every wallet, at most `concurrency` at a time.
+
+        Returns {name: {"ok": bool, "result" or "error": ...}} so one failing wallet never hides the others.
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+
+        async def run_one(name):
+            async with semaphore:
+                try:
+                    return name, {"ok": True, "result": await operation(name)}
+                except Exception as e:
+                    return name, {"ok": False, "error": str(e)}
+
+        return dict(await asyncio.gather(*(run_one(name) for name in names)))
+
+    async def get_all_sol_balances(self):
+        names = list(self.public_keys)
+        lamports = await self.batch_rpc.get_balances(self.public_keys[name] for name in names)
+        return {name: value / 1e9 if value is not None else None for name, value in zip(names, lamports)}
+
+    async def fleet_snapshot(self, mint_address=None):
+        return await self.batch_rpc.fleet_snapshot(self.public_keys, mint_address)
+
+    async def get_quote(self, quote_type, mint, amount, slippage):
+        payload_quote = {
+            "quote_type": quote_type,
+            "mint": mint,
+            "amount": amount,
+            "slippage": slippage
+        }
+        response = await self.http.post(f"{PUMPAPI_URL}/quote", json=payload_quote)
+        if response.status_code == 200:
+            return response.json()
+        log(f"Error: {response.status_code} - {response.text}")
+        return None
+
+    async def transfer_sol(self, from_private_key, to_public_key, amount_sol):
+        from_keypair = self.registry.keypair(from_private_key)
+        transaction = Transaction()
+        transaction.add(
+            transfer(
+                TransferParams(
+                    from_pubkey=from_keypair.public_key,
+                    to_pubkey=PublicKey(to_public_key),
+                    lamports=int(amount_sol * 1e9)
+                )
+            )
+        )
+        return await self.send_transaction(transaction, from_keypair)
+
+    async def fetch_mint_info(self, mint_address):
+        response = await self.client.get_token_supply(PublicKey(mint_address))
+        if 'result' in response:
+            value = response['result']['value']
+            return value['decimals'], int(value['amount'])
+        raise Exception(f"Failed to get mint decimals for {mint_address}")
+
+    async def get_mint_decimals(self, mint_address):
+        # MintCache fetches synchronously, so a miss is fetched here and stored like its own fetch would
+        entry = self.mint_cache.get(mint_address)
+        if entry is None:
+            decimals, supply = await self.fetch_mint_info(mint_address)
+            self.mint_cache.put(mint_address, decimals, supply)
+            return decimals
+        return entry["decimals"]
+
+    async def transfer_tokens(self, from_private_key, to_public_key, mint_address, amount, decimals=None):
+        if isinstance(amount, TokenAmount):
+            amount, decimals = amount
+        if decimals is None:
+            decimals = await self.get_mint_decimals(mint_address)
+        from_keypair = self.registry.keypair(from_private_key)
+        from_pubkey = from_keypair.public_key
+        mint_pubkey = PublicKey(mint_address)
+        transaction = Transaction()
+        transaction.add(
+            transfer_checked(
+                TransferCheckedParams(
+                    program_id=TOKEN_PROGRAM_ID,
+                    source=get_associated_token_address(from_pubkey, mint_pubkey),
+                    mint=mint_pubkey,
+                    dest=get_associated_token_address(PublicKey(to_public_key), mint_pubkey),
+                    owner=from_pubkey,
+                    amount=amount,
+                    decimals=decimals
+                )
+            )
+        )
+        return await self.send_transaction(transaction, from_keypair)
+
+    async def top_up_bot_wallets(self, amount_sol, concurrency=None):
+        head_huncho_private_key = self.keys['HEAD_HUNCHO_PRIVATE_KEY']
+
+        async def top_up(name):
+            return await self.transfer_sol(head_huncho_private_key, self.public_keys[name], amount_sol)
+
+        results = await self.run_fleet(self.bot_names(), top_up, concurrency)
+        self.print_results("Top up", results)
+        return results
+
+    async def transfer_all_tokens_back_to_head_huncho(self, mint_address, concurrency=None):
+        head_huncho_public_key = self.public_keys['HEAD_HUNCHO_PRIVATE_KEY']
+        names = self.bot_names()
+        token_amounts = dict(zip(names, await self.batch_rpc.get_token_amounts(
+            [self.public_keys[name] for name in names], mint_address)))
+        holders = [name for name in names if token_amounts[name] and token_amounts[name].amount > 0]
+
+        async def consolidate(name):
+            return await self.transfer_tokens(self.keys[name], head_huncho_public_key, mint_address,
+                                              token_amounts[name])
+
+        results = await self.run_fleet(holders, consolidate, concurrency)
+        self.print_results("Transfer to Head Huncho from", results)
+        return results
+
+    def print_results(self, label, results):
+        for name, outcome in results.items():
+            if outcome["ok"]:
+                log(f"{label} {name} ({self.public_keys[name]}): Successful, Transaction ID: {outcome['result']}")
+            else:
+                log(f"{label} {name} ({self.public_keys[name]}): Failed - {outcome['error']}")
+
+
+# Sample usage
+if __name__ == "__main__":
+    async def main():
+        async with AsyncWalletManager() as wallet_manager:
+            print(await wallet_manager.get_all_sol_balances())
+
+            mint_address = "DpbbGCQSxTrQc6jPAbSHzptnnr2FbowwJGWE3aevTbev"
+            await wallet_manager.transfer_all_tokens_back_to_head_huncho(mint_address)
+
+    asyncio.run(main())
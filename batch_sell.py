@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import namedtuple
+
+from instrumentation import log, span
+from rpc_codec import TokenAmount, split_percent, to_bps
+
+SELL_CONCURRENCY = 32  # sell transactions in flight at once across the whole plan
+
+SellOrder = namedtuple("SellOrder", ["wallet", "mint", "percentage"])
+
+
+class BatchSeller:
+    """Exits positions for a wallet x mint x percentage plan in one go.
+
+    Every balance in the plan is read with one batched pass, the amounts to sell are split locally in
+    integer basis points, and the sells are built, signed and streamed out through the TxPipeline with at
+    most `concurrency` awaiting their acknowledgement; the pipeline's send pool caps it, so managers size
+    that pool from SELL_CONCURRENCY. Wallets may be given by key name or by address.
+    """
+
+    def __init__(self, trade_engine, batch_rpc, keys, public_keys, concurrency=SELL_CONCURRENCY):
+        self.trade_engine = trade_engine
+        self.batch_rpc = batch_rpc
+        self.keys = keys
+        self.public_keys = public_keys
+        self.concurrency = concurrency
+        self._names = None
+
+    def resolve(self, wallet):
+        """Key name for a wallet given by name or by public key."""
+        wallet = str(wallet)
+        if wallet in self.keys:
+            return wallet
+        if self._names is None:
+            self._names = {str(public_key): name for name, public_key in self.public_keys.items()}
+        name = self._names.get(wallet)
+        if name is None:
+            raise Exception(f"Unknown wallet: {wallet}")
+        return name
+
+    def plan_amounts(self, plan):
+        """[(order, name, balance, amount to sell)] with one batched balance read for every mint in the plan."""
+        entries, wanted, seen = [], {}, set()
+        for order in map(SellOrder._make, plan):
+            name = self.resolve(order.wallet)
+            key = (name, str(order.mint))
+            if key in seen:
+                raise Exception(f"Duplicate order for {name} / {order.mint}")
+            seen.add(key)
+            entries.append((order, name))
+            wanted.setdefault(str(order.mint), []).append(self.public_keys[name])
+        balances = self.batch_rpc.get_token_amounts_by_mint(wanted)
+        positions = {mint_address: iter(amounts) for mint_address, amounts in balances.items()}
+        rows = [(order, name, next(positions[str(order.mint)])) for order, name in entries]
+        # Orders sharing a mint and a percentage are split together
+        groups = {}
+        for index, (order, _, balance) in enumerate(rows):
+            if balance is not None:
+                groups.setdefault((str(order.mint), to_bps(order.percentage)), []).append(index)
+        amounts = [None] * len(rows)
+        for (_, bps), indices in groups.items():
+            split = split_percent([rows[index][2].amount for index in indices], bps / 100)
+            for index, amount in zip(indices, split):
+                amounts[index] = TokenAmount(amount, rows[index][2].decimals)
+        return [row + (amount,) for row, amount in zip(rows, amounts)]
+
+    def execute(self, plan, slippage, priority_fee=None, concurrency=None):
+        """Sell the whole plan; returns a report with one {"ok", ...} outcome per order, in plan order."""
+        started = time.perf_counter()
+        concurrency = min(concurrency or self.concurrency, self.trade_engine.pipeline.workers)
+        with span("batch_sell"):
+            rows = self.plan_amounts(plan)
+            for mint_address in {str(order.mint) for order, _, _, amount in rows if amount}:
+                self.trade_engine.get_curve(mint_address)  # warm the curve cache once per mint
+            outcomes = [None] * len(rows)
+            slots = threading.BoundedSemaphore(concurrency)
+            sends = []
+            for index, (order, name, balance, amount) in enumerate(rows):
+                outcome = {"wallet": name, "mint": str(order.mint), "percentage": order.percentage}
+                outcomes[index] = outcome
+                if amount is None or amount.amount == 0:
+                    outcome.update(ok=False, skipped=True, error="no tokens to sell")
+                    continue
+                outcome["amount"] = amount.amount
+                slots.acquire()
+                try:
+                    keypair = self.trade_engine.registry.keypair(self.keys[name])
+                    transaction, sol_out = self.trade_engine.build_sell(keypair, order.mint, amount.amount,
+                                                                        slippage, priority_fee)
+                    signature, sent = self.trade_engine.pipeline.send(transaction, keypair)
+                except Exception as e:
+                    slots.release()
+                    outcome.update(ok=False, error=str(e))
+                    continue
+                sent.add_done_callback(lambda _: slots.release())
+                outcome.update(sol_amount=sol_out, tx_hash=signature)
+                sends.append((outcome, sent))
+            for outcome, sent in sends:
+                try:
+                    sent.result()
+                    outcome["ok"] = True
+                except Exception as e:
+                    outcome.update(ok=False, error=str(e))
+        return self.report(outcomes, time.perf_counter() - started)
+
+    def report(self, outcomes, elapsed):
+        sold = [outcome for outcome in outcomes if outcome["ok"]]
+        skipped = sum(1 for outcome in outcomes if outcome.get("skipped"))
+        report = {
+            "orders": outcomes,
+            "sold": len(sold),
+            "failed": len(outcomes) - len(sold) - skipped,
+            "skipped": skipped,
+            "expected_lamports": sum(outcome["sol_amount"] for outcome in sold),
+            "elapsed": elapsed,
+        }
+        log(f"Batch sell: {report['sold']} sold, {report['failed']} failed, {report['skipped']} skipped, "
+            f"~{report['expected_lamports'] / 1e9} SOL expected in {elapsed:.2f}s")
+        return report
@@ -0,0 +1,43 @@
+import time
+
+import base58
+from solana.keypair import Keypair
+
+from key_registry import KeyRegistry, derive_associated_token_address
+
+MINT = "DpbbGCQSxTrQc6jPAbSHzptnnr2FbowwJGWE3aevTbev"
+WALLETS = 64
+ROUNDS = 20
+
+
+def per_op_us(fn, ops):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) / ops * 1e6
+
+
+def main():
+    private_keys = [base58.b58encode(Keypair.generate().secret_key).decode() for _ in range(WALLETS)]
+    owners = [Keypair.from_secret_key(base58.b58decode(pk)).public_key for pk in private_keys]
+    ops = WALLETS * ROUNDS
+    registry = KeyRegistry()
+    registry.precompute_atas(owners, MINT)
+    for pk in private_keys:
+        registry.keypair(pk)
+
+    results = [
+        ("keypair decode", lambda: [Keypair.from_secret_key(base58.b58decode(pk))
+                                    for _ in range(ROUNDS) for pk in private_keys],
+         lambda: [registry.keypair(pk) for _ in range(ROUNDS) for pk in private_keys]),
+        ("ATA derivation", lambda: [derive_associated_token_address(owner, MINT)
+                                    for _ in range(ROUNDS) for owner in owners],
+         lambda: [registry.associated_token_address(owner, MINT) for _ in range(ROUNDS) for owner in owners]),
+    ]
+    print(f"{'operation':<16}{'uncached us/op':>16}{'cached us/op':>14}{'speedup':>10}")
+    for name, uncached, cached in results:
+        before, after = per_op_us(uncached, ops), per_op_us(cached, ops)
+        print(f"{name:<16}{before:>16.2f}{after:>14.2f}{before / after:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+ENTRY_POINTS = ["helper", "tester2", "wallet_manager"]
+STARTUP_BUDGET_MS = 120  # import + WalletManager() for a one-shot command, interpreter startup excluded
+RUNS = 5
+TOP_IMPORTS = 8
+
+CHILD = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "{module}.WalletManager({env_file!r}, keystore_path={keystore!r})\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+def cold_start(module, env_file, keystore, importtime=False):
+    """Seconds a fresh interpreter spends importing `module` and building its WalletManager (plus the -X importtime log)."""
+    flags = ["-X", "importtime"] if importtime else []
+    code = CHILD.format(module=module, env_file=env_file, keystore=keystore)
+    result = subprocess.run([sys.executable, *flags, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    return float(result.stdout.split()[-1]), result.stderr
+
+
+def heaviest(importtime_log, count=TOP_IMPORTS):
+    """[(self ms, cumulative ms, module)] of the slowest imports by self time, interpreter startup (site) excluded."""
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if name.strip() == "site":
+            rows = []  # everything logged so far was imported before our code ran
+            continue
+        rows.append((int(self_us) / 1e3, int(cumulative_us) / 1e3, name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else STARTUP_BUDGET_MS
+    over = []
+    with tempfile.TemporaryDirectory() as directory:
+        env_file = os.path.join(directory, "startup.env")
+        with open(env_file, "w") as f:
+            f.write("HEAD_HUNCHO_PRIVATE_KEY=\n")
+        keystore = os.path.join(directory, "none.keystore")
+        print(f"budget {budget:.0f} ms, best of {RUNS} cold starts")
+        print(f"{'entry point':<20}{'best ms':>9}{'worst ms':>9}")
+        for module in ENTRY_POINTS:
+            samples = [cold_start(module, env_file, keystore)[0] * 1e3 for _ in range(RUNS)]
+            print(f"{module:<20}{min(samples):>9.1f}{max(samples):>9.1f}")
+            if min(samples) > budget:
+                over.append(module)
+        for module in over or ENTRY_POINTS[:1]:
+            print(f"slowest imports of {module}:")
+            for self_ms, cumulative_ms, name in heaviest(cold_start(module, env_file, keystore, importtime=True)[1]):
+                print(f"  {name:<40}{self_ms:>8.1f} self{cumulative_ms:>9.1f} cumulative ms")
+    if over:
+        print(f"over budget: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
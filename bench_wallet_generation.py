@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+import time
+
+from generate_wallets import generate_wallets
+from keystore import KeyStore
+
+SIZES = [10_000, 100_000]
+PASSWORD = "bench"
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print(f"{'wallets':>10}{'seconds':>10}{'keys/s':>12}{'file MB':>10}{'open ms':>10}{'decrypt us':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, f"bench_{size}.keystore")
+            store = KeyStore.create(path, PASSWORD)
+            store.sealing_key()  # keep the one-off scrypt out of the timing
+            start = time.perf_counter()
+            indices = generate_wallets(store, size)
+            elapsed = time.perf_counter() - start
+            store.close()
+            assert indices == list(range(size))
+
+            start = time.perf_counter()
+            store = KeyStore(path, PASSWORD)
+            open_ms = (time.perf_counter() - start) * 1e3
+            store.sealing_key()
+            start = time.perf_counter()
+            store.private_key(size - 1)
+            decrypt_us = (time.perf_counter() - start) * 1e6
+            store.close()
+            print(f"{size:>10,}{elapsed:>10.2f}{size / elapsed:>12,.0f}{os.path.getsize(path) / 1e6:>10.1f}"
+                  f"{open_ms:>10.2f}{decrypt_us:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
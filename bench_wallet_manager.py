@@ -0,0 +1,195 @@
+import asyncio
+import contextlib
+import io
+import itertools
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import base58
+from solana.keypair import Keypair
+
+from instrumentation import metrics
+from mock_server import DEFAULT_CURVE, MockServer
+from rate_limiter import configure_limiter
+from wallet_client import WalletClient
+
+MINT = "DpbbGCQSxTrQc6jPAbSHzptnnr2FbowwJGWE3aevTbev"
+WALLETS = 8
+ITERATIONS = 50
+LATENCY = 0.02  # seconds the mock adds to every request, roughly a nearby RPC node
+PUSH_TIMEOUT = 2.0  # seconds a live row waits for the websocket notification
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def measure(fn, iterations):
+    """Run `fn` `iterations` times with its prints swallowed; returns (latencies, failures, wall seconds)."""
+    latencies, failures = [], 0
+    wall = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            try:
+                result = fn()
+            except Exception:
+                result = None
+        latencies.append(time.perf_counter() - start)
+        failures += result is None or result is False
+    return latencies, failures, time.perf_counter() - wall
+
+
+def report(name, fn, iterations):
+    latencies, failures, wall = measure(fn, iterations)
+    print(f"{name:<24}{iterations / wall:>9.1f}{percentile(latencies, 50) * 1e3:>9.1f}"
+          f"{percentile(latencies, 99) * 1e3:>9.1f}{failures:>8}")
+
+
+def pushed(change, arrived, timeout=PUSH_TIMEOUT):
+    """Make a chain change and wait for it to arrive over a websocket subscription; None if it never does."""
+    change()
+    deadline = time.monotonic() + timeout
+    while not arrived():
+        if time.monotonic() > deadline:
+            return None
+        time.sleep(0.0005)
+    return True
+
+
+def write_env(directory, server):
+    keys = [base58.b58encode(Keypair.generate().secret_key).decode() for _ in range(WALLETS)]
+    path = os.path.join(directory, "bench_keys.env")
+    with open(path, "w") as f:
+        f.write(f"HEAD_HUNCHO_PRIVATE_KEY={keys[0]}\n")
+        for index, key in enumerate(keys[1:], start=2):
+            f.write(f"PRIVATE_KEY{index}={key}\n")
+    for key in keys:
+        public_key = Keypair.from_secret_key(base58.b58decode(key)).public_key
+        server.chain.fund(public_key, 5_000_000_000)
+        server.chain.set_tokens(public_key, MINT, 1_000_000_000)
+    return path
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else ITERATIONS
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else LATENCY
+    server = MockServer(latency=latency).start()
+    server.chain.add_mint(MINT)
+    # Route every RPC_URL call (and subscription) to the mock and lift the client-side throttle for it
+    os.environ["RPC_ENDPOINTS"] = server.url
+    os.environ["RPC_WS_ENDPOINTS"] = server.ws_url
+    configure_limiter(server.url, rate=100_000)
+
+    import helper
+    import tester2
+    from confirmation_tracker import ConfirmationTracker
+    import wallet_manager
+    from wallet_daemon import WalletDaemon
+
+    with tempfile.TemporaryDirectory() as directory:
+        env_file = write_env(directory, server)
+        no_keystore = os.path.join(directory, "none.keystore")
+        with contextlib.redirect_stdout(io.StringIO()):
+            journal_path = os.path.join(directory, "journal.sqlite3")
+            trader = tester2.WalletManager(env_file, mint_cache_path=os.path.join(directory, "t.sqlite3"),
+                                           keystore_path=no_keystore, journal_path=journal_path)
+            sweeper = wallet_manager.WalletManager(env_file, mint_cache_path=os.path.join(directory, "w.sqlite3"),
+                                                   keystore_path=no_keystore, journal_path=journal_path)
+            legacy = helper.WalletManager(env_file, keystore_path=no_keystore)
+            daemon = WalletDaemon(env_file, os.path.join(directory, "daemon.sock"),
+                                  mint_cache_path=os.path.join(directory, "d.sqlite3"), keystore_path=no_keystore,
+                                  journal_path=journal_path)
+            daemon.warm()
+        threading.Thread(target=asyncio.run, args=(daemon.serve(),), daemon=True).start()
+        while not os.path.exists(daemon.socket_path):
+            time.sleep(0.01)
+        client = WalletClient(daemon.socket_path)
+        head = trader.keys["HEAD_HUNCHO_PRIVATE_KEY"]
+        bot = str(trader.public_keys["PRIVATE_KEY2"])
+        bot_names = [name for name in trader.keys if name != "HEAD_HUNCHO_PRIVATE_KEY"]
+        sell_plan = [(name, MINT, 50) for name in bot_names]
+
+        # Every iteration sends a distinct transaction: identical ones within a blockhash are one to the chain
+        tick = itertools.count(1)
+
+        def lamports(sol):
+            return sol + next(tick) / 1e9
+
+        def refill(owner=bot):
+            server.chain.set_tokens(owner, MINT, 1_000_000_000 + 2 * next(tick))  # even: 50% of it differs too
+
+        def refill_fleet():
+            for name in bot_names:
+                refill(trader.public_keys[name])
+
+        operations = [
+            ("get_sol_balance", lambda: trader.get_sol_balance(bot)),
+            ("get_all_sol_balances", trader.get_all_sol_balances),
+            ("fleet_snapshot", lambda: trader.fleet_snapshot(MINT)),
+            ("get_token_balance", lambda: trader.get_token_balance(bot, MINT)),
+            ("fetch_mint_info", lambda: trader.fetch_mint_info(MINT)),
+            ("get_mint_decimals", lambda: trader.get_mint_decimals(MINT)),
+            ("get_quote", lambda: trader.get_quote("buy", MINT, 10_000_000, 5)),
+            ("perform_buy_trade", lambda: trader.perform_buy_trade(MINT, lamports(0.01), 5, 0.0001, head)),
+            ("perform_buy_trade_fast", lambda: trader.perform_buy_trade(MINT, lamports(0.01), 5, "fast", head)),
+            ("perform_sell_trade", lambda: refill() or trader.perform_sell_trade("PRIVATE_KEY2", MINT, 50, 5)),
+            ("perform_buy_trades",
+             lambda: len(trader.perform_buy_trades(MINT, lamports(0.01), 5, 0.0001, bot_names)) or None),
+            ("perform_batch_sell",
+             lambda: refill_fleet() or trader.perform_batch_sell(sell_plan, 5, 0.0001)["failed"] == 0 or None),
+            ("transfer_sol", lambda: trader.transfer_sol(head, bot, lamports(0.001))),
+            ("transfer_tokens", lambda: trader.transfer_tokens(head, bot, MINT, 1_000 + next(tick), decimals=6)),
+            ("top_up_bot_wallets", lambda: asyncio.run(trader.top_up_bot_wallets(lamports(0.01))) or True),
+            ("sweep_tokens_to_head",
+             lambda: refill_fleet() or sweeper.transfer_all_tokens_back_to_head_huncho(MINT) or True),
+            ("daemon_ping", client.ping),
+            ("daemon_get_quote", lambda: client.get_quote("buy", MINT, 10_000_000, 5)),
+            ("daemon_token_balance", lambda: client.get_token_balance("PRIVATE_KEY2", MINT)),
+            ("daemon_transfer_sol", lambda: client.transfer_sol("HEAD_HUNCHO_PRIVATE_KEY", bot, lamports(0.001))),
+            ("transfer_back_to_head",
+             lambda: refill() or legacy.transfer_tokens_back_to_head_huncho("PRIVATE_KEY2", MINT)),
+        ]
+        print(f"mock latency {latency * 1e3:.0f} ms, {iterations} iterations per operation")
+        print(f"{'operation':<24}{'ops/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'failed':>8}")
+        for name, fn in operations:
+            report(name, fn, iterations)
+
+        # Live paths: each row changes the mock chain and waits for the websocket push to land
+        with contextlib.redirect_stdout(io.StringIO()):
+            portfolio = trader.watch_portfolio([MINT])
+            tracker = ConfirmationTracker(trader.rpc_url, trader.transport, poll_interval=60, use_websocket=True)
+        counter = tick
+
+        def portfolio_update():
+            amount = 1_000_000_000 + next(counter)
+            return pushed(lambda: server.chain.set_tokens(bot, MINT, amount),
+                          lambda: portfolio.token_amount(bot, MINT).amount == amount)
+
+        def curve_update():
+            reserves = DEFAULT_CURVE.virtual_sol_reserves + next(counter)
+            return pushed(lambda: server.chain.set_curve(MINT, DEFAULT_CURVE._replace(virtual_sol_reserves=reserves)),
+                          lambda: trader.quote_engine.get_state(MINT).virtual_sol_reserves == reserves)
+
+        def signature_confirm():
+            signature = f"bench{next(counter)}"
+            confirmed = tracker.track(signature)
+            return pushed(lambda: server.chain.land(signature), confirmed.done)
+
+        time.sleep(0.2)  # let the subscriptions connect
+        for name, fn in [("ws_portfolio_update", portfolio_update), ("ws_curve_update", curve_update),
+                         ("ws_signature_confirm", signature_confirm)]:
+            report(name, fn, iterations)
+        print(f"requests served: {sum(server.counts.values())} {dict(sorted(server.counts.items()))}")
+        print(f"{'stage':<24}{'count':>9}{'p50 <=ms':>9}{'p99 <=ms':>9}")
+        for stage, row in sorted(metrics.summary().items()):
+            print(f"{stage:<24}{row['count']:>9}{row['p50'] * 1e3:>9.1f}{row['p99'] * 1e3:>9.1f}")
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import struct
+from collections import namedtuple
+
+from solana.publickey import PublicKey
+
+from rpc_codec import account_bytes, response_json
+from transport import RPC_URL, get_transport
+
+PUMP_PROGRAM_ID = PublicKey("6EF8rrecthR5Dkzon8Nwu78hRvfCKubJ14M5uBEwF6P")
+PUMP_GLOBAL = PublicKey("4wTV1YmiEkRvAtNtsSGPtUrqRYQMe5SKy2uB4Jjaxnjf")
+PUMP_FEE_RECIPIENT = PublicKey("CebN5WGQ4jvEPvsVU4EoHEpgzq1VV7AbicfhtW4xC9iM")
+PUMP_EVENT_AUTHORITY = PublicKey("Ce6TQqeHC9p8KetsN6JsjHK7UTZk7nasjjnr7XxXp9F1")
+
+PUMP_TOKEN_DECIMALS = 6
+FEE_BASIS_POINTS = 100  # 1% protocol fee on both sides of the curve
+
+CURVE_DISCRIMINATOR = bytes.fromhex("17b7f83760d8ac60")
+CURVE_LAYOUT = struct.Struct("<8sQQQQQ?")
+
+BondingCurveState = namedtuple(
+    "BondingCurveState",
+    ["virtual_token_reserves", "virtual_sol_reserves", "real_token_reserves",
+     "real_sol_reserves", "token_total_supply", "complete"],
+)
+
+
+def get_bonding_curve_address(mint_address):
+    return PublicKey.find_program_address([b"bonding-curve", bytes(PublicKey(mint_address))], PUMP_PROGRAM_ID)[0]
+
+
+def parse_bonding_curve(data):
+    """Decode the raw bytes of a pump.fun bonding-curve account."""
+    discriminator, *fields = CURVE_LAYOUT.unpack_from(data)
+    if discriminator != CURVE_DISCRIMINATOR:
+        raise Exception("Account is not a pump.fun bonding curve")
+    return BondingCurveState(*fields)
+
+
+def fetch_bonding_curve(mint_address, url=RPC_URL, transport=None):
+    curve_address = get_bonding_curve_address(mint_address)
+    payload = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "getAccountInfo",
+        "params": [str(curve_address), {"encoding": "base64"}]
+    }
+    response = (transport or get_transport()).post(url, json=payload)
+    if response.status_code != 200:
+        raise Exception(f"Error fetching bonding curve: {response.status_code} - {response.text}")
+    value = response_json(response)["result"]["value"]
+    if value is None:
+        raise Exception(f"No bonding curve found for {mint_address}")
+    return parse_bonding_curve(account_bytes(value))
+
+
+def buy_tokens_out(state, sol_in):
+    """Tokens received for `sol_in` lamports going into the curve (after the fee is taken)."""
+    if sol_in <= 0 or state.complete:
+        return 0
+    product = state.virtual_sol_reserves * state.virtual_token_reserves
+    new_token_reserves = product // (state.virtual_sol_reserves + sol_in) + 1
+    return min(state.virtual_token_reserves - new_token_reserves, state.real_token_reserves)
+
+
+def sell_sol_out(state, token_amount):
+    """Lamports received for selling `token_amount` atomic units, net of the fee."""
+    if token_amount <= 0 or state.complete:
+        return 0
+    sol_out = token_amount * state.virtual_sol_reserves // (state.virtual_token_reserves + token_amount)
+    return sol_out - sol_out * FEE_BASIS_POINTS // 10_000
+
+
+def sol_for_curve(lamports_budget):
+    """Part of a buy budget that reaches the curve once the fee is added on top."""
+    return lamports_budget * 10_000 // (10_000 + FEE_BASIS_POINTS)
+
+
+def with_slippage(amount, slippage_percent, up):
+    """Widen `amount` by a slippage percentage: up for a max cost, down for a min output."""
+    basis_points = int(slippage_percent * 100)
+    if up:
+        return amount * (10_000 + basis_points) // 10_000
+    return amount * max(0, 10_000 - basis_points) // 10_000
+
+
+def buy_tokens_out_many(state, sol_ins):
+    """buy_tokens_out over many amounts with the curve invariants hoisted out of the loop.
+
+    Stays on Python ints: virtual reserves multiply to ~1e25, past what uint64 arrays can hold.
+    """
+    if state.complete:
+        return [0] * len(sol_ins)
+    vsr, vtr, cap = state.virtual_sol_reserves, state.virtual_token_reserves, state.real_token_reserves
+    product = vsr * vtr
+    return [min(vtr - product // (vsr + sol_in) - 1, cap) if sol_in > 0 else 0 for sol_in in sol_ins]
+
+
+def sell_sol_out_many(state, token_amounts):
+    if state.complete:
+        return [0] * len(token_amounts)
+    vsr, vtr = state.virtual_sol_reserves, state.virtual_token_reserves
+    gross = [amount * vsr // (vtr + amount) if amount > 0 else 0 for amount in token_amounts]
+    return [sol_out - sol_out * FEE_BASIS_POINTS // 10_000 for sol_out in gross]
@@ -0,0 +1,221 @@
+import base64
+import math
+import struct
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from solana.publickey import PublicKey
+from solana.system_program import SYS_PROGRAM_ID
+from solana.transaction import Transaction, TransactionInstruction
+from solana.utils import shortvec_encoding as shortvec
+
+from bonding_curve import PUMP_PROGRAM_ID
+from instrumentation import log, span
+from transport import RPC_URL, get_transport
+from tx_packer import DEFAULT_INSTRUCTION_UNITS, MAX_TRANSACTION_UNITS, PLACEHOLDER_BLOCKHASH, instruction_units
+from tx_pipeline import rpc_call
+
+COMPUTE_BUDGET_PROGRAM_ID = PublicKey("ComputeBudget111111111111111111111111111111")
+CU_MARGIN = 1.1          # limit = measured units + 10%, enough for account-state jitter between sends
+RECHECK_EVERY = 500      # uses of a shape between background re-simulations
+DRIFT_TOLERANCE = 0.2    # a re-simulation further than this from the cached units replaces them
+RETRY_FAILED_AFTER = 30  # seconds a shape whose simulation failed uses the static estimate before trying again
+TRANSFER_SPEED = "economy"
+BUDGET_INSTRUCTION_UNITS = 150  # each SetComputeUnitLimit/SetComputeUnitPrice instruction
+DISCRIMINATOR_BYTES = {str(SYS_PROGRAM_ID): 4, str(PUMP_PROGRAM_ID): 8}  # other programs use a one-byte tag
+EXCEEDED_MARKERS = ("ComputationalBudgetExceeded", "exceeded CUs meter")
+
+
+def set_compute_unit_limit(units):
+    return TransactionInstruction(keys=[], program_id=COMPUTE_BUDGET_PROGRAM_ID, data=struct.pack("<BI", 2, units))
+
+
+def set_compute_unit_price(micro_lamports):
+    return TransactionInstruction(keys=[], program_id=COMPUTE_BUDGET_PROGRAM_ID, data=struct.pack("<BQ", 3, micro_lamports))
+
+
+def priority_fee_instructions(priority_fee_sol, units):
+    """ComputeBudget instructions that spend `priority_fee_sol` on top of the base fee, pumpapi style."""
+    micro_lamports = int(priority_fee_sol * 1e9 * 1e6) // units
+    return [set_compute_unit_limit(units), set_compute_unit_price(micro_lamports)]
+
+
+def is_compute_budget(instruction):
+    return instruction.program_id == COMPUTE_BUDGET_PROGRAM_ID
+
+
+def priority_fee_lamports(transaction):
+    """Priority fee `transaction` pays: its SetComputeUnitPrice times its SetComputeUnitLimit, rounded up."""
+    instructions = [instruction for instruction in transaction.instructions if not is_compute_budget(instruction)]
+    units = min(DEFAULT_INSTRUCTION_UNITS * len(instructions), MAX_TRANSACTION_UNITS)  # the runtime's default limit
+    micro_lamports = 0
+    for instruction in transaction.instructions:
+        if is_compute_budget(instruction) and instruction.data[0] == 2:
+            units = struct.unpack_from("<I", instruction.data, 1)[0]
+        elif is_compute_budget(instruction) and instruction.data[0] == 3:
+            micro_lamports = struct.unpack_from("<Q", instruction.data, 1)[0]
+    return -(-units * micro_lamports // 1_000_000)
+
+
+def instruction_shape(instruction):
+    program = str(instruction.program_id)
+    return program, bytes(instruction.data[:DISCRIMINATOR_BYTES.get(program, 1)]), len(instruction.keys)
+
+
+def transaction_shape(instructions):
+    """What a transaction's compute cost depends on: its programs and instruction kinds, not their amounts."""
+    return tuple(instruction_shape(instruction) for instruction in instructions if not is_compute_budget(instruction))
+
+
+def fee_payer(transaction):
+    if transaction.fee_payer is not None:
+        return transaction.fee_payer
+    return next(key.pubkey for instruction in transaction.instructions for key in instruction.keys if key.is_signer)
+
+
+class ComputeBudget:
+    """Gives every transaction a compute-unit limit measured for its shape instead of 200k per instruction.
+
+    The first transaction of a shape (all SOL transfers, all transfer_checked sweeps of a given size, every
+    pump.fun buy) is simulated with sigVerify off and its unitsConsumed, plus CU_MARGIN, becomes the limit
+    for the rest; concurrent first uses share that one simulation. Every RECHECK_EVERY uses the shape is
+    simulated again in the background and replaced if it drifted more than DRIFT_TOLERANCE, and a send
+    rejected for running out of compute units drops it outright. When a simulation fails the shape uses
+    the static per-program estimate (budget instructions and CU_MARGIN included) for RETRY_FAILED_AFTER
+    seconds instead of re-simulating every send.
+    """
+
+    def __init__(self, rpc_url=RPC_URL, transport=None, fee_estimator=None, speed=TRANSFER_SPEED, margin=CU_MARGIN,
+                 recheck_every=RECHECK_EVERY):
+        self.rpc_url = rpc_url
+        self.transport = transport or get_transport()
+        self.fee_estimator = fee_estimator
+        self.speed = speed
+        self.margin = margin
+        self.recheck_every = recheck_every
+        self._units = {}    # shape -> measured compute units
+        self._uses = {}
+        self._pending = {}  # shape -> Future of its first simulation
+        self._failed = {}   # shape -> monotonic time its simulation last failed
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def simulate(self, instructions, payer):
+        """Compute units a transaction of `instructions` consumes, budget instructions included."""
+        transaction = Transaction(recent_blockhash=PLACEHOLDER_BLOCKHASH, fee_payer=payer)
+        transaction.add(set_compute_unit_limit(MAX_TRANSACTION_UNITS), set_compute_unit_price(0))
+        for instruction in instructions:
+            if not is_compute_budget(instruction):
+                transaction.add(instruction)
+        message = transaction.compile_message()
+        signatures = message.header.num_required_signatures
+        raw = shortvec.encode_length(signatures) + bytes(64 * signatures) + message.serialize()
+        options = {"encoding": "base64", "sigVerify": False, "replaceRecentBlockhash": True, "commitment": "processed"}
+        with span("simulate"):
+            value = rpc_call(self.transport, self.rpc_url, "simulateTransaction",
+                             [base64.b64encode(raw).decode(), options])["value"]
+        if value.get("err") is not None or not value.get("unitsConsumed"):
+            raise Exception(f"simulateTransaction failed: {value.get('err')}")
+        return value["unitsConsumed"]
+
+    def _measure(self, shape, instructions, payer):
+        with self._lock:
+            measured = self._units.get(shape)
+            if measured is not None:
+                return measured
+            pending = self._pending.get(shape)
+            owner = pending is None
+            if owner:
+                pending = self._pending[shape] = Future()
+        if not owner:
+            return pending.result()
+        try:
+            measured = self.simulate(instructions, payer)
+            with self._lock:
+                self._units[shape] = measured
+                self._uses[shape] = 0
+            pending.set_result(measured)
+        except Exception as e:
+            with self._lock:
+                self._failed[shape] = time.monotonic()
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(shape, None)
+        return measured
+
+    def _recheck(self, shape, instructions, payer):
+        try:
+            measured = self.simulate(instructions, payer)
+        except Exception as e:
+            log(f"Compute unit re-simulation failed: {e}")
+            return
+        with self._lock:
+            cached = self._units.get(shape)
+            if cached is None:
+                return
+            if abs(measured - cached) > cached * DRIFT_TOLERANCE:
+                log(f"Compute units drifted from {cached} to {measured} for {len(shape)}-instruction shape")
+                self._units[shape] = measured
+            else:
+                self._units[shape] = max(cached, measured)
+
+    def _count_use(self, shape, instructions, payer):
+        with self._lock:
+            uses = self._uses[shape] = self._uses.get(shape, 0) + 1
+            if uses % self.recheck_every:
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(1, thread_name_prefix="compute-budget")
+        self._executor.submit(self._recheck, shape, instructions, payer)
+
+    def units(self, instructions, payer, fallback=None):
+        """Compute-unit limit for a transaction of `instructions`; simulates its shape the first time only."""
+        shape = transaction_shape(instructions)
+        measured = self._units.get(shape)
+        if measured is None:
+            try:
+                if time.monotonic() - self._failed.get(shape, float("-inf")) < RETRY_FAILED_AFTER:
+                    raise Exception("simulation of this shape failed recently")
+                measured = self._measure(shape, instructions, payer)
+            except Exception as e:
+                log(f"Using the static compute unit estimate: {e}")
+                if fallback is None:
+                    # The two budget instructions `apply` prepends are executed and metered too
+                    fallback = math.ceil(self.margin * (2 * BUDGET_INSTRUCTION_UNITS + sum(
+                        instruction_units(instruction) for instruction in instructions
+                        if not is_compute_budget(instruction))))
+                return min(fallback, MAX_TRANSACTION_UNITS)
+        else:
+            self._count_use(shape, instructions, payer)
+        return min(math.ceil(measured * self.margin), MAX_TRANSACTION_UNITS)
+
+    def invalidate(self, instructions):
+        with self._lock:
+            self._units.pop(transaction_shape(instructions), None)
+
+    def price(self):
+        return self.fee_estimator.estimate((), self.speed) if self.fee_estimator is not None else 0
+
+    def apply(self, transaction):
+        """Prepend SetComputeUnitLimit/SetComputeUnitPrice unless `transaction` already sets its own budget."""
+        if any(is_compute_budget(instruction) for instruction in transaction.instructions):
+            return transaction
+        units = self.units(transaction.instructions, fee_payer(transaction))
+        transaction.instructions[:0] = [set_compute_unit_limit(units), set_compute_unit_price(self.price())]
+        return transaction
+
+    def watch(self, raw_transaction, sent):
+        """Drop the cached units of a signed transaction's shape if its send is rejected for exceeding them."""
+        def check(future):
+            error = future.exception()
+            if error is not None and any(marker in str(error) for marker in EXCEEDED_MARKERS):
+                log("Transaction ran out of compute units; re-simulating its shape on next use")
+                self.invalidate(Transaction.deserialize(raw_transaction).instructions)
+        sent.add_done_callback(check)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import Future
+
+import websockets
+from solana.rpc.commitment import Confirmed
+
+from instrumentation import log, observe
+from rpc_codec import loads
+from transport import RPC_URL, get_transport, ws_url_for
+from tx_pipeline import rpc_call
+
+MAX_SIGNATURES_PER_CALL = 256
+POLL_INTERVAL = 1.0
+RECONNECT_DELAY = 1.0
+COMMITMENT_RANK = {"processed": 0, "confirmed": 1, "finalized": 2}
+
+
+class TransactionFailed(Exception):
+    pass
+
+
+class TransactionExpired(TransactionFailed):
+    """The blockhash ran out before the transaction landed, so it never executed and may be sent again."""
+
+
+class ConfirmationTracker:
+    """Resolves futures for in-flight signatures once they reach a commitment level.
+
+    One background thread polls getSignatureStatuses for up to 256 signatures per call, so hundreds of
+    pipelined transactions share a single polling loop. With `use_websocket=True` each signature is also
+    watched through signatureSubscribe and resolves as soon as the node pushes the notification.
+    Signatures still unseen once the chain passes their last valid block height are failed as expired.
+    """
+
+    def __init__(self, rpc_url=RPC_URL, transport=None, commitment=Confirmed, poll_interval=POLL_INTERVAL,
+                 use_websocket=False, ws_url=None):
+        self.rpc_url = rpc_url
+        self.transport = transport or get_transport()
+        self.commitment = commitment
+        self.poll_interval = poll_interval
+        self.use_websocket = use_websocket
+        self.ws_url = ws_url or ws_url_for(rpc_url, self.transport)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._loop = None
+        self._ws = None
+
+    def track(self, signature, last_valid_block_height=None, callback=None):
+        """Return a Future that resolves to the signature status once it reaches `self.commitment`."""
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+        with self._lock:
+            self._pending[signature] = (future, last_valid_block_height, time.perf_counter())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="confirmation-tracker", daemon=True)
+                self._thread.start()
+        if self.use_websocket:
+            self._subscribe(signature)
+        self._wake.set()
+        return future
+
+    def track_pipeline(self, pipeline):
+        """Track everything a TxPipeline has sent so far; returns {signature: future}."""
+        return {signature: self.track(signature, height) for signature, height in pipeline.take_in_flight().items()}
+
+    def pending(self):
+        return len(self._pending)
+
+    def _resolve(self, signature, status=None, error=None):
+        with self._lock:
+            entry = self._pending.pop(signature, None)
+        if entry is None or entry[0].done():
+            return
+        observe("confirm", time.perf_counter() - entry[2], outcome="failed" if error is not None else "confirmed")
+        if error is not None:
+            entry[0].set_exception(error)
+        else:
+            entry[0].set_result(status)
+
+    def _reached(self, status):
+        level = status.get("confirmationStatus") or "processed"
+        return COMMITMENT_RANK[level] >= COMMITMENT_RANK[self.commitment]
+
+    def poll_once(self):
+        signatures = list(self._pending)
+        if not signatures:
+            return
+        block_height = None
+        for offset in range(0, len(signatures), MAX_SIGNATURES_PER_CALL):
+            chunk = signatures[offset:offset + MAX_SIGNATURES_PER_CALL]
+            result = rpc_call(self.transport, self.rpc_url, "getSignatureStatuses", [chunk])
+            for signature, status in zip(chunk, result["value"]):
+                if status is not None and status.get("err") is not None:
+                    self._resolve(signature, error=TransactionFailed(f"{signature} failed: {status['err']}"))
+                elif status is not None and self._reached(status):
+                    self._resolve(signature, status)
+                elif status is None:
+                    entry = self._pending.get(signature)
+                    if entry is not None and entry[1] is not None:
+                        if block_height is None:
+                            block_height = rpc_call(self.transport, self.rpc_url, "getBlockHeight",
+                                                    [{"commitment": self.commitment}])
+                        if block_height > entry[1]:
+                            self._resolve(signature, error=TransactionExpired(f"{signature} expired unconfirmed"))
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                self.poll_once()
+            except Exception as e:
+                log(f"Signature status poll failed: {e}")
+
+    # --- signatureSubscribe -----------------------------------------------------------------
+
+    def _subscribe(self, signature):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_until_complete, args=(self._run_ws(),),
+                                 name="confirmation-ws", daemon=True).start()
+                return
+        asyncio.run_coroutine_threadsafe(self._send_subscribe(signature), self._loop)
+
+    async def _send_subscribe(self, signature):
+        if self._ws is None:
+            return  # sent by the resubscribe after (re)connecting
+        request = {
+            "jsonrpc": "2.0",
+            "id": signature,
+            "method": "signatureSubscribe",
+            "params": [signature, {"commitment": self.commitment}],
+        }
+        await self._ws.send(json.dumps(request))
+
+    async def _run_ws(self):
+        subscriptions = {}
+        while True:
+            try:
+                async with websockets.connect(self.ws_url) as ws:
+                    self._ws = ws
+                    for signature in list(self._pending):
+                        await self._send_subscribe(signature)
+                    async for message in ws:
+                        message = loads(message)
+                        if "result" in message and message.get("id") in self._pending:
+                            subscriptions[message["result"]] = message["id"]
+                        elif message.get("method") == "signatureNotification":
+                            signature = subscriptions.pop(message["params"]["subscription"], None)
+                            value = message["params"]["result"]["value"]
+                            if signature is None:
+                                continue
+                            if value.get("err") is not None:
+                                self._resolve(signature, error=TransactionFailed(f"{signature} failed: {value['err']}"))
+                            else:
+                                self._resolve(signature, {"confirmationStatus": self.commitment, "err": None})
+            except (OSError, websockets.WebSocketException) as e:
+                log(f"Confirmation websocket error: {e}")
+            self._ws = None
+            subscriptions.clear()
+            await asyncio.sleep(RECONNECT_DELAY)
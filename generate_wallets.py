@@ -1,26 +1,59 @@
-import requests
-
-# Fetch new wallets
-url = "https://pumpapi.fun/api/generate_wallets"
-params = {"n": 5}  # Number of wallets to generate
-
-response = requests.get(url, params=params)
-
-if response.status_code == 200:
-    data = response.json()
-    new_wallets = data.get('wallets', [])
-    
-    # Prepare the output string
-    output = ""
-    start_index = 4  # Start from PRIVATE_KEY4
-    
-    for i, wallet in enumerate(new_wallets, start=start_index):
-        output += f"PRIVATE_KEY{i} = {wallet}\n"
-    
-    # Write the keys to the file
-    with open("wallet_keys.env", "a") as f:
-        f.write(output)
-
-    print("Wallet private keys saved to wallet_keys.env")
-else:
-    print(f"Error retrieving data: {response.status_code}")
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from dotenv import load_dotenv
+from nacl.secret import SecretBox
+from nacl.signing import SigningKey
+
+from keystore import KEYSTORE_FILE, KeyStore, import_env, key_name
+
+CHUNK_SIZE = 2048  # keypairs per worker task; also the unit streamed into the keystore
+
+
+def generate_records(sealing_key, count):
+    """Generate `count` ed25519 keypairs and return them as sealed keystore records."""
+    box = SecretBox(sealing_key)
+    records = []
+    for _ in range(count):
+        signing_key = SigningKey.generate()
+        records.append(bytes(signing_key.verify_key) + bytes(box.encrypt(bytes(signing_key))))
+    return b"".join(records)
+
+
+def generate_wallets(store, n, workers=None, chunk_size=CHUNK_SIZE):
+    """Append `n` fresh wallets to `store`, generating chunks across a process pool; returns their indices."""
+    sealing_key = store.sealing_key()
+    chunks = [min(chunk_size, n - offset) for offset in range(0, n, chunk_size)]
+    indices = []
+    with ProcessPoolExecutor(workers) as executor:
+        # map() yields chunks in submission order, each appended (and fsynced) as soon as it is ready
+        for records in executor.map(generate_records, [sealing_key] * len(chunks), chunks):
+            first = store.append_records([records])
+            indices.extend(range(first, len(store)))
+    return indices
+
+
+def open_or_create(keystore_path=KEYSTORE_FILE, env_file="wallet_keys.env"):
+    """Open the keystore, seeding a new one from the env file so Head Huncho stays at index 0."""
+    if os.path.exists(keystore_path):
+        return KeyStore(keystore_path)
+    if os.path.exists(env_file):
+        return import_env(env_file, keystore_path)
+    return KeyStore.create(keystore_path)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5  # Number of wallets to generate
+    keystore_path = sys.argv[2] if len(sys.argv) > 2 else KEYSTORE_FILE
+    load_dotenv("wallet_keys.env")
+
+    store = open_or_create(keystore_path)
+    start = time.perf_counter()
+    indices = generate_wallets(store, n)
+    elapsed = time.perf_counter() - start
+    if indices:
+        print(f"Generated {key_name(indices[0])} .. {key_name(indices[-1])} into {keystore_path} "
+              f"in {elapsed:.2f}s ({len(indices) / elapsed:,.0f} keys/s)")
+    store.close()
@@ -1,157 +1,156 @@
-import os
-import base58
-import requests
-from solana.keypair import Keypair
-from solana.publickey import PublicKey
-from solana.rpc.api import Client
-from solana.rpc.commitment import Confirmed
-from solana.transaction import Transaction
-from solana.system_program import transfer, TransferParams
-from dotenv import load_dotenv
-
-class WalletManager:
-    def __init__(self, env_file='wallet_keys.env'):
-        load_dotenv(env_file)
-        self.keys = {
-            'HEAD_HUNCHO_PRIVATE_KEY': os.getenv('HEAD_HUNCHO_PRIVATE_KEY'),
-            'PRIVATE_KEY2': os.getenv('PRIVATE_KEY2'),
-            'PRIVATE_KEY3': os.getenv('PRIVATE_KEY3'),
-            'PRIVATE_KEY4': os.getenv('PRIVATE_KEY4'),
-            'PRIVATE_KEY5': os.getenv('PRIVATE_KEY5'),
-            'PRIVATE_KEY6': os.getenv('PRIVATE_KEY6'),
-            'PRIVATE_KEY7': os.getenv('PRIVATE_KEY7'),
-            'PRIVATE_KEY8': os.getenv('PRIVATE_KEY8'),
-        }
-        self.public_keys = {name: self.get_public_key_from_private(pk) for name, pk in self.keys.items()}
-        self.client = Client("https://api.mainnet-beta.solana.com")
+from instrumentation import log
+from keystore import KEYSTORE_FILE
+from wallet_base import WalletManagerBase
+
+
+class WalletManager(WalletManagerBase):
+    def __init__(self, env_file='wallet_keys.env', transport=None, keystore_path=KEYSTORE_FILE):
+        # No mint cache file here: mint decimals are remembered for this process only
+        super().__init__(env_file, transport, mint_cache_path=None, keystore_path=keystore_path)
 
     def get_public_key_from_private(self, private_key_str):
-        private_key_bytes = base58.b58decode(private_key_str)
-        keypair = Keypair.from_secret_key(private_key_bytes)
-        return keypair.public_key
+        return self.registry.public_key(private_key_str)
 
     def get_sol_balance(self, public_key):
         response = self.client.get_balance(public_key)
         if response['result']:
             sol_balance = response['result']['value'] / 1e9  # Convert lamports to SOL
-            print(f"SOL Balance for {public_key}: {sol_balance} SOL")
+            log(f"SOL Balance for {public_key}: {sol_balance} SOL")
             return sol_balance
         else:
-            print(f"Error retrieving balance for {public_key}")
+            log(f"Error retrieving balance for {public_key}")
             return None
 
     def get_all_sol_balances(self):
-        return {name: self.get_sol_balance(pk) for name, pk in self.public_keys.items()}
-
-    def get_token_balance(self, wallet_address, mint_address):
-        url = "https://api.mainnet-beta.solana.com"
-        headers = {"Content-Type": "application/json"}
-        payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "getTokenAccountsByOwner",
-            "params": [
-                wallet_address,
-                {"mint": mint_address},
-                {"encoding": "jsonParsed"}
-            ]
-        }
-
-        response = requests.post(url, json=payload, headers=headers)   
-        if response.status_code == 200:
-            try:
-                result = response.json()["result"]["value"]
-                if result:
-                    token_balance = result[0]["account"]["data"]["parsed"]["info"]["tokenAmount"]["uiAmount"]
-                    print(f"Token Balance: {token_balance} tokens")
-                    return token_balance
-                else:
-                    print("No token accounts found for the given mint address.")
-                    return None
-            except (IndexError, KeyError) as e:
-                print(f"Error extracting token balance: {e}")
-                return None
+        names = list(self.public_keys)
+        if self.portfolio is not None and self.portfolio.live():
+            lamports = [self.portfolio.lamports[self.portfolio.rows[name]] for name in names]
+        else:
+            lamports = self.batch_rpc.get_balances(self.public_keys[name] for name in names)
+        balances = {}
+        for name, value in zip(names, lamports):
+            public_key = self.public_keys[name]
+            if value is None:
+                log(f"Error retrieving balance for {public_key}")
+                balances[name] = None
+            else:
+                balances[name] = value / 1e9  # Convert lamports to SOL
+                log(f"SOL Balance for {public_key}: {balances[name]} SOL")
+        return balances
+
+    def fleet_snapshot(self, mint_address=None):
+        return self.batch_rpc.fleet_snapshot(self.public_keys, mint_address)
+
+    def watch_portfolio(self, mint_addresses=()):
+        """Start the live fleet portfolio; balance reads below are then served from it without RPC.
+
+        The bonding curves of `mint_addresses` are subscribed too, so quotes and trades on them skip the fetch.
+        """
+        from portfolio import Portfolio
+        for mint_address in mint_addresses:
+            self.quote_engine.subscribe(mint_address)
+        if self.portfolio is None:
+            self.portfolio = Portfolio(self.public_keys, mint_addresses, self.rpc_url, transport=self.transport,
+                                       batch_rpc=self.batch_rpc, registry=self.registry)
+            self.portfolio.start()
+        else:
+            for mint_address in mint_addresses:
+                self.portfolio.add_mint(mint_address)
+        return self.portfolio
+
+    def get_token_amount(self, wallet_address, mint_address):
+        """Exact TokenAmount(amount, decimals) held by `wallet_address`; the decimals come with the balance read."""
+        if self.portfolio is not None and self.portfolio.tracks(wallet_address, mint_address):
+            token_amount = self.portfolio.token_amount(wallet_address, mint_address)
         else:
-            print(f"Error: {response.status_code} - {response.text}")
+            # base64 + dataSlice: the exact u64 amount instead of a jsonParsed float
+            token_amount = self.batch_rpc.get_token_amounts([wallet_address], mint_address)[0]
+        if token_amount is None:
+            log("No token accounts found for the given mint address.")
             return None
+        log(f"Token Balance: {token_amount.ui_amount} tokens")
+        return token_amount
+
+    def get_token_balance(self, wallet_address, mint_address):
+        token_amount = self.get_token_amount(wallet_address, mint_address)
+        return None if token_amount is None else token_amount.ui_amount
 
     def get_quote(self, quote_type, mint, amount, slippage):
-        url_quote = "https://pumpapi.fun/api/quote"
-        payload_quote = {
-            "quote_type": quote_type,  # "buy" or "sell"
-            "mint": mint,              # Token mint address
-            "amount": amount,          # Amount in lamports (1 SOL = 1e9 lamports)
-            "slippage": slippage       # Desired slippage
-        }
-        response = requests.post(url=url_quote, json=payload_quote)   
-        if response.status_code == 200:
-            quote_data = response.json()
-            print(f"Quote: {quote_data}")
-            return quote_data
-        else:
-            print(f"Error: {response.status_code} - {response.text}")
-            return None 
+        # Priced locally from the cached bonding curve instead of a pumpapi round trip
+        try:
+            quote_data = self.quote_engine.quote(quote_type, mint, amount, slippage)
+        except Exception as e:
+            log(f"Error: {e}")
+            return None
+        log(f"Quote: {quote_data}")
+        return quote_data
 
     def perform_buy_trade(self, mint, amount_in_sol, slippage, priority_fee, wallet_address):
         amount_in_lamports = int(amount_in_sol * 1e9)
         quote = self.get_quote("buy", mint, amount_in_lamports, slippage)
         if quote is None or quote.get("outAmount", 0) <= 0:
-            print("Failed to get a valid quote.")
+            log("Failed to get a valid quote.")
             return None
 
-        url_trade = "https://pumpapi.fun/api/trade"
-        payload_trade = {
-            "trade_type": "buy",
-            "mint": mint,
-            "amount": amount_in_lamports,
-            "slippage": slippage,
-            "priorityFee": priority_fee,
-            "userPrivateKey": self.keys['HEAD_HUNCHO_PRIVATE_KEY']
-        }
-        response_trade = requests.post(url_trade, json=payload_trade)
-        if response_trade.status_code == 200:
-            trade_data = response_trade.json()
-            print(f"Buy Transaction ID: {trade_data['tx_hash']}")
-            return trade_data
-        else:
-            print(f"Error executing buy trade: {response_trade.status_code} - {response_trade.text}")
+        # Built and signed locally; the private key never leaves this process
+        try:
+            trade_data = self.trade_engine.buy(self.keys['HEAD_HUNCHO_PRIVATE_KEY'], mint, amount_in_lamports,
+                                               slippage, priority_fee)
+        except Exception as e:
+            log(f"Error executing buy trade: {e}")
             return None
-
-    def perform_sell_trade(self, wallet_address, mint_address, percentage, slippage):
-        balance_in_tokens = self.get_token_balance(wallet_address, mint_address)
-        if balance_in_tokens is None:
-            print("Failed to retrieve balance.")
+        log(f"Buy Transaction ID: {trade_data['tx_hash']}")
+        return trade_data
+
+    def perform_sell_trade(self, wallet_address, mint_address, percentage, slippage, priority_fee=None):
+        # `wallet_address` may be a key name or a public key
+        try:
+            name = self.seller.resolve(wallet_address)
+        except Exception as e:
+            log(f"Error: {e}")
             return None
-        
-        amount_to_sell = balance_in_tokens * (percentage / 100)
-        print(f"Amount to sell in tokens: {amount_to_sell}")
-        
+        balance = self.get_token_amount(str(self.public_keys[name]), mint_address)
+        if balance is None:
+            log("Failed to retrieve balance.")
+            return None
+
+        # Integer basis-point split of the atomic balance: selling 100% leaves no float-truncation dust
+        amount_to_sell = balance.percent(percentage)
+        log(f"Amount to sell in tokens: {amount_to_sell.ui_amount}")
+
         quote = self.get_quote("sell", mint_address, amount_to_sell, slippage)
         if quote is None:
-            print("Failed to get a valid sell quote.")
+            log("Failed to get a valid sell quote.")
             return None
-        
-        url_trade = "https://pumpapi.fun/api/trade"
-        payload_trade = {
-            "trade_type": "sell",
-            "mint": mint_address,
-            "amount": amount_to_sell,
-            "slippage": slippage,
-            "priorityFee": 0.003,  # Example priority fee in SOL
-            "userPrivateKey": self.keys[wallet_address]
-        }
-        
-        response_trade = requests.post(url_trade, json=payload_trade)
-        if response_trade.status_code == 200:
-            trade_data = response_trade.json()
-            print(f"Sell Transaction ID: {trade_data['tx_hash']}")
-            return trade_data
-        else:
-            print(f"Error executing sell trade: {response_trade.status_code} - {response_trade.text}")
+
+        try:
+            trade_data = self.trade_engine.sell(self.keys[name], mint_address, amount_to_sell.amount,
+                                                slippage, priority_fee)
+        except Exception as e:
+            log(f"Error executing sell trade: {e}")
+            return None
+        log(f"Sell Transaction ID: {trade_data['tx_hash']}")
+        return trade_data
+
+    def perform_batch_sell(self, plan, slippage, priority_fee=None, concurrency=None):
+        """Sell a [(wallet, mint, percentage)] plan across the fleet; returns the BatchSeller report."""
+        try:
+            report = self.seller.execute(plan, slippage, priority_fee, concurrency)
+        except Exception as e:
+            log(f"Error executing batch sell: {e}")
             return None
+        for outcome in report["orders"]:
+            if outcome["ok"]:
+                log(f"Sold {outcome['percentage']}% of {outcome['mint']} from {outcome['wallet']}: {outcome['tx_hash']}")
+            else:
+                log(f"Sell of {outcome['mint']} from {outcome['wallet']} failed - {outcome['error']}")
+        return report
 
     def transfer_sol(self, from_private_key, to_public_key, amount_sol):
-        from_keypair = Keypair.from_secret_key(base58.b58decode(from_private_key))
+        from solana.publickey import PublicKey
+        from solana.system_program import TransferParams, transfer
+        from solana.transaction import Transaction
+        from_keypair = self.registry.keypair(from_private_key)
         to_pubkey = PublicKey(to_public_key)
         amount_lamports = int(amount_sol * 1e9)  # Convert SOL to lamports
 
@@ -166,37 +165,25 @@ class WalletManager:
             )
         )
 
-        response = self.client.send_transaction(transaction, from_keypair)
-        if response.get('result'):
-            print(f"Transaction successful: {response['result']}")
-            return response['result']
-        else:
-            print(f"Transaction failed: {response}")
-            return None
+        return self.send_transaction(transaction, from_keypair)
 
     def transfer_tokens_back_to_head_huncho(self, wallet_address, mint_address):
-        balance_in_tokens = self.get_token_balance(wallet_address, mint_address)
-        if balance_in_tokens is None or balance_in_tokens == 0:
-            print("No tokens to transfer.")
+        from solana.transaction import Transaction
+        balance = self.get_token_amount(str(self.public_keys[wallet_address]), mint_address)
+        if balance is None or balance.amount == 0:
+            log("No tokens to transfer.")
             return None
-        
-        url_transfer = "https://pumpapi.fun/api/transfer"
-        payload_transfer = {
-            "from": wallet_address,
-            "to": self.public_keys['HEAD_HUNCHO_PRIVATE_KEY'],
-            "amount": balance_in_tokens,
-            "mint": mint_address,
-            "userPrivateKey": self.keys[wallet_address]
-        }
-        
-        response_transfer = requests.post(url_transfer, json=payload_transfer)
-        if response_transfer.status_code == 200:
-            transfer_data = response_transfer.json()
-            print(f"Transfer Transaction ID: {transfer_data['tx_hash']}")
-            return transfer_data
-        else:
-            print(f"Error executing token transfer: {response_transfer.status_code} - {response_transfer.text}")
+
+        # Built and signed locally like every other transfer; the private key never leaves this process
+        from_keypair = self.registry.keypair(self.keys[wallet_address])
+        transaction = Transaction()
+        transaction.add(self.token_transfer_instruction(from_keypair.public_key, self.public_keys['HEAD_HUNCHO_PRIVATE_KEY'],
+                                                        mint_address, balance))
+        signature = self.send_transaction(transaction, from_keypair)
+        if signature is None:
             return None
+        log(f"Transfer Transaction ID: {signature}")
+        return {"tx_hash": signature}
 
 # Sample usage
 if __name__ == "__main__":
@@ -212,7 +199,7 @@ if __name__ == "__main__":
     mint_address = "DpbbGCQSxTrQc6jPAbSHzptnnr2FbowwJGWE3aevTbev"
     amount_in_sol = 0.01
     slippage = 0.01  # Example slippage
-    priority_fee = 0.003  # Example priority fee
+    priority_fee = "fast"  # a landing speed priced from recent fees, or a fixed amount in SOL
 
     for key_name in ['PRIVATE_KEY2', 'PRIVATE_KEY3', 'PRIVATE_KEY4', 'PRIVATE_KEY5', 'PRIVATE_KEY6', 'PRIVATE_KEY7', 'PRIVATE_KEY8']:
         print(f"Buying with {key_name}...")
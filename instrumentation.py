@@ -0,0 +1,198 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+VERBOSE_ENV = "PUMFUN_VERBOSE"    # "0" silences the progress prints of the wallet managers
+METRICS_ENV = "PUMFUN_METRICS"    # "0" turns spans and histograms into no-ops
+METRIC_NAME = "pumfun_stage_seconds"
+# Prometheus-style upper bounds in seconds, from sub-millisecond signing up to slow confirmations
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+MAX_SPANS = 10_000  # finished spans kept in memory for dump_spans
+
+verbose = os.getenv(VERBOSE_ENV, "1") != "0"
+enabled = os.getenv(METRICS_ENV, "1") != "0"
+
+
+def set_verbose(value):
+    global verbose
+    verbose = bool(value)
+
+
+def log(*args, **kwargs):
+    """print() that the PUMFUN_VERBOSE switch (or set_verbose) can turn off."""
+    if verbose:
+        print(*args, **kwargs)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, the shape Prometheus expects."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        index = 0
+        for bound in self.buckets:
+            if seconds <= bound:
+                break
+            index += 1
+        self.counts[index] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bucket bound below which a fraction `q` of observations fall."""
+        if not self.count:
+            return None
+        target, seen = q * self.count, 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """Histograms per (stage, labels) plus a ring buffer of finished spans."""
+
+    def __init__(self, max_spans=MAX_SPANS):
+        self.histograms = {}
+        self.spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, **labels):
+        key = (stage, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def record_span(self, span):
+        self.spans.append(span)
+
+    def summary(self):
+        """{stage: {"count", "p50", "p99", "mean"}} for a quick look without a Prometheus server."""
+        with self._lock:
+            items = list(self.histograms.items())
+        table = {}
+        for (stage, labels), histogram in items:
+            name = stage + "".join(f" {key}={value}" for key, value in labels)
+            table[name] = {"count": histogram.count, "p50": histogram.quantile(0.5), "p99": histogram.quantile(0.99),
+                           "mean": histogram.sum / histogram.count if histogram.count else None}
+        return table
+
+    def prometheus_text(self):
+        lines = [f"# HELP {METRIC_NAME} Time spent per WalletManager stage.", f"# TYPE {METRIC_NAME} histogram"]
+        with self._lock:
+            items = sorted(self.histograms.items())
+            for (stage, labels), histogram in items:
+                label_text = ",".join([f'stage="{stage}"'] + [f'{key}="{value}"' for key, value in labels])
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{METRIC_NAME}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+                lines.append(f'{METRIC_NAME}_bucket{{{label_text},le="+Inf"}} {histogram.count}')
+                lines.append(f"{METRIC_NAME}_sum{{{label_text}}} {histogram.sum}")
+                lines.append(f"{METRIC_NAME}_count{{{label_text}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write the text exposition atomically, e.g. for node_exporter's textfile collector."""
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(temporary, path)
+
+    def dump_spans(self, path):
+        """Append the buffered spans to `path` as JSON lines and clear the buffer."""
+        spans = []
+        while self.spans:
+            spans.append(self.spans.popleft())
+        with open(path, "a") as f:
+            for span in spans:
+                f.write(json.dumps(span) + "\n")
+        return len(spans)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+        self.spans.clear()
+
+
+metrics = Metrics()
+_local = threading.local()
+_ids = iter(range(1, 1 << 62))
+_ids_lock = threading.Lock()
+
+
+def _next_id():
+    with _ids_lock:
+        return next(_ids)
+
+
+class span:
+    """Time a stage: `with span("sign"):` records it in the stage histogram and as a trace span.
+
+    Spans opened inside another span on the same thread become its children and share its trace id.
+    """
+
+    __slots__ = ("stage", "labels", "record", "start", "parent")
+
+    def __init__(self, stage, **labels):
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        if not enabled:
+            return self
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1] if stack else None
+        self.record = {
+            "name": self.stage,
+            "trace_id": self.parent["trace_id"] if self.parent else _next_id(),
+            "span_id": _next_id(),
+            "parent_id": self.parent["span_id"] if self.parent else None,
+            "start_ns": time.time_ns(),
+            "attributes": self.labels,
+        }
+        stack.append(self.record)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if not enabled:
+            return False
+        duration = time.perf_counter() - self.start
+        _local.stack.pop()
+        self.record["duration_ms"] = duration * 1e3
+        if exc is not None:
+            self.record["error"] = repr(exc)
+        metrics.observe(self.stage, duration, **self.labels)
+        metrics.record_span(self.record)
+        return False
+
+
+def observe(stage, seconds, **labels):
+    """Record a duration measured elsewhere (e.g. send-to-confirmation, which spans threads)."""
+    if enabled:
+        metrics.observe(stage, seconds, **labels)
+
+
+def timed(stage, **labels):
+    """Decorator form of `span`."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,255 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import wait
+
+from instrumentation import log
+
+JOURNAL_FILE = "journal.sqlite3"
+SETTLE_TIMEOUT = 90  # seconds; a blockhash is dead after ~60-90 s, so every in-flight send is decided by then
+MAX_ATTEMPTS = 3     # sends per step before an expiring transaction is given up on
+HEARTBEAT_INTERVAL = 10  # seconds between lease renewals of the runs this process owns
+LEASE_TIMEOUT = 60       # seconds without a renewal before another process may take a run over
+
+PLANNED = "planned"
+SENT = "sent"
+CONFIRMED = "confirmed"
+FAILED = "failed"
+OPEN_STATES = (PLANNED, SENT)
+
+Step = namedtuple("Step", ["step", "params", "state", "signature", "last_valid_block_height", "error"])
+
+
+class Journal:
+    """Append-only log of fleet operations in SQLite (WAL mode), so an interrupted run resumes instead of re-sending.
+
+    A run is planned as named steps and (run, step) is the idempotency key. Every transition appends an
+    event: planned, sent (with its signature, committed *before* the broadcast), confirmed or failed, and
+    a step's state is its latest event. On restart only the steps still planned or sent need work: sent
+    ones are settled against the chain (landed: confirmed; blockhash expired: planned again), so recovery
+    costs follow the work that was in flight rather than the size of the fleet. Each phase of a run is
+    written in one transaction, i.e. one fsync however many wallets it covers.
+
+    Several processes may share the file (the daemon and a cron script, say). Every run carries a lease:
+    its owner ("host:pid") and a heartbeat renewed every HEARTBEAT_INTERVAL while the owner lives. A
+    run is only taken over once its owner's process is gone or its heartbeat is LEASE_TIMEOUT old, and
+    the takeover is a single write transaction, so two processes never resume the same run.
+    """
+
+    def __init__(self, path=JOURNAL_FILE, owner=None, lease_timeout=LEASE_TIMEOUT):
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_timeout = lease_timeout
+        self._lock = threading.Lock()
+        self._tracked = {}  # signature -> confirmation future, until taken by take_tracked
+        self._heartbeat = None
+        self._stop = threading.Event()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")  # a sent record must survive a power cut, not just a crash
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS runs "
+            "(run TEXT PRIMARY KEY, kind TEXT NOT NULL, started_at REAL, finished_at REAL, owner TEXT, "
+            "heartbeat REAL);"
+            "CREATE INDEX IF NOT EXISTS runs_open ON runs (kind, finished_at);"
+            "CREATE TABLE IF NOT EXISTS steps "
+            "(run TEXT NOT NULL, step TEXT NOT NULL, params TEXT, PRIMARY KEY (run, step));"
+            "CREATE TABLE IF NOT EXISTS events "
+            "(seq INTEGER PRIMARY KEY AUTOINCREMENT, run TEXT NOT NULL, step TEXT NOT NULL, state TEXT NOT NULL, "
+            "signature TEXT, last_valid_block_height INTEGER, error TEXT, at REAL);"
+            "CREATE INDEX IF NOT EXISTS events_step ON events (run, step, seq);"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(runs)")}
+        for column, kind in (("owner", "TEXT"), ("heartbeat", "REAL")):
+            if column not in columns:  # a journal written before runs had leases
+                self._db.execute(f"ALTER TABLE runs ADD COLUMN {column} {kind}")
+        self._db.commit()
+
+    def open_run(self, kind, tracker, timeout=SETTLE_TIMEOUT):
+        """(run id, steps): an interrupted run of `kind` with steps left to send, else a new run and [].
+
+        Unfinished runs whose lease lapsed are taken over and settled against the chain first. One that
+        still has planned steps is resumed; one that has none is finished (or, if its sends are still
+        undecided, left for a later process) and the caller's request gets a fresh run. Runs this process
+        owns, or another live process still renews, are never resumed.
+        """
+        while True:
+            run = self._claim(kind)
+            if run is None:
+                break
+            steps = self.settle(run, tracker, timeout)
+            if any(step.state == PLANNED for step in steps):
+                return run, steps
+            self.finish_if_done(run)
+        run = f"{kind}:{time.time_ns()}"
+        with self._lock:
+            self._db.execute("INSERT INTO runs (run, kind, started_at, owner, heartbeat) VALUES (?, ?, ?, ?, ?)",
+                             (run, kind, time.time(), self.owner, time.time()))
+            self._db.commit()
+        self._start_heartbeat()
+        return run, []
+
+    def _claim(self, kind):
+        """Take over the newest unfinished run of `kind` whose lease has lapsed; None if there is none."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")  # holds the write lock from the lease check to the takeover
+            try:
+                rows = self._db.execute(
+                    "SELECT run, owner, heartbeat FROM runs WHERE kind = ? AND finished_at IS NULL "
+                    "ORDER BY started_at DESC", (kind,)
+                ).fetchall()
+                run = next((run for run, owner, heartbeat in rows if self._lapsed(owner, heartbeat)), None)
+                if run is not None:
+                    self._db.execute("UPDATE runs SET owner = ?, heartbeat = ? WHERE run = ?",
+                                     (self.owner, time.time(), run))
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+        if run is not None:
+            self._start_heartbeat()
+        return run
+
+    def _lapsed(self, owner, heartbeat):
+        if owner == self.owner:
+            return False  # ours: its confirmations are still being tracked
+        if owner is None or heartbeat is None or time.time() - heartbeat > self.lease_timeout:
+            return True
+        host, _, pid = owner.rpartition(":")
+        if host != socket.gethostname() or not pid.isdigit():
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True  # the owner died on this host; no need to wait out its lease
+        except PermissionError:
+            pass
+        return False
+
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._heartbeat is None:
+                self._stop.clear()
+                self._heartbeat = threading.Thread(target=self._renew, name="journal-heartbeat", daemon=True)
+                self._heartbeat.start()
+
+    def _renew(self):
+        while not self._stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                with self._lock:
+                    self._db.execute("UPDATE runs SET heartbeat = ? WHERE owner = ? AND finished_at IS NULL",
+                                     (time.time(), self.owner))
+                    self._db.commit()
+            except Exception as e:
+                log(f"Journal heartbeat failed: {e}")
+
+    def plan(self, run, steps):
+        """Record [(step, params)] as planned; steps already in the run keep their state."""
+        now = time.time()
+        with self._lock:
+            for step, params in steps:
+                inserted = self._db.execute(
+                    "INSERT OR IGNORE INTO steps (run, step, params) VALUES (?, ?, ?)", (run, step, json.dumps(params))
+                ).rowcount
+                if inserted:
+                    self._db.execute("INSERT INTO events (run, step, state, at) VALUES (?, ?, ?, ?)",
+                                     (run, step, PLANNED, now))
+            self._db.commit()
+
+    def record(self, run, events):
+        """Append [(step, state, signature, last_valid_block_height, error)] in one transaction."""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO events (run, step, state, signature, last_valid_block_height, error, at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(run, step, state, signature, height, error, now) for step, state, signature, height, error in events],
+            )
+            self._db.commit()
+
+    def mark_sent(self, run, sent):
+        """[(step, signature, last_valid_block_height)]; call after signing and before broadcasting."""
+        self.record(run, [(step, SENT, signature, height, None) for step, signature, height in sent])
+
+    def mark(self, run, steps, state, error=None):
+        self.record(run, [(step, state, None, None, error) for step in steps])
+
+    def steps(self, run, states=None):
+        """Current state of every step of `run` (optionally only those in `states`), in plan order."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT s.step, s.params, e.state, e.signature, e.last_valid_block_height, e.error "
+                "FROM steps s JOIN events e ON e.seq = "
+                "(SELECT MAX(seq) FROM events WHERE run = s.run AND step = s.step) "
+                "WHERE s.run = ? ORDER BY s.rowid", (run,)
+            ).fetchall()
+        steps = [Step(step, json.loads(params), state, signature, height, error)
+                 for step, params, state, signature, height, error in rows]
+        return steps if states is None else [step for step in steps if step.state in states]
+
+    def attempts(self, run, step):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM events WHERE run = ? AND step = ? AND state = ?",
+                                    (run, step, SENT)).fetchone()[0]
+
+    def finish_if_done(self, run):
+        if self.steps(run, OPEN_STATES):
+            return False
+        with self._lock:
+            self._db.execute("UPDATE runs SET finished_at = ? WHERE run = ? AND finished_at IS NULL",
+                             (time.time(), run))
+            self._db.commit()
+        return True
+
+    # --- confirmations ----------------------------------------------------------------------
+
+    def _outcome(self, run, steps, future):
+        from confirmation_tracker import TransactionExpired
+        error = future.exception()
+        if error is None:
+            self.mark(run, steps, CONFIRMED)
+        elif isinstance(error, TransactionExpired) and self.attempts(run, steps[0]) < MAX_ATTEMPTS:
+            self.mark(run, steps, PLANNED, str(error))  # never executed, safe to send again
+        else:
+            self.mark(run, steps, FAILED, str(error))
+        self.finish_if_done(run)
+
+    def track(self, run, steps, signature, last_valid_block_height, tracker):
+        """Record the outcome of the transaction carrying `steps` once `tracker` resolves it."""
+        future = tracker.track(signature, last_valid_block_height,
+                               callback=lambda future: self._outcome(run, steps, future))
+        with self._lock:
+            self._tracked[signature] = future
+        return future
+
+    def take_tracked(self):
+        """Hand over the confirmation futures of everything tracked so far, as {signature: future}."""
+        with self._lock:
+            tracked, self._tracked = self._tracked, {}
+        return tracked
+
+    def settle(self, run, tracker, timeout=SETTLE_TIMEOUT):
+        """Resolve the sent-but-unsettled steps of an interrupted run against the chain; returns its steps.
+
+        Steps whose transaction cannot be decided within `timeout` stay sent and are never re-sent here.
+        """
+        by_signature = {}
+        for step in self.steps(run, (SENT,)):
+            by_signature.setdefault((step.signature, step.last_valid_block_height), []).append(step.step)
+        futures = {tracker.track(signature, height): steps for (signature, height), steps in by_signature.items()}
+        wait(futures, timeout=timeout)
+        for future, steps in futures.items():
+            if future.done():
+                self._outcome(run, steps, future)
+        return self.steps(run)
+
+    def close(self):
+        self._stop.set()
+        self._heartbeat = None
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
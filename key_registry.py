@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+
+import base58
+from solana.keypair import Keypair
+from solana.publickey import PublicKey
+from spl.token.constants import ASSOCIATED_TOKEN_PROGRAM_ID, TOKEN_PROGRAM_ID
+
+ATA_CACHE_SIZE = 4096
+
+
+def derive_associated_token_address(wallet_address, token_mint_address):
+    """Uncached ATA derivation (iterated SHA-256 bump search)."""
+    return PublicKey.find_program_address(
+        [bytes(PublicKey(wallet_address)), bytes(TOKEN_PROGRAM_ID), bytes(PublicKey(token_mint_address))],
+        ASSOCIATED_TOKEN_PROGRAM_ID,
+    )[0]
+
+
+class KeyRegistry:
+    """Keypairs decoded once per private key, plus an LRU of (owner, mint) -> associated token address."""
+
+    def __init__(self, ata_cache_size=ATA_CACHE_SIZE):
+        self.ata_cache_size = ata_cache_size
+        self._keypairs = {}
+        self._atas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def keypair(self, private_key_str):
+        keypair = self._keypairs.get(private_key_str)
+        if keypair is None:
+            keypair = Keypair.from_secret_key(base58.b58decode(private_key_str))
+            self._keypairs[private_key_str] = keypair
+        return keypair
+
+    def public_key(self, private_key_str):
+        return self.keypair(private_key_str).public_key
+
+    def associated_token_address(self, wallet_address, token_mint_address):
+        key = (str(wallet_address), str(token_mint_address))
+        with self._lock:
+            ata = self._atas.get(key)
+            if ata is not None:
+                self._atas.move_to_end(key)
+                return ata
+        ata = derive_associated_token_address(wallet_address, token_mint_address)
+        with self._lock:
+            self._atas[key] = ata
+            if len(self._atas) > self.ata_cache_size:
+                self._atas.popitem(last=False)
+        return ata
+
+    def precompute_atas(self, wallet_addresses, token_mint_address):
+        """Derive the ATA of every wallet for a mint up front, e.g. before a fleet-wide sweep."""
+        return {str(wallet): self.associated_token_address(wallet, token_mint_address) for wallet in wallet_addresses}
+
+
+_registry = KeyRegistry()
+
+
+def get_registry():
+    return _registry
+
+
+def get_associated_token_address(wallet_address, token_mint_address):
+    """Get the associated token address for a wallet and mint."""
+    return _registry.associated_token_address(wallet_address, token_mint_address)
@@ -0,0 +1,239 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Mapping
+
+import base58
+from dotenv import dotenv_values, load_dotenv
+from nacl.secret import SecretBox
+from nacl.utils import random as random_bytes
+from solana.publickey import PublicKey
+
+KEYSTORE_FILE = "wallets.keystore"
+KEYSTORE_PASSWORD_ENV = "KEYSTORE_PASSWORD"
+HEAD_KEY_NAME = "HEAD_HUNCHO_PRIVATE_KEY"
+
+MAGIC = b"PFKS"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBB16sI4x")  # magic, version, log2(N), r, p, salt, count
+SCRYPT_LOG2_N = 15
+SCRYPT_R = 8
+SCRYPT_P = 1
+SEED_SIZE = 32
+# public key in the clear (no decryption needed to list or query the fleet) + nonce + sealed seed
+RECORD_SIZE = 32 + SecretBox.NONCE_SIZE + SEED_SIZE + SecretBox.MACBYTES
+
+
+def key_name(index):
+    """Index 0 is Head Huncho; index i is the wallet the env file called PRIVATE_KEY{i + 1}."""
+    return HEAD_KEY_NAME if index == 0 else f"PRIVATE_KEY{index + 1}"
+
+
+def key_index(name):
+    if name == HEAD_KEY_NAME:
+        return 0
+    if name.startswith("PRIVATE_KEY") and name[11:].isdigit() and int(name[11:]) >= 2:
+        return int(name[11:]) - 1
+    raise KeyError(name)
+
+
+def _derive_key(password, salt, log2_n, r, p):
+    n = 1 << log2_n
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=SecretBox.KEY_SIZE)
+
+
+class _KeyView(Mapping):
+    """Read-only name -> value view over a key source; values are produced on access, never up front."""
+
+    def __init__(self, source, getter):
+        self._source = source
+        self._getter = getter
+
+    def __getitem__(self, name):
+        index = key_index(name)
+        if index >= len(self._source):
+            raise KeyError(name)
+        return self._getter(index)
+
+    def __contains__(self, name):
+        # Mapping's default would call __getitem__, i.e. decrypt a private key just to test membership
+        try:
+            return key_index(name) < len(self._source)
+        except (KeyError, AttributeError):
+            return False
+
+    def __iter__(self):
+        return (key_name(index) for index in range(len(self._source)))
+
+    def __len__(self):
+        return len(self._source)
+
+
+class KeyStore:
+    """Encrypted fixed-size-record wallet file, memory-mapped and decrypted one key at a time.
+
+    Layout: a 32-byte header (magic, version, scrypt parameters, salt, count) followed by one
+    104-byte record per wallet: the public key in the clear, then the 32-byte seed sealed with
+    XSalsa20-Poly1305 under a key scrypt-derived from the password. Opening the store reads the
+    header only; the password is stretched on the first decryption and each seed is unsealed when
+    its private key is asked for, so startup cost and memory do not grow with the fleet.
+    """
+
+    def __init__(self, path=KEYSTORE_FILE, password=None):
+        self.path = path
+        self.password = password if password is not None else os.getenv(KEYSTORE_PASSWORD_ENV)
+        self._file = open(path, "r+b")
+        self._box = None
+        self._map = None
+        self._read_header()
+
+    @classmethod
+    def create(cls, path=KEYSTORE_FILE, password=None, log2_n=SCRYPT_LOG2_N, r=SCRYPT_R, p=SCRYPT_P):
+        if os.path.exists(path):
+            raise Exception(f"Keystore {path} already exists")
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, log2_n, r, p, random_bytes(16), 0))
+        return cls(path, password)
+
+    def _read_header(self):
+        self._file.seek(0)
+        header = self._file.read(HEADER.size)
+        if len(header) != HEADER.size:
+            raise Exception(f"{self.path} is not a keystore")
+        magic, version, self.log2_n, self.r, self.p, self.salt, self.count = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise Exception(f"{self.path} is not a version {VERSION} keystore")
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.count else None
+
+    def __len__(self):
+        return self.count
+
+    def _record(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        offset = HEADER.size + index * RECORD_SIZE
+        return self._map[offset:offset + RECORD_SIZE]
+
+    def _secret_box(self):
+        if self._box is None:
+            if not self.password:
+                raise Exception(f"Set {KEYSTORE_PASSWORD_ENV} to unlock {self.path}")
+            self._box = SecretBox(_derive_key(self.password, self.salt, self.log2_n, self.r, self.p))
+        return self._box
+
+    def sealing_key(self):
+        """Raw SecretBox key, for sealing records in worker processes without re-running scrypt."""
+        return bytes(self._secret_box())
+
+    def public_key(self, index):
+        return PublicKey(self._record(index)[:32])
+
+    def private_key(self, index):
+        """Base58 64-byte secret key (seed + public key), the same string the env file held."""
+        record = self._record(index)
+        seed = self._secret_box().decrypt(record[32:])
+        return base58.b58encode(seed + record[:32]).decode()
+
+    def private_keys(self):
+        return _KeyView(self, self.private_key)
+
+    def public_keys(self):
+        return _KeyView(self, self.public_key)
+
+    def seal(self, secret_key):
+        """Encode a 64-byte secret key (raw or base58) as one record."""
+        if isinstance(secret_key, str):
+            secret_key = base58.b58decode(secret_key)
+        if len(secret_key) != 64:
+            raise Exception(f"Expected a 64-byte secret key, got {len(secret_key)} bytes")
+        return secret_key[32:] + bytes(self._secret_box().encrypt(secret_key[:32]))
+
+    def append_records(self, records):
+        """Append pre-sealed records (see `seal`); returns the index of the first one.
+
+        The file is locked and the header re-read first, so concurrent writers never reuse an index.
+        """
+        data = b"".join(records)
+        if len(data) % RECORD_SIZE:
+            raise Exception("Keystore records must be whole")
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        try:
+            self._read_header()
+            first = self.count
+            self._file.seek(HEADER.size + first * RECORD_SIZE)
+            self._file.write(data)
+            self._file.seek(0)
+            self._file.write(HEADER.pack(MAGIC, VERSION, self.log2_n, self.r, self.p, self.salt,
+                                         first + len(data) // RECORD_SIZE))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._read_header()
+        finally:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        return first
+
+    def append(self, secret_keys):
+        return self.append_records([self.seal(secret_key) for secret_key in secret_keys])
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+class EnvKeySource:
+    """The legacy wallet_keys.env layout behind the same lazy interface as KeyStore."""
+
+    def __init__(self, env_file="wallet_keys.env"):
+        values = dotenv_values(env_file)
+        self._private_keys = []
+        while True:
+            private_key = values.get(key_name(len(self._private_keys))) or os.getenv(key_name(len(self._private_keys)))
+            if not private_key:
+                break
+            self._private_keys.append(private_key)
+
+    def __len__(self):
+        return len(self._private_keys)
+
+    def private_key(self, index):
+        return self._private_keys[index]
+
+    def public_key(self, index):
+        return PublicKey(base58.b58decode(self._private_keys[index])[32:])
+
+    def private_keys(self):
+        return _KeyView(self, self.private_key)
+
+    def public_keys(self):
+        return _KeyView(self, self.public_key)
+
+
+def open_key_source(env_file="wallet_keys.env", keystore_path=KEYSTORE_FILE):
+    """The encrypted keystore when one exists, otherwise the keys listed in the env file."""
+    if keystore_path and os.path.exists(keystore_path):
+        return KeyStore(keystore_path)
+    return EnvKeySource(env_file)
+
+
+def import_env(env_file="wallet_keys.env", keystore_path=KEYSTORE_FILE, password=None):
+    """Copy HEAD_HUNCHO_PRIVATE_KEY, PRIVATE_KEY2, ... from an env file into a new keystore."""
+    source = EnvKeySource(env_file)
+    store = KeyStore.create(keystore_path, password)
+    store.append(source.private_key(index) for index in range(len(source)))
+    return store
+
+
+if __name__ == "__main__":
+    env_file = sys.argv[1] if len(sys.argv) > 1 else "wallet_keys.env"
+    keystore_path = sys.argv[2] if len(sys.argv) > 2 else KEYSTORE_FILE
+    load_dotenv(env_file)
+    store = import_env(env_file, keystore_path)
+    print(f"Imported {len(store)} wallets from {env_file} into {keystore_path}")
+    store.close()
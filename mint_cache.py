@@ -0,0 +1,79 @@
+import sqlite3
+import threading
+import time
+
+MINT_CACHE_FILE = "mint_cache.sqlite3"
+DEFAULT_SUPPLY_TTL = 60  # seconds; decimals never change so they never expire
+
+
+class MintCache:
+    """Per-mint decimals and supply, kept in memory and optionally persisted to SQLite.
+
+    `fetch(mint)` must return `(decimals, supply)`, e.g. from one getTokenSupply call, and is only
+    invoked when the mint is unknown or its supply is older than `supply_ttl`.
+    """
+
+    def __init__(self, path=None, supply_ttl=DEFAULT_SUPPLY_TTL):
+        self.supply_ttl = supply_ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS mints "
+                "(mint TEXT PRIMARY KEY, decimals INTEGER NOT NULL, supply TEXT, supply_at REAL)"
+            )
+            self._db.commit()
+
+    def get(self, mint_address):
+        mint_address = str(mint_address)
+        entry = self._entries.get(mint_address)
+        if entry is None and self._db is not None:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT decimals, supply, supply_at FROM mints WHERE mint = ?", (mint_address,)
+                ).fetchone()
+            if row:
+                entry = {"decimals": row[0], "supply": int(row[1]) if row[1] is not None else None,
+                         "supply_at": row[2]}
+                self._entries[mint_address] = entry
+        return entry
+
+    def put(self, mint_address, decimals, supply=None):
+        mint_address = str(mint_address)
+        entry = {"decimals": decimals, "supply": supply, "supply_at": time.time() if supply is not None else None}
+        with self._lock:
+            previous = self._entries.get(mint_address)
+            if supply is None and previous is not None:
+                entry["supply"], entry["supply_at"] = previous["supply"], previous["supply_at"]
+            self._entries[mint_address] = entry
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO mints (mint, decimals, supply, supply_at) VALUES (?, ?, ?, ?)",
+                    (mint_address, decimals, str(entry["supply"]) if entry["supply"] is not None else None,
+                     entry["supply_at"]),
+                )
+                self._db.commit()
+        return entry
+
+    def _refresh(self, mint_address, fetch):
+        decimals, supply = fetch(mint_address)
+        return self.put(mint_address, decimals, supply)
+
+    def get_decimals(self, mint_address, fetch):
+        entry = self.get(mint_address)
+        if entry is None:
+            entry = self._refresh(mint_address, fetch)
+        return entry["decimals"]
+
+    def get_supply(self, mint_address, fetch):
+        entry = self.get(mint_address)
+        if entry is None or entry["supply_at"] is None or time.time() - entry["supply_at"] > self.supply_ttl:
+            entry = self._refresh(mint_address, fetch)
+        return entry["supply"]
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,425 @@
+import asyncio
+import base64
+import itertools
+import json
+import os
+import random
+import socket
+import struct
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import base58
+import websockets
+from solana.publickey import PublicKey
+
+from bonding_curve import (
+    CURVE_DISCRIMINATOR, CURVE_LAYOUT, PUMP_PROGRAM_ID, PUMP_TOKEN_DECIMALS, BondingCurveState, buy_tokens_out,
+    get_bonding_curve_address, sell_sol_out, sol_for_curve, with_slippage,
+)
+from key_registry import get_associated_token_address
+
+SYSTEM_OWNER = "11111111111111111111111111111111"
+TOKEN_OWNER = "TokenkegQfeZyiNwAmrWUFeXDXTjzDBDXhwoKL1JCWA"
+LAMPORTS_PER_TOKEN_ACCOUNT = 2_039_280
+BLOCKS_PER_SECOND = 2.5
+BLOCKHASH_VALIDITY = 150
+# Compute units simulateTransaction charges per instruction, by program (unknown programs: 200k)
+SIMULATED_UNITS = {
+    "ComputeBudget111111111111111111111111111111": 150,
+    SYSTEM_OWNER: 150,
+    TOKEN_OWNER: 6_200,
+    "ATokenGPvbdGVxr1b2hvZbsiqW5xWH25efTNsLJA8knL": 4_500,
+    str(PUMP_PROGRAM_ID): 38_000,
+}
+# A fresh pump.fun curve: 1.073B virtual tokens against 30 virtual SOL
+DEFAULT_CURVE = BondingCurveState(1_073_000_000_000_000, 30_000_000_000, 793_100_000_000_000, 0,
+                                  1_000_000_000_000_000, False)
+
+
+def _account(lamports, data=b"", owner=SYSTEM_OWNER):
+    return {"lamports": lamports, "data": data, "owner": owner}
+
+
+def _token_account_data(mint, owner, amount):
+    return bytes(PublicKey(mint)) + bytes(PublicKey(owner)) + struct.pack("<Q", amount) + bytes(165 - 72)
+
+
+def _mint_data(supply, decimals):
+    return bytes(36) + struct.pack("<QB?", supply, decimals, True) + bytes(36)
+
+
+class MockChain:
+    """Just enough ledger state for the methods WalletManager calls: lamports, mints, token accounts, curves."""
+
+    def __init__(self):
+        self.accounts = {}
+        self.holdings = {}     # (owner, mint) -> token amount
+        self.decimals = {}
+        self.signatures = {}   # signature -> slot it landed in
+        self.started = time.monotonic()
+        self.listeners = []    # called with ("account", address) or ("signature", signature) after each change
+        self._lock = threading.Lock()
+
+    def _changed(self, kind, key):
+        for listener in self.listeners:
+            listener(kind, key)
+
+    def slot(self):
+        return int((time.monotonic() - self.started) * BLOCKS_PER_SECOND) + 1
+
+    def fund(self, address, lamports):
+        with self._lock:
+            self.accounts[str(address)] = _account(lamports)
+        self._changed("account", str(address))
+
+    def add_mint(self, mint, supply=1_000_000_000_000_000, decimals=PUMP_TOKEN_DECIMALS, curve=DEFAULT_CURVE):
+        mint = str(mint)
+        with self._lock:
+            self.decimals[mint] = decimals
+            self.accounts[mint] = _account(1_461_600, _mint_data(supply, decimals), TOKEN_OWNER)
+        self._changed("account", mint)
+        if curve is not None:
+            self.set_curve(mint, curve)
+
+    def set_curve(self, mint, curve):
+        address = str(get_bonding_curve_address(mint))
+        with self._lock:
+            self.accounts[address] = _account(1_000_000, CURVE_LAYOUT.pack(CURVE_DISCRIMINATOR, *curve), str(PUMP_PROGRAM_ID))
+        self._changed("account", address)
+
+    def set_tokens(self, owner, mint, amount):
+        owner, mint = str(owner), str(mint)
+        ata = str(get_associated_token_address(owner, mint))
+        with self._lock:
+            self.holdings[(owner, mint)] = amount
+            self.accounts[ata] = _account(LAMPORTS_PER_TOKEN_ACCOUNT, _token_account_data(mint, owner, amount), TOKEN_OWNER)
+        self._changed("account", ata)
+
+    def curve(self, mint):
+        account = self.accounts.get(str(get_bonding_curve_address(mint)))
+        return BondingCurveState(*CURVE_LAYOUT.unpack_from(account["data"])[1:]) if account else None
+
+    def land(self, signature):
+        with self._lock:
+            self.signatures[signature] = self.slot()
+        self._changed("signature", signature)
+
+
+class MockServer:
+    """Local stand-in for mainnet RPC and pumpapi.fun, for offline benchmarks.
+
+    Serves the JSON-RPC methods the wallet managers use (single and batched) at `url` and the pumpapi
+    `/api/quote`, `/api/trade` and `/api/transfer` endpoints under `api_url`. Every HTTP request is
+    delayed by `latency` plus up to `jitter` seconds, answered 429 beyond `rate_limit` requests per
+    second, and answered 500 with probability `error_rate`. A websocket at `ws_url` serves
+    accountSubscribe and signatureSubscribe, pushing notifications as the chain changes.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, rate_limit=0, error_rate=0.0, chain=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.chain = chain or MockChain()
+        self.counts = {}
+        self.throttled = 0
+        self.failed = 0
+        self._window = (0, 0)
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.mock = self
+        self.url = f"http://{host}:{self.httpd.server_port}"
+        self.api_url = f"{self.url}/api"
+        self._ws_socket = socket.create_server((host, 0))
+        self.ws_url = f"ws://{host}:{self._ws_socket.getsockname()[1]}"
+        self._subscriptions = {}  # subscription id -> (websocket, kind, key, options)
+        self._subscription_ids = itertools.count(1)
+        self._loop = None
+        self._thread = None
+        self.chain.listeners.append(self._changed)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-server", daemon=True)
+        self._thread.start()
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        threading.Thread(target=self._loop.run_until_complete, args=(self._serve_ws(ready),), name="mock-server-ws",
+                         daemon=True).start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._ws_stop.set)
+
+    # --- fault injection ----------------------------------------------------------------------
+
+    def admit(self):
+        """Return the HTTP status to fail this request with, or None to serve it."""
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            if self.rate_limit:
+                second = int(time.monotonic())
+                window, count = self._window
+                count = count + 1 if window == second else 1
+                self._window = (second, count)
+                if count > self.rate_limit:
+                    self.throttled += 1
+                    return 429
+            if self.error_rate and random.random() < self.error_rate:
+                self.failed += 1
+                return 500
+        return None
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    # --- JSON-RPC -----------------------------------------------------------------------------
+
+    def rpc(self, request):
+        method, params = request.get("method"), request.get("params") or []
+        self._count(method)
+        handler = getattr(self, f"_rpc_{method}", None)
+        reply = {"jsonrpc": "2.0", "id": request.get("id")}
+        if handler is None:
+            reply["error"] = {"code": -32601, "message": f"Method not found: {method}"}
+        else:
+            try:
+                reply["result"] = handler(*params)
+            except Exception as e:
+                reply["error"] = {"code": -32602, "message": str(e)}
+        return reply
+
+    def _context(self, value):
+        return {"context": {"slot": self.chain.slot()}, "value": value}
+
+    def _encode(self, account, options):
+        if account is None:
+            return None
+        data = account["data"]
+        data_slice = (options or {}).get("dataSlice")
+        if data_slice:
+            data = data[data_slice["offset"]:data_slice["offset"] + data_slice["length"]]
+        return {"lamports": account["lamports"], "owner": account["owner"], "executable": False, "rentEpoch": 0,
+                "data": [base64.b64encode(data).decode(), "base64"]}
+
+    def _rpc_getHealth(self):
+        return "ok"
+
+    def _rpc_getSlot(self, options=None):
+        return self.chain.slot()
+
+    def _rpc_getBlockHeight(self, options=None):
+        return self.chain.slot()
+
+    def _rpc_getBalance(self, address, options=None):
+        account = self.chain.accounts.get(address)
+        return self._context(account["lamports"] if account else 0)
+
+    def _rpc_getAccountInfo(self, address, options=None):
+        return self._context(self._encode(self.chain.accounts.get(address), options))
+
+    def _rpc_getMultipleAccounts(self, addresses, options=None):
+        return self._context([self._encode(self.chain.accounts.get(address), options) for address in addresses])
+
+    def _rpc_getTokenAccountsByOwner(self, owner, query, options=None):
+        mint = query.get("mint")
+        if (owner, mint) not in self.chain.holdings:
+            return self._context([])
+        ata = str(get_associated_token_address(owner, mint))
+        if (options or {}).get("encoding") != "jsonParsed":
+            return self._context([{"pubkey": ata, "account": self._encode(self.chain.accounts[ata], options)}])
+        amount, decimals = self.chain.holdings[(owner, mint)], self.chain.decimals.get(mint, 0)
+        info = {"mint": mint, "owner": owner, "state": "initialized", "isNative": False, "tokenAmount": {
+            "amount": str(amount), "decimals": decimals, "uiAmount": amount / 10 ** decimals,
+            "uiAmountString": str(amount / 10 ** decimals)}}
+        account = {"lamports": LAMPORTS_PER_TOKEN_ACCOUNT, "owner": TOKEN_OWNER, "executable": False, "rentEpoch": 0,
+                   "data": {"program": "spl-token", "space": 165, "parsed": {"type": "account", "info": info}}}
+        return self._context([{"pubkey": ata, "account": account}])
+
+    def _rpc_getTokenSupply(self, mint, options=None):
+        account = self.chain.accounts.get(mint)
+        if account is None:
+            raise Exception(f"Invalid param: could not find mint {mint}")
+        supply, decimals = struct.unpack_from("<QB", account["data"], 36)
+        return self._context({"amount": str(supply), "decimals": decimals, "uiAmount": supply / 10 ** decimals,
+                              "uiAmountString": str(supply / 10 ** decimals)})
+
+    def _blockhash(self):
+        # A new blockhash every ~slot, derived from the slot so every thread agrees on it
+        slot = self.chain.slot()
+        return base58.b58encode(struct.pack("<Q", slot).ljust(32, b"\x01")).decode(), slot
+
+    def _rpc_getLatestBlockhash(self, options=None):
+        blockhash, slot = self._blockhash()
+        return self._context({"blockhash": blockhash, "lastValidBlockHeight": slot + BLOCKHASH_VALIDITY})
+
+    def _rpc_getRecentBlockhash(self, options=None):
+        blockhash, _ = self._blockhash()
+        return self._context({"blockhash": blockhash, "feeCalculator": {"lamportsPerSignature": 5000}})
+
+    def _rpc_sendTransaction(self, encoded, options=None):
+        raw = base64.b64decode(encoded) if (options or {}).get("encoding") == "base64" else base58.b58decode(encoded)
+        signature = base58.b58encode(raw[1:65]).decode()  # first signature, after the shortvec count
+        self.chain.land(signature)
+        return signature
+
+    def _rpc_simulateTransaction(self, encoded, options=None):
+        from solana.transaction import Transaction
+        raw = base64.b64decode(encoded) if (options or {}).get("encoding") == "base64" else base58.b58decode(encoded)
+        transaction = Transaction.deserialize(raw)
+        units = sum(SIMULATED_UNITS.get(str(instruction.program_id), 200_000) for instruction in transaction.instructions)
+        return self._context({"err": None, "logs": [], "accounts": None, "unitsConsumed": units})
+
+    def _rpc_getSignatureStatuses(self, signatures, options=None):
+        statuses = []
+        for signature in signatures:
+            slot = self.chain.signatures.get(signature)
+            statuses.append(None if slot is None else {
+                "slot": slot, "confirmations": None, "err": None, "confirmationStatus": "confirmed"})
+        return self._context(statuses)
+
+    def _rpc_getRecentPrioritizationFees(self, addresses=None):
+        slot = self.chain.slot()
+        return [{"slot": slot - i, "prioritizationFee": random.choice([0, 0, 1_000, 10_000, 50_000, 200_000])}
+                for i in range(150)]
+
+    # --- websocket subscriptions ------------------------------------------------------------
+
+    async def _serve_ws(self, ready):
+        self._ws_stop = asyncio.Event()
+        async with websockets.serve(self._ws_session, sock=self._ws_socket):
+            ready.set()
+            await self._ws_stop.wait()
+
+    async def _ws_session(self, ws, path=None):
+        try:
+            async for message in ws:
+                request = json.loads(message)
+                self._count(request.get("method"))
+                await ws.send(json.dumps(self._ws_request(ws, request)))
+                self._notify_landed(request)
+        except websockets.WebSocketException:
+            pass
+        finally:
+            for subscription, entry in list(self._subscriptions.items()):
+                if entry[0] is ws:
+                    self._subscriptions.pop(subscription, None)
+
+    def _ws_request(self, ws, request):
+        method, params = request.get("method"), request.get("params") or []
+        reply = {"jsonrpc": "2.0", "id": request.get("id")}
+        if method in ("accountSubscribe", "signatureSubscribe"):
+            subscription = next(self._subscription_ids)
+            kind = "account" if method == "accountSubscribe" else "signature"
+            self._subscriptions[subscription] = (ws, kind, params[0], params[1] if len(params) > 1 else None)
+            reply["result"] = subscription
+        elif method in ("accountUnsubscribe", "signatureUnsubscribe"):
+            reply["result"] = self._subscriptions.pop(params[0], None) is not None
+        else:
+            reply["error"] = {"code": -32601, "message": f"Method not found: {method}"}
+        return reply
+
+    def _notify_landed(self, request):
+        # signatureSubscribe on a signature that already landed is answered right after its subscription id
+        if request.get("method") == "signatureSubscribe" and request["params"][0] in self.chain.signatures:
+            self._changed("signature", request["params"][0])
+
+    def _changed(self, kind, key):
+        """Chain listener: push a notification to every subscription on `key`, from whichever thread changed it."""
+        if self._loop is None:
+            return
+        for subscription, (ws, subscribed_kind, subscribed_key, options) in list(self._subscriptions.items()):
+            if subscribed_kind != kind or subscribed_key != key:
+                continue
+            if kind == "account":
+                method = "accountNotification"
+                result = self._context(self._encode(self.chain.accounts.get(key), options))
+            else:
+                # signatureSubscribe is one-shot: the node drops it after the first notification
+                self._subscriptions.pop(subscription, None)
+                method = "signatureNotification"
+                result = self._context({"err": None})
+            notification = {"jsonrpc": "2.0", "method": method, "params": {"result": result, "subscription": subscription}}
+            asyncio.run_coroutine_threadsafe(self._push(ws, notification), self._loop)
+
+    @staticmethod
+    async def _push(ws, notification):
+        try:
+            await ws.send(json.dumps(notification))
+        except websockets.WebSocketException:
+            pass
+
+    # --- pumpapi ------------------------------------------------------------------------------
+
+    def api(self, path, body):
+        self._count(path)
+        if path == "/api/quote":
+            curve = self.chain.curve(body["mint"])
+            if curve is None:
+                return 400, {"error": f"No bonding curve for {body['mint']}"}
+            if body["quote_type"] == "buy":
+                tokens = buy_tokens_out(curve, sol_for_curve(int(body["amount"])))
+                return 200, {"quote_type": "buy", "mint": body["mint"], "inAmount": body["amount"], "outAmount": tokens,
+                             "minOutAmount": with_slippage(tokens, body["slippage"], up=False)}
+            sol_out = sell_sol_out(curve, int(body["amount"] * 10 ** PUMP_TOKEN_DECIMALS))
+            return 200, {"quote_type": "sell", "mint": body["mint"], "inAmount": body["amount"], "outAmount": sol_out,
+                         "minSolOutput": with_slippage(sol_out, body["slippage"], up=False)}
+        if path in ("/api/trade", "/api/transfer"):
+            signature = base58.b58encode(os.urandom(64)).decode()
+            self.chain.land(signature)
+            return 200, {"tx_hash": signature}
+        return 404, {"error": f"Unknown endpoint {path}"}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body=None, headers=None):
+        payload = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        mock = self.server.mock
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"null")
+        status = mock.admit()
+        if status == 429:
+            return self._reply(429, {"error": "Too many requests"}, {"Retry-After": "1"})
+        if status is not None:
+            return self._reply(status, {"error": "Internal server error"})
+        if self.path.startswith("/api/"):
+            return self._reply(*mock.api(self.path, body))
+        if isinstance(body, list):
+            return self._reply(200, [mock.rpc(request) for request in body])
+        self._reply(200, mock.rpc(body))
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8899
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    server = MockServer(port=port, latency=latency)
+    print(f"Mock RPC at {server.url}, websocket at {server.ws_url}, pumpapi at {server.api_url} (Ctrl-C to stop)")
+    server.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,214 @@
+import asyncio
+import json
+import threading
+from array import array
+
+import websockets
+
+from instrumentation import log
+from key_registry import get_registry
+from rpc_batch import BatchRpc
+from rpc_codec import (
+    MINT_DECIMALS_OFFSET, TOKEN_AMOUNT, TOKEN_AMOUNT_OFFSET, TokenAmount, account_bytes, decode_token_amount, loads,
+)
+from transport import RPC_URL, get_transport, ws_url_for
+
+RECONNECT_DELAY = 1.0
+
+
+def _amount(data):
+    """u64 token amount from a (sliced or full) token account, None when the account does not exist."""
+    if not data or len(data) < TOKEN_AMOUNT.size:
+        return None
+    return decode_token_amount(data)
+
+
+class Portfolio:
+    """Long-lived wallet x mint holdings, seeded with one batched fetch and kept current over accountSubscribe.
+
+    Lamports live in one array('Q') indexed by wallet, each mint's token amounts in another column of
+    the same shape, and totals are adjusted on every change, so reading a wallet's holdings or the fleet
+    total is O(1) and costs no RPC. Token columns follow each wallet's associated token account.
+    Reads are only trusted (`tracks`) while the websocket is connected; callers fall back to RPC otherwise.
+    """
+
+    def __init__(self, wallets, mint_addresses=(), rpc_url=RPC_URL, ws_url=None, transport=None, batch_rpc=None,
+                 registry=None):
+        self.rpc_url = rpc_url
+        self.transport = transport or get_transport()
+        self.ws_url = ws_url or ws_url_for(rpc_url, self.transport)
+        self.batch_rpc = batch_rpc or BatchRpc(rpc_url, self.transport)
+        self.registry = registry or get_registry()
+        self.names = list(wallets)
+        self.addresses = [str(wallets[name]) for name in self.names]
+        self.rows = {}
+        for row, (name, address) in enumerate(zip(self.names, self.addresses)):
+            self.rows[name] = row
+            self.rows[address] = row
+        self.lamports = array("Q", bytes(8 * len(self.names)))
+        self.total_lamports = 0
+        self.tokens = {}
+        self.token_totals = {}
+        self.decimals = {}
+        self.absent = {}  # mint -> rows whose token account does not exist
+        self._connected = False
+        self._accounts = {address: (None, row) for row, address in enumerate(self.addresses)}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._ws = None
+        self._subscriptions = {}
+        for mint_address in mint_addresses:
+            self.add_mint(mint_address)
+
+    def add_mint(self, mint_address):
+        mint_address = str(mint_address)
+        if mint_address in self.tokens:
+            return
+        atas = self.registry.precompute_atas(self.addresses, mint_address)
+        with self._lock:
+            self.tokens[mint_address] = array("Q", bytes(8 * len(self.names)))
+            self.token_totals[mint_address] = 0
+            self.absent[mint_address] = set(range(len(self.names)))
+            for row, address in enumerate(self.addresses):
+                self._accounts[str(atas[address])] = (mint_address, row)
+        if self._ws is not None:
+            self.seed([mint_address])
+            for account, (mint, _) in list(self._accounts.items()):
+                if mint == mint_address:
+                    asyncio.run_coroutine_threadsafe(self._send_subscribe(account), self._loop)
+
+    def _set(self, account, value):
+        """Store `value` for `account`; None marks a token account that does not exist."""
+        mint_address, row = self._accounts[account]
+        with self._lock:
+            if mint_address is not None:
+                if value is None:
+                    self.absent[mint_address].add(row)
+                    value = 0
+                else:
+                    self.absent[mint_address].discard(row)
+            column = self.lamports if mint_address is None else self.tokens[mint_address]
+            delta = value - column[row]
+            column[row] = value
+            if mint_address is None:
+                self.total_lamports += delta
+            else:
+                self.token_totals[mint_address] += delta
+
+    def seed(self, mint_addresses=None):
+        """(Re)load everything with batched getMultipleAccounts calls: lamports, token amounts, mint decimals."""
+        mints = list(self.tokens) if mint_addresses is None else list(mint_addresses)
+        if mint_addresses is None:
+            for address, lamports in zip(self.addresses, self.batch_rpc.get_balances(self.addresses)):
+                self._set(address, lamports or 0)
+        for mint_address, data in zip(mints, self.batch_rpc.get_account_slices(mints, MINT_DECIMALS_OFFSET, 1)):
+            if data:
+                self.decimals[mint_address] = data[0]
+        accounts = [account for account, (mint, _) in self._accounts.items() if mint in mints]
+        slices = self.batch_rpc.get_account_slices(accounts, TOKEN_AMOUNT_OFFSET, TOKEN_AMOUNT.size)
+        for account, data in zip(accounts, slices):
+            self._set(account, _amount(data))
+
+    # --- O(1) reads ---------------------------------------------------------------------------
+
+    def sol_balance(self, wallet):
+        return self.lamports[self.rows[str(wallet)]] / 1e9
+
+    def token_balance(self, wallet, mint_address):
+        """Exact atomic token amount held by `wallet` (name or address)."""
+        return self.tokens[str(mint_address)][self.rows[str(wallet)]]
+
+    def token_amount(self, wallet, mint_address):
+        """TokenAmount held by `wallet`; None when it has no token account or the mint's decimals are unknown."""
+        mint_address = str(mint_address)
+        decimals = self.decimals.get(mint_address)
+        if decimals is None or self.rows[str(wallet)] in self.absent[mint_address]:
+            return None
+        return TokenAmount(self.token_balance(wallet, mint_address), decimals)
+
+    def ui_token_balance(self, wallet, mint_address):
+        token_amount = self.token_amount(wallet, mint_address)
+        return None if token_amount is None else token_amount.ui_amount
+
+    def total_sol(self):
+        return self.total_lamports / 1e9
+
+    def total_tokens(self, mint_address):
+        return self.token_totals[str(mint_address)]
+
+    def live(self):
+        """True while the websocket is connected and subscribed, i.e. while the columns are current."""
+        return self._connected
+
+    def tracks(self, wallet, mint_address=None):
+        if not self._connected or str(wallet) not in self.rows:
+            return False
+        return mint_address is None or str(mint_address) in self.decimals
+
+    def holdings(self, wallet):
+        row = self.rows[str(wallet)]
+        return {
+            "lamports": self.lamports[row],
+            "tokens": {mint_address: column[row] for mint_address, column in self.tokens.items()},
+        }
+
+    # --- accountSubscribe -------------------------------------------------------------------
+
+    def start(self):
+        """Seed once and keep every tracked account pushed to us over the websocket from now on."""
+        with self._lock:
+            if self._loop is not None:
+                return
+            self._loop = asyncio.new_event_loop()
+        self.seed()
+        threading.Thread(target=self._loop.run_until_complete, args=(self._run(),),
+                         name="portfolio-ws", daemon=True).start()
+
+    async def _send_subscribe(self, account):
+        if self._ws is None:
+            return  # picked up by the resubscribe after (re)connecting
+        request = {
+            "jsonrpc": "2.0",
+            "id": account,
+            "method": "accountSubscribe",
+            "params": [account, {"encoding": "base64", "commitment": "confirmed"}],
+        }
+        await self._ws.send(json.dumps(request))
+
+    async def _run(self):
+        reconnecting = False
+        while True:
+            try:
+                async with websockets.connect(self.ws_url) as ws:
+                    self._ws = ws
+                    for account in list(self._accounts):
+                        await self._send_subscribe(account)
+                    if reconnecting:
+                        # Changes that landed while we were disconnected were never pushed
+                        await asyncio.to_thread(self.seed)
+                    self._connected = True
+                    async for message in ws:
+                        self._handle(loads(message))
+            except Exception as e:
+                log(f"Portfolio websocket error: {e}")
+            finally:
+                # Until reconnected and re-seeded the columns may be stale: `tracks` sends reads to RPC
+                self._connected = False
+                self._ws = None
+                self._subscriptions.clear()
+            reconnecting = True
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    def _handle(self, message):
+        if "result" in message and message.get("id") in self._accounts:
+            self._subscriptions[message["result"]] = message["id"]
+            return
+        if message.get("method") == "accountNotification":
+            account = self._subscriptions.get(message["params"]["subscription"])
+            if account is None:
+                return
+            value = message["params"]["result"]["value"]
+            if self._accounts[account][0] is None:
+                self._set(account, value["lamports"] if value else 0)
+            else:
+                self._set(account, _amount(account_bytes(value)) if value else None)
@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict
+
+from instrumentation import log
+
+FEE_REFRESH_INTERVAL = 2.0  # seconds between background getRecentPrioritizationFees passes (~5 slots)
+FEE_WINDOW_SLOTS = 150      # slots kept per account set; the RPC itself only remembers the last 150
+MAX_WATCHED = 64            # account sets sampled at once; the least recently used one is dropped first
+MAX_FEE_ACCOUNTS = 128      # getRecentPrioritizationFees limit per call
+DEFAULT_SPEED = "normal"
+SPEED_PERCENTILES = {"economy": 25, "normal": 50, "fast": 75, "urgent": 95}
+FIRST_SAMPLE_WAIT = 1.0               # seconds a cold estimate waits for the first sampling pass
+FALLBACK_MICRO_LAMPORTS = 30_000_000  # per CU with no samples at all: the old flat 0.003 SOL over 100k CU
+# A guard against one outlier slot, not against a busy market: 200 lamports per CU is ~0.01 SOL for a
+# ~50k CU trade, about 3x the flat 0.003 SOL fee this replaced, so "urgent" can still outbid a hot curve
+MAX_MICRO_LAMPORTS = 200_000_000
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return None
+    rank = max(0, min(len(ordered) - 1, -(-len(ordered) * pct // 100) - 1))
+    return ordered[rank]
+
+
+class PriorityFeeEstimator:
+    """Prices compute units from what recently landed against the same writable accounts.
+
+    getRecentPrioritizationFees is sampled in the background for every account set a transaction has
+    asked about (plus the global market), all sets in one batched request, and the last
+    FEE_WINDOW_SLOTS slots of each are kept sorted in memory. `estimate` is a list lookup: the send path
+    never waits on the RPC. An account set seen for the first time is priced from the global window
+    until its own samples arrive on the next pass; only a cold process with no window at all waits (up
+    to FIRST_SAMPLE_WAIT) for the first pass.
+    """
+
+    def __init__(self, batch_rpc, interval=FEE_REFRESH_INTERVAL, window=FEE_WINDOW_SLOTS, max_watched=MAX_WATCHED,
+                 fallback=FALLBACK_MICRO_LAMPORTS, ceiling=MAX_MICRO_LAMPORTS, first_sample_wait=FIRST_SAMPLE_WAIT):
+        self.batch_rpc = batch_rpc
+        self.interval = interval
+        self.window = window
+        self.max_watched = max_watched
+        self.fallback = fallback
+        self.ceiling = ceiling
+        self.first_sample_wait = first_sample_wait
+        self._samples = OrderedDict({(): {}})  # account set -> {slot: micro-lamports per CU}
+        self._sorted = {}
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._first_pass = threading.Event()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(accounts):
+        return tuple(sorted({str(account) for account in accounts}))[:MAX_FEE_ACCOUNTS]
+
+    def watch(self, accounts):
+        """Sample `accounts` from now on; returns the key its estimates are stored under."""
+        key = self.key(accounts)
+        with self._lock:
+            if key in self._samples:
+                self._samples.move_to_end(key)
+                return key
+            self._samples[key] = {}
+            while len(self._samples) > self.max_watched + 1:
+                stale = next(k for k in self._samples if k != ())
+                del self._samples[stale]
+                self._sorted.pop(stale, None)
+        self._wake.set()
+        return key
+
+    def refresh(self):
+        """One getRecentPrioritizationFees pass over every watched account set."""
+        with self._lock:
+            keys = list(self._samples)
+        results = self.batch_rpc.call_batch(
+            [("getRecentPrioritizationFees", [list(key)] if key else []) for key in keys])
+        with self._lock:
+            for key, result in zip(keys, results):
+                samples = self._samples.get(key)
+                if samples is None or result is None:
+                    continue
+                for entry in result:
+                    samples[entry["slot"]] = entry["prioritizationFee"]
+                for slot in sorted(samples)[:-self.window]:
+                    del samples[slot]
+                self._sorted[key] = sorted(samples.values())
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="priority-fees", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                log(f"Priority fee refresh failed: {e}")
+            self._first_pass.set()
+            self._wake.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def estimate(self, accounts=(), speed=DEFAULT_SPEED):
+        """Micro-lamports per compute unit to land alongside `accounts` at `speed` (a SPEED_PERCENTILES name)."""
+        if speed not in SPEED_PERCENTILES:
+            raise Exception(f"Unknown priority fee speed {speed!r}, expected one of {', '.join(SPEED_PERCENTILES)}")
+        self.start()
+        key = self.watch(accounts)
+        ordered = self._sorted.get(key) or self._sorted.get(())
+        if not ordered and not self._first_pass.is_set():
+            self._first_pass.wait(self.first_sample_wait)
+            ordered = self._sorted.get(key) or self._sorted.get(())
+        if not ordered:
+            return self.fallback
+        return min(percentile(ordered, SPEED_PERCENTILES[speed]), self.ceiling)
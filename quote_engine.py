@@ -0,0 +1,152 @@
+import asyncio
+import json
+import threading
+import time
+
+import websockets
+
+from bonding_curve import (
+    PUMP_TOKEN_DECIMALS, buy_tokens_out, buy_tokens_out_many, fetch_bonding_curve, get_bonding_curve_address,
+    parse_bonding_curve, sell_sol_out, sell_sol_out_many, sol_for_curve, with_slippage,
+)
+from instrumentation import log, span
+from rpc_codec import TokenAmount, account_bytes, loads
+from transport import RPC_URL, get_transport, ws_url_for
+
+DEFAULT_MAX_AGE = 2.0  # seconds a polled curve stays usable when no subscription is live
+RECONNECT_DELAY = 1.0
+
+
+class QuoteEngine:
+    """Prices pump.fun buys and sells locally from cached bonding-curve state.
+
+    A curve is fetched once with getAccountInfo; after `subscribe(mint)` a background websocket
+    keeps it current through accountSubscribe, so quotes are pure integer math with no round trip.
+    Unsubscribed curves are re-fetched once they are older than `max_age`.
+    """
+
+    def __init__(self, rpc_url=RPC_URL, ws_url=None, transport=None, max_age=DEFAULT_MAX_AGE):
+        self.rpc_url = rpc_url
+        self.transport = transport or get_transport()
+        self.ws_url = ws_url or ws_url_for(rpc_url, self.transport)
+        self.max_age = max_age
+        self._states = {}
+        self._live = set()
+        self._wanted = set()
+        self._subscriptions = {}
+        self._ws = None
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def get_state(self, mint_address):
+        mint_address = str(mint_address)
+        entry = self._states.get(mint_address)
+        if entry is not None and (mint_address in self._live or time.monotonic() - entry[1] < self.max_age):
+            return entry[0]
+        state = fetch_bonding_curve(mint_address, self.rpc_url, self.transport)
+        self._states[mint_address] = (state, time.monotonic())
+        return state
+
+    def quote_buy(self, mint_address, amount_lamports, slippage):
+        tokens = buy_tokens_out(self.get_state(mint_address), sol_for_curve(amount_lamports))
+        return {
+            "quote_type": "buy",
+            "mint": str(mint_address),
+            "inAmount": amount_lamports,
+            "outAmount": tokens,
+            "minOutAmount": with_slippage(tokens, slippage, up=False),
+            "maxSolCost": with_slippage(amount_lamports, slippage, up=True),
+        }
+
+    def quote_sell(self, mint_address, token_amount, slippage):
+        sol_out = sell_sol_out(self.get_state(mint_address), token_amount)
+        return {
+            "quote_type": "sell",
+            "mint": str(mint_address),
+            "inAmount": token_amount,
+            "outAmount": sol_out,
+            "minSolOutput": with_slippage(sol_out, slippage, up=False),
+        }
+
+    def quote(self, quote_type, mint_address, amount, slippage):
+        """pumpapi-compatible entry point: buy amounts in lamports, sell amounts in whole tokens or a TokenAmount."""
+        with span("quote", side=quote_type):
+            if quote_type == "buy":
+                return self.quote_buy(mint_address, int(amount), slippage)
+            if isinstance(amount, TokenAmount):
+                return self.quote_sell(mint_address, amount.amount, slippage)  # already atomic, no float trip
+            return self.quote_sell(mint_address, int(amount * 10 ** PUMP_TOKEN_DECIMALS), slippage)
+
+    def quote_buys(self, mint_address, lamport_amounts):
+        state = self.get_state(mint_address)
+        return buy_tokens_out_many(state, [sol_for_curve(amount) for amount in lamport_amounts])
+
+    def quote_sells(self, mint_address, token_amounts):
+        return sell_sol_out_many(self.get_state(mint_address), token_amounts)
+
+    # --- accountSubscribe -------------------------------------------------------------------
+
+    def subscribe(self, mint_address):
+        """Keep the curve of `mint_address` pushed to us over the websocket from now on; repeat calls are free."""
+        mint_address = str(mint_address)
+        if mint_address in self._wanted:
+            return
+        self.get_state(mint_address)
+        with self._lock:
+            if mint_address in self._wanted:
+                return
+            self._wanted.add(mint_address)
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_until_complete, args=(self._run(),),
+                                 name="quote-engine-ws", daemon=True).start()
+                return
+        asyncio.run_coroutine_threadsafe(self._send_subscribe(mint_address), self._loop)
+
+    async def _send_subscribe(self, mint_address):
+        if self._ws is None:
+            return  # picked up by the resubscribe after (re)connecting
+        request = {
+            "jsonrpc": "2.0",
+            "id": f"sub:{mint_address}",
+            "method": "accountSubscribe",
+            "params": [str(get_bonding_curve_address(mint_address)), {"encoding": "base64", "commitment": "processed"}],
+        }
+        await self._ws.send(json.dumps(request))
+
+    async def _run(self):
+        while True:
+            try:
+                async with websockets.connect(self.ws_url) as ws:
+                    self._ws = ws
+                    for mint_address in list(self._wanted):
+                        await self._send_subscribe(mint_address)
+                    async for message in ws:
+                        self._handle(loads(message))
+            except Exception as e:
+                log(f"Quote engine websocket error: {e}")
+            finally:
+                # Until resubscribed no curve is live, so reads fall back to polling instead of going stale
+                self._ws = None
+                self._live.clear()
+                self._subscriptions.clear()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    def _handle(self, message):
+        if isinstance(message.get("id"), str) and message["id"].startswith("sub:"):
+            mint_address = message["id"][4:]
+            if "result" in message:
+                self._subscriptions[message["result"]] = mint_address
+                self._live.add(mint_address)
+            return
+        if message.get("method") == "accountNotification":
+            mint_address = self._subscriptions.get(message["params"]["subscription"])
+            if mint_address is None:
+                return
+            value = message["params"]["result"]["value"]
+            if value is None:
+                # The curve account was closed: drop it so the next read fetches (and reports) that
+                self._live.discard(mint_address)
+                self._states.pop(mint_address, None)
+                return
+            self._states[mint_address] = (parse_bonding_curve(account_bytes(value)), time.monotonic())
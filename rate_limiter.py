@@ -0,0 +1,114 @@
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_RATE = 10.0  # requests per second before any 429 tells us otherwise
+DEFAULT_RATES = {
+    "api.mainnet-beta.solana.com": 10.0,  # public endpoint: 100 requests / 10 s per IP
+    "pumpapi.fun": 5.0,
+}
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), None if absent/invalid."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime  # HTTP-date form, rare enough to import on demand
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """Token bucket for one endpoint that adapts its rate to the 429s the endpoint sends back.
+
+    Each 429 halves the rate and pauses the bucket for Retry-After (or an exponential backoff) plus
+    jitter; every successful response creeps the rate back up towards `max_rate`. The same instance
+    is safe to share between threads (`acquire`) and asyncio tasks (`acquire_async`).
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=None, min_rate=0.5, max_rate=None,
+                 recovery_step=None, backoff=1.0, max_backoff=30.0, jitter=0.25):
+        self.rate = rate
+        self.max_rate = max_rate or rate
+        self.min_rate = min_rate
+        self.capacity = burst or max(1.0, rate)
+        self.recovery_step = recovery_step or self.max_rate / 20
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Take a token and return how long the caller has to wait before it may send."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.paused_until - now)
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        import asyncio  # only reached from a running event loop, so this is a dict lookup
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_response(self, status_code, headers=None):
+        """Feed back the outcome of a request; returns True if it was throttled and may be retried."""
+        with self._lock:
+            if status_code == 429:
+                self.throttled += 1
+                self.rate = max(self.min_rate, self.rate / 2)
+                delay = parse_retry_after((headers or {}).get("Retry-After"))
+                if delay is None:
+                    delay = min(self.max_backoff, self.backoff * 2 ** (self.throttled - 1))
+                delay *= 1 + random.uniform(0, self.jitter)
+                self.paused_until = max(self.paused_until, time.monotonic() + delay)
+                self.tokens = min(self.tokens, 0.0)
+                return True
+            if status_code < 500:
+                self.throttled = 0
+                self.rate = min(self.max_rate, self.rate + self.recovery_step)
+            return False
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(url):
+    """Return the limiter shared by every caller of the host in `url`."""
+    host = urlsplit(url).hostname or url
+    limiter = _limiters.get(host)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(host)
+            if limiter is None:
+                limiter = RateLimiter(DEFAULT_RATES.get(host, DEFAULT_RATE))
+                _limiters[host] = limiter
+    return limiter
+
+
+def configure_limiter(url, **kwargs):
+    """Replace the limiter for the host in `url`, e.g. for a private RPC node with a higher quota."""
+    host = urlsplit(url).hostname or url
+    with _limiters_lock:
+        _limiters[host] = RateLimiter(**kwargs)
+    return _limiters[host]
@@ -0,0 +1,236 @@
+import asyncio
+
+from instrumentation import log, span
+from rpc_codec import (
+    MINT_DECIMALS_SLICE, TOKEN_AMOUNT_SLICE, TokenAmount, account_bytes, decode_token_amount, response_json,
+    to_ui_amount,
+)
+from transport import RPC_URL, get_transport
+
+MAX_BATCH_SIZE = 100          # JSON-RPC requests per HTTP POST
+MAX_MULTIPLE_ACCOUNTS = 100   # getMultipleAccounts hard limit per call
+
+
+def _chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _parse_token_accounts(result, decimals):
+    """Pick the first token account of a getTokenAccountsByOwner result and return its exact amount."""
+    if not result or not result["value"]:
+        return None
+    account = result["value"][0]
+    amount = decode_token_amount(account_bytes(account["account"]))
+    return {
+        "account": account["pubkey"],
+        "amount": amount,
+        "decimals": decimals,
+        "ui_amount": to_ui_amount(amount, decimals) if decimals is not None else None,
+    }
+
+
+def _token_amounts(token_balances):
+    return [TokenAmount(balance["amount"], balance["decimals"]) if balance else None for balance in token_balances]
+
+
+class BatchRpc:
+    """Packs many JSON-RPC calls into batch arrays so a fleet-wide query costs one round trip."""
+
+    def __init__(self, url=RPC_URL, transport=None, max_batch_size=MAX_BATCH_SIZE, mint_cache=None):
+        self.url = url
+        self.transport = transport or get_transport()
+        self.max_batch_size = max_batch_size
+        self.mint_cache = mint_cache
+
+    def _payload(self, calls, offset):
+        return [
+            {"jsonrpc": "2.0", "id": offset + i, "method": method, "params": params}
+            for i, (method, params) in enumerate(calls[offset:offset + self.max_batch_size])
+        ]
+
+    def _collect(self, calls, response, results):
+        if response.status_code != 200:
+            log(f"Error: {response.status_code} - {response.text}")
+            return
+        body = response_json(response)
+        if not isinstance(body, list):
+            # Some providers answer a whole batch with one error object and a 200
+            log(f"Batch request failed: {body.get('error') if isinstance(body, dict) else body}")
+            return
+        for item in body:
+            if "result" in item:
+                results[item["id"]] = item["result"]
+            else:
+                log(f"RPC error for {calls[item['id']][0]}: {item.get('error')}")
+
+    def call_batch(self, calls):
+        """Run a list of (method, params) calls and return their results in order, None for failures."""
+        results = [None] * len(calls)
+        with span("rpc_batch"):
+            for offset in range(0, len(calls), self.max_batch_size):
+                response = self.transport.post(self.url, json=self._payload(calls, offset))
+                self._collect(calls, response, results)
+        return results
+
+    def _balance_calls(self, public_keys):
+        keys = [str(pk) for pk in public_keys]
+        options = {"encoding": "base64", "dataSlice": {"offset": 0, "length": 0}}
+        return [("getMultipleAccounts", [chunk, options]) for chunk in _chunks(keys, MAX_MULTIPLE_ACCOUNTS)]
+
+    def _decode_balances(self, results, count):
+        lamports = []
+        for result in results:
+            if result is None:
+                lamports.extend([None] * min(MAX_MULTIPLE_ACCOUNTS, count - len(lamports)))
+                continue
+            # Accounts that were never funded come back as null
+            lamports.extend(account["lamports"] if account else 0 for account in result["value"])
+        return lamports
+
+    def _slice_calls(self, addresses, offset, length):
+        keys = [str(address) for address in addresses]
+        options = {"encoding": "base64", "dataSlice": {"offset": offset, "length": length}}
+        return [("getMultipleAccounts", [chunk, options]) for chunk in _chunks(keys, MAX_MULTIPLE_ACCOUNTS)]
+
+    def _decode_slices(self, results, count):
+        slices = []
+        for result in results:
+            if result is None:
+                slices.extend([None] * min(MAX_MULTIPLE_ACCOUNTS, count - len(slices)))
+                continue
+            slices.extend(account_bytes(account) if account else None for account in result["value"])
+        return slices
+
+    def _cached_decimals(self, mint_address):
+        entry = self.mint_cache.get(mint_address) if self.mint_cache is not None else None
+        return entry["decimals"] if entry else None
+
+    def _token_calls(self, public_keys, mint_address):
+        # Only the 8 amount bytes of each token account cross the wire, plus the mint's decimals byte
+        # unless the mint cache already knows them
+        calls = [
+            ("getTokenAccountsByOwner", [str(pk), {"mint": str(mint_address)}, TOKEN_AMOUNT_SLICE])
+            for pk in public_keys
+        ]
+        if self._cached_decimals(mint_address) is None:
+            calls.append(("getMultipleAccounts", [[str(mint_address)], MINT_DECIMALS_SLICE]))
+        return calls
+
+    def _parse_token_results(self, results, mint_address, count):
+        """The first `count` results are getTokenAccountsByOwner; a last one, if any, is the mint's decimals byte."""
+        decimals = None
+        if len(results) > count:
+            mint = results[count]["value"][0] if results[count] else None
+            decimals = account_bytes(mint)[0] if mint else None
+            if decimals is not None and self.mint_cache is not None:
+                self.mint_cache.put(mint_address, decimals)
+        if decimals is None:
+            # Not asked for, or the lookup failed: a mint's decimals never change, so a cached value is as good
+            decimals = self._cached_decimals(mint_address)
+        return [_parse_token_accounts(result, decimals) for result in results[:count]]
+
+    def _token_calls_by_mint(self, public_keys_by_mint):
+        calls, bounds = [], []
+        for mint_address, public_keys in public_keys_by_mint.items():
+            public_keys = list(public_keys)
+            start = len(calls)
+            calls.extend(self._token_calls(public_keys, mint_address))
+            bounds.append((mint_address, start, len(calls), len(public_keys)))
+        return calls, bounds
+
+    def _split_token_results(self, results, bounds):
+        return {mint_address: _token_amounts(self._parse_token_results(results[start:end], mint_address, count))
+                for mint_address, start, end, count in bounds}
+
+    def get_balances(self, public_keys):
+        """Lamport balances for every key, fetched with getMultipleAccounts."""
+        public_keys = list(public_keys)
+        return self._decode_balances(self.call_batch(self._balance_calls(public_keys)), len(public_keys))
+
+    def get_account_slices(self, addresses, offset, length):
+        """`length` bytes at `offset` of each account's data (None for missing accounts)."""
+        addresses = list(addresses)
+        return self._decode_slices(self.call_batch(self._slice_calls(addresses, offset, length)), len(addresses))
+
+    def get_token_balances(self, public_keys, mint_address):
+        """Token holdings of `mint_address` for every key, one getTokenAccountsByOwner per key in one batch."""
+        public_keys = list(public_keys)
+        results = self.call_batch(self._token_calls(public_keys, mint_address))
+        return self._parse_token_results(results, mint_address, len(public_keys))
+
+    def get_token_amounts(self, public_keys, mint_address):
+        """Same fetch as get_token_balances, as TokenAmount(amount, decimals) records (None without an account)."""
+        return _token_amounts(self.get_token_balances(public_keys, mint_address))
+
+    def get_token_amounts_by_mint(self, public_keys_by_mint):
+        """{mint: [TokenAmount or None]} for {mint: public_keys}; every mint's lookups share the same batches."""
+        calls, bounds = self._token_calls_by_mint(public_keys_by_mint)
+        return self._split_token_results(self.call_batch(calls), bounds)
+
+    def fleet_snapshot(self, public_keys, mint_address=None):
+        """SOL (and optionally token) holdings for a {name: public_key} fleet in a single batched request."""
+        calls, balance_count = self._snapshot_calls(public_keys, mint_address)
+        return self._snapshot_table(public_keys, mint_address, self.call_batch(calls), balance_count)
+
+    def _snapshot_calls(self, public_keys, mint_address):
+        keys = list(public_keys.values())
+        balance_calls = self._balance_calls(keys)
+        token_calls = self._token_calls(keys, mint_address) if mint_address else []
+        return balance_calls + token_calls, len(balance_calls)
+
+    def _snapshot_table(self, public_keys, mint_address, results, balance_count):
+        lamports = self._decode_balances(results[:balance_count], len(public_keys))
+        tokens = []
+        if mint_address:
+            tokens = self._parse_token_results(results[balance_count:], mint_address, len(public_keys))
+        snapshot = {}
+        for i, (name, public_key) in enumerate(public_keys.items()):
+            row = {
+                "public_key": str(public_key),
+                "lamports": lamports[i],
+                "sol": lamports[i] / 1e9 if lamports[i] is not None else None,
+            }
+            if mint_address:
+                row["token"] = tokens[i]
+            snapshot[name] = row
+        return snapshot
+
+
+class AsyncBatchRpc(BatchRpc):
+    """BatchRpc over an httpx.AsyncClient; the chunks of a large batch are sent concurrently."""
+
+    def __init__(self, url=RPC_URL, http=None, max_batch_size=MAX_BATCH_SIZE, mint_cache=None):
+        super().__init__(url, max_batch_size=max_batch_size, mint_cache=mint_cache)
+        self.http = http
+
+    async def call_batch(self, calls):
+        results = [None] * len(calls)
+        offsets = range(0, len(calls), self.max_batch_size)
+        responses = await asyncio.gather(*(self.http.post(self.url, json=self._payload(calls, offset)) for offset in offsets))
+        for response in responses:
+            self._collect(calls, response, results)
+        return results
+
+    async def get_balances(self, public_keys):
+        public_keys = list(public_keys)
+        return self._decode_balances(await self.call_batch(self._balance_calls(public_keys)), len(public_keys))
+
+    async def get_account_slices(self, addresses, offset, length):
+        addresses = list(addresses)
+        return self._decode_slices(await self.call_batch(self._slice_calls(addresses, offset, length)), len(addresses))
+
+    async def get_token_balances(self, public_keys, mint_address):
+        public_keys = list(public_keys)
+        results = await self.call_batch(self._token_calls(public_keys, mint_address))
+        return self._parse_token_results(results, mint_address, len(public_keys))
+
+    async def get_token_amounts(self, public_keys, mint_address):
+        return _token_amounts(await self.get_token_balances(public_keys, mint_address))
+
+    async def get_token_amounts_by_mint(self, public_keys_by_mint):
+        calls, bounds = self._token_calls_by_mint(public_keys_by_mint)
+        return self._split_token_results(await self.call_batch(calls), bounds)
+
+    async def fleet_snapshot(self, public_keys, mint_address=None):
+        calls, balance_count = self._snapshot_calls(public_keys, mint_address)
+        return self._snapshot_table(public_keys, mint_address, await self.call_batch(calls), balance_count)
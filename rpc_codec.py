@@ -0,0 +1,95 @@
+import base64
+import struct
+from collections import namedtuple
+from decimal import Decimal
+
+try:
+    import orjson
+    loads = orjson.loads
+    ORJSON_AVAILABLE = True
+except ImportError:
+    import json
+    loads = json.loads
+    ORJSON_AVAILABLE = False
+
+# SPL token account: mint, owner, amount (then delegate/state/... which we never read)
+TOKEN_ACCOUNT_LAYOUT = struct.Struct("<32s32sQ")
+TOKEN_AMOUNT = struct.Struct("<Q")
+TOKEN_AMOUNT_OFFSET = 64
+# SPL mint: mint_authority COption<Pubkey>, supply, decimals, is_initialized
+MINT_LAYOUT = struct.Struct("<36sQB?")
+MINT_DECIMALS_OFFSET = 44
+
+TokenAccount = namedtuple("TokenAccount", ["mint", "owner", "amount"])
+Mint = namedtuple("Mint", ["supply", "decimals", "is_initialized"])
+
+
+class TokenAmount(namedtuple("TokenAmount", ["amount", "decimals"])):
+    """Exact atomic-unit amount with its mint's decimals; only converted to a float for display."""
+
+    __slots__ = ()
+
+    @property
+    def ui_amount(self):
+        """Display amount; None while the mint's decimals are unknown."""
+        return to_ui_amount(self.amount, self.decimals) if self.decimals is not None else None
+
+    def percent(self, percentage):
+        return TokenAmount(percent_of(self.amount, percentage), self.decimals)
+
+BPS = 10_000  # percentages resolve to basis points so splitting an amount stays in integers
+
+# dataSlice options so the node only ships the bytes we decode
+TOKEN_AMOUNT_SLICE = {"encoding": "base64", "dataSlice": {"offset": TOKEN_AMOUNT_OFFSET, "length": TOKEN_AMOUNT.size}}
+MINT_DECIMALS_SLICE = {"encoding": "base64", "dataSlice": {"offset": MINT_DECIMALS_OFFSET, "length": 1}}
+
+
+def response_json(response):
+    """Parse an HTTP response body with orjson when available (requests and httpx both expose .content)."""
+    return loads(response.content)
+
+
+def account_bytes(account):
+    """Raw data of a base64-encoded account from getAccountInfo / getMultipleAccounts / getTokenAccountsBy*."""
+    return base64.b64decode(account["data"][0])
+
+
+def decode_token_account(data):
+    mint, owner, amount = TOKEN_ACCOUNT_LAYOUT.unpack_from(memoryview(data))
+    return TokenAccount(mint, owner, amount)
+
+
+def decode_token_amount(data):
+    """Amount from a whole token account or from an 8-byte TOKEN_AMOUNT_SLICE of one."""
+    offset = 0 if len(data) == TOKEN_AMOUNT.size else TOKEN_AMOUNT_OFFSET
+    return TOKEN_AMOUNT.unpack_from(memoryview(data), offset)[0]
+
+
+def decode_mint(data):
+    _, supply, decimals, is_initialized = MINT_LAYOUT.unpack_from(memoryview(data))
+    return Mint(supply, decimals, is_initialized)
+
+
+def to_ui_amount(amount, decimals):
+    return amount / 10 ** decimals
+
+
+def to_bps(percentage):
+    """Percentage (int, float or str, e.g. 33.33) as whole basis points, without float rounding."""
+    bps = int(Decimal(str(percentage)) * 100)
+    if not 0 <= bps <= BPS:
+        raise Exception(f"Percentage out of range: {percentage}")
+    return bps
+
+
+def percent_of(amount, percentage):
+    """Floor of `percentage` % of an atomic amount; 100 % is the whole amount, so no dust is left behind."""
+    return amount * to_bps(percentage) // BPS
+
+
+def split_percent(amounts, percentage):
+    """percent_of over many wallets' atomic amounts with the percentage resolved once."""
+    bps = to_bps(percentage)
+    if bps == BPS:
+        return list(amounts)
+    return [amount * bps // BPS for amount in amounts]
@@ -0,0 +1,248 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from instrumentation import log
+from rpc_codec import response_json
+from transport import RPC_URL, get_transport, transport_errors, ws_url_for
+
+RPC_ENDPOINTS_ENV = "RPC_ENDPOINTS"  # comma-separated list of RPC URLs
+RPC_WS_ENDPOINTS_ENV = "RPC_WS_ENDPOINTS"  # their websocket URLs, same order; default: the RPC URL as ws(s)://
+HEALTH_INTERVAL = 10.0      # seconds between background getHealth probes
+EWMA_ALPHA = 0.2            # weight of the newest sample in the latency / error averages
+MAX_FAILURES = 3            # consecutive failures before an endpoint is taken out of rotation
+COOLDOWN = 30.0             # seconds an endpoint stays out before it is retried
+HEDGE_DELAY = 0.25          # seconds to wait on the fastest endpoint before asking the next one
+HEDGED_METHODS = {
+    "getLatestBlockhash", "getAccountInfo", "getMultipleAccounts", "getBalance", "getSignatureStatuses",
+    "getTokenAccountsByOwner", "getBlockHeight", "sendTransaction",
+}
+ROUTER_WORKERS = 16
+
+
+class EndpointStats:
+    """Latency and error averages for one endpoint, plus its out-of-rotation deadline."""
+
+    def __init__(self, url):
+        self.url = url
+        self.latency = None
+        self.error_rate = 0.0
+        self.failures = 0
+        self.down_until = 0.0
+        self.requests = 0
+
+    def healthy(self, now):
+        return self.down_until <= now
+
+    def score(self):
+        # Unmeasured endpoints sort first so every node gets sampled
+        return (self.latency or 0.0) * (1 + 10 * self.error_rate)
+
+    def record(self, latency, ok):
+        self.requests += 1
+        self.error_rate += EWMA_ALPHA * ((0.0 if ok else 1.0) - self.error_rate)
+        if ok:
+            self.latency = latency if self.latency is None else self.latency + EWMA_ALPHA * (latency - self.latency)
+            self.failures = 0
+            self.down_until = 0.0
+        else:
+            self.failures += 1
+            if self.failures >= MAX_FAILURES:
+                self.down_until = time.monotonic() + COOLDOWN
+
+    def as_dict(self):
+        return {
+            "url": self.url,
+            "latency_ms": self.latency * 1e3 if self.latency is not None else None,
+            "error_rate": self.error_rate,
+            "healthy": self.healthy(time.monotonic()),
+            "requests": self.requests,
+        }
+
+
+class RpcRouter:
+    """Drop-in transport that spreads JSON-RPC traffic over several endpoints.
+
+    Requests addressed to `alias` (RPC_URL by default) or to any of the endpoints go to the healthy
+    endpoint with the lowest EWMA latency, weighted by its recent error rate; a failure is retried on
+    the next one. Methods in `hedged_methods` are also sent to the runner-up if the first endpoint has
+    not answered within `hedge_delay`, and the first good answer wins. A background thread probes
+    every endpoint with getHealth so nodes that went down come back once they recover. Anything
+    else (pumpapi, ...) passes straight through to the wrapped transport. Subscriptions ask `ws_url_for`
+    for the websocket of the endpoint currently ranked first.
+    """
+
+    def __init__(self, endpoints, transport=None, alias=RPC_URL, hedge_delay=HEDGE_DELAY, hedged_methods=HEDGED_METHODS,
+                 health_interval=HEALTH_INTERVAL, ws_endpoints=None):
+        if not endpoints:
+            raise Exception("RpcRouter needs at least one endpoint")
+        if ws_endpoints and len(ws_endpoints) != len(endpoints):
+            raise Exception("RpcRouter needs one websocket URL per endpoint")
+        self.transport = transport or get_transport()
+        self.alias = alias
+        self.hedge_delay = hedge_delay
+        self.hedged_methods = set(hedged_methods or ())
+        self.health_interval = health_interval
+        self.stats = {url: EndpointStats(url) for url in endpoints}
+        self.ws_urls = dict(zip(endpoints, ws_endpoints or [ws_url_for(url) for url in endpoints]))
+        self.executor = ThreadPoolExecutor(ROUTER_WORKERS, thread_name_prefix="rpc-router")
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- endpoint selection -----------------------------------------------------------------
+
+    def ranked(self):
+        now = time.monotonic()
+        with self._lock:
+            stats = list(self.stats.values())
+        healthy = sorted((s for s in stats if s.healthy(now)), key=EndpointStats.score)
+        # With everything down, still try the ones closest to coming back rather than failing outright
+        return healthy or sorted(stats, key=lambda s: s.down_until)
+
+    def best(self):
+        return self.ranked()[0].url
+
+    def report(self):
+        return [s.as_dict() for s in self.ranked()]
+
+    # --- transport interface ----------------------------------------------------------------
+
+    def _routed(self, url):
+        return url == self.alias or url in self.stats
+
+    def post(self, url, json=None, data=None, headers=None, timeout=None):
+        if not self._routed(url):
+            return self.transport.post(url, json=json, data=data, headers=headers, timeout=timeout)
+        self.start()
+        kwargs = {"json": json, "data": data, "headers": headers, "timeout": timeout}
+        if self.hedge_delay is not None and _method(json, data) in self.hedged_methods:
+            return self._hedged(kwargs)
+        return self._failover(kwargs)
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        return self.transport.get(url, params=params, headers=headers, timeout=timeout)
+
+    def session_for(self, url):
+        return self.transport.session_for(self.best() if self._routed(url) else url)
+
+    def ws_url_for(self, url):
+        return self.ws_urls[self.best()] if self._routed(url) else ws_url_for(url)
+
+    def _attempt(self, endpoint, kwargs):
+        stats = self.stats[endpoint]
+        start = time.perf_counter()
+        try:
+            response = self.transport.post(endpoint, **kwargs)
+        except transport_errors():
+            with self._lock:
+                stats.record(time.perf_counter() - start, ok=False)
+            raise
+        ok = response.status_code < 500 and response.status_code != 429
+        with self._lock:
+            stats.record(time.perf_counter() - start, ok)
+        return response, ok
+
+    def _failover(self, kwargs):
+        response, error = None, None
+        for stats in self.ranked():
+            try:
+                response, ok = self._attempt(stats.url, kwargs)
+            except transport_errors() as e:
+                error = e
+                continue
+            if ok:
+                return response
+        if response is not None:
+            return response
+        raise error
+
+    def _hedged(self, kwargs):
+        candidates = [stats.url for stats in self.ranked()]
+        pending = {self.executor.submit(self._attempt, candidates[0], kwargs)}
+        fallback, error = None, None
+        next_index, waited = 1, False
+        while pending:
+            # Give the fastest endpoint a head start; after that, whoever answers first wins
+            timeout = self.hedge_delay if not waited and next_index < len(candidates) else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            waited = True
+            for future in done:
+                try:
+                    response, ok = future.result()
+                except transport_errors() as e:
+                    error = e
+                    continue
+                if ok:
+                    return response
+                fallback = response
+            # Timed out or got a bad answer: bring in the next endpoint
+            if next_index < len(candidates):
+                pending.add(self.executor.submit(self._attempt, candidates[next_index], kwargs))
+                next_index += 1
+        if fallback is not None:
+            return fallback
+        raise error
+
+    # --- health checks ----------------------------------------------------------------------
+
+    def check_health(self):
+        payload = {"jsonrpc": "2.0", "id": 1, "method": "getHealth"}
+        for endpoint in list(self.stats):
+            try:
+                response, ok = self._attempt(endpoint, {"json": payload, "data": None, "headers": None, "timeout": None})
+            except transport_errors() as e:
+                log(f"RPC endpoint {endpoint} unreachable: {e}")
+                continue
+            if ok and "error" in response_json(response):
+                # A node that is behind answers getHealth with an error; keep it out until it catches up
+                with self._lock:
+                    self.stats[endpoint].down_until = time.monotonic() + self.health_interval
+
+    def start(self):
+        with self._lock:
+            if self._thread is None and self.health_interval:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="rpc-health", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.check_health()
+            except Exception as e:
+                log(f"RPC health check failed: {e}")
+            self._stop.wait(self.health_interval)
+
+    def close(self):
+        self._stop.set()
+        self._thread = None
+        self.executor.shutdown(wait=False)
+
+
+def _method(payload, data):
+    if payload is None and data:
+        try:
+            payload = json.loads(data)
+        except ValueError:
+            return None
+    return payload.get("method") if isinstance(payload, dict) else None
+
+
+def endpoints_from_env(name=RPC_ENDPOINTS_ENV):
+    return [url.strip() for url in os.getenv(name, "").split(",") if url.strip()]
+
+
+def make_router(transport=None, endpoints=None, **kwargs):
+    """Wrap `transport` in an RpcRouter over RPC_ENDPOINTS (or `endpoints`); unchanged when none are set."""
+    if isinstance(transport, RpcRouter) and endpoints is None:
+        return transport  # already routed, e.g. shared between managers
+    endpoints = endpoints or endpoints_from_env()
+    if not endpoints:
+        return transport or get_transport()
+    if len(endpoints) == 1:
+        kwargs.setdefault("hedge_delay", None)
+    kwargs.setdefault("ws_endpoints", endpoints_from_env(RPC_WS_ENDPOINTS_ENV) or None)
+    return RpcRouter(endpoints, transport, **kwargs)
@@ -0,0 +1,129 @@
+"""Journaled fleet buys across process restarts, against mock_server.
+
+Each run of `perform_buy_trades` happens in its own child process (this file run as a script), the way
+a crashed script and its re-run would, all sharing one journal and one mock chain.
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+
+import base58
+import pytest
+from solana.keypair import Keypair
+
+import mock_server
+from journal import PLANNED, Journal
+from mock_server import MockServer
+
+MINT = "DpbbGCQSxTrQc6jPAbSHzptnnr2FbowwJGWE3aevTbev"
+BOTS = ["PRIVATE_KEY2", "PRIVATE_KEY3", "PRIVATE_KEY4"]
+CRASHED = 3  # exit code of a child killed right after its first broadcast
+
+
+@pytest.fixture
+def fleet(tmp_path, monkeypatch):
+    # Blockhashes expire within a couple of seconds, so a crashed run's unsent buys are decided quickly
+    monkeypatch.setattr(mock_server, "BLOCKHASH_VALIDITY", 3)
+    server = MockServer().start()
+    server.chain.add_mint(MINT)
+    keys = [base58.b58encode(Keypair.generate().secret_key).decode() for _ in range(len(BOTS) + 1)]
+    env_file = tmp_path / "keys.env"
+    env_file.write_text(f"HEAD_HUNCHO_PRIVATE_KEY={keys[0]}\n"
+                        + "".join(f"{name}={key}\n" for name, key in zip(BOTS, keys[1:])))
+    for key in keys:
+        server.chain.fund(Keypair.from_secret_key(base58.b58decode(key)).public_key, 5_000_000_000)
+    yield server, tmp_path
+    server.stop()
+
+
+def buy(server, directory, crash=False):
+    """Run one fleet buy in a fresh process; returns (exit code, its report)."""
+    env = dict(os.environ, RPC_ENDPOINTS=server.url, RPC_WS_ENDPOINTS=server.ws_url, PUMFUN_VERBOSE="0")
+    child = subprocess.run([sys.executable, __file__, str(directory), "crash" if crash else "buy"], env=env,
+                           cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, timeout=120)
+    lines = child.stdout.strip().splitlines()
+    return child.returncode, json.loads(lines[-1]) if child.returncode == 0 else None
+
+
+def test_second_run_buys_again(fleet):
+    server, directory = fleet
+    code, first = buy(server, directory)
+    assert code == 0 and set(first["sent"]) == set(BOTS)
+    code, second = buy(server, directory)
+    assert code == 0 and set(second["sent"]) == set(BOTS)
+    assert set(first["sent"].values()).isdisjoint(second["sent"].values())
+    assert server.counts["sendTransaction"] == 2 * len(BOTS)
+
+
+def test_crashed_run_resumes_only_unsent_buys(fleet):
+    server, directory = fleet
+    code, _ = buy(server, directory, crash=True)
+    assert code == CRASHED
+    assert server.counts["sendTransaction"] == 1
+    code, resumed = buy(server, directory)
+    assert code == 0 and set(resumed["sent"]) == set(BOTS[1:])
+    assert server.counts["sendTransaction"] == len(BOTS)
+    # Nothing left over: the next run is a new one for the whole fleet
+    code, fresh = buy(server, directory)
+    assert code == 0 and set(fresh["sent"]) == set(BOTS)
+
+
+def test_confirm_sent_transactions_covers_journaled_buys(fleet):
+    server, directory = fleet
+    code, report = buy(server, directory)
+    assert code == 0
+    assert report["confirmed"] == {signature: True for signature in report["sent"].values()}
+
+
+def test_live_lease_is_not_taken_over(tmp_path):
+    # Same host and pid: the daemon and a script sharing the journal, as far as the lease can tell
+    daemon = Journal(str(tmp_path / "journal.sqlite3"), owner=f"{socket.gethostname()}:{os.getpid()}:daemon")
+    script = Journal(str(tmp_path / "journal.sqlite3"), owner=f"{socket.gethostname()}:{os.getpid()}:script")
+    run, _ = daemon.open_run("buy:mint", tracker=None)
+    daemon.plan(run, [("PRIVATE_KEY2", {})])
+    other, steps = script.open_run("buy:mint", tracker=None)
+    assert other != run and steps == []
+    daemon._db.execute("UPDATE runs SET heartbeat = 0 WHERE run = ?", (run,))
+    daemon._db.commit()
+    taken, steps = script.open_run("buy:mint", tracker=None)
+    assert taken == run and [step.state for step in steps] == [PLANNED]
+    assert Journal(str(tmp_path / "journal.sqlite3")).open_run("buy:mint", tracker=None)[1] == []
+
+
+def test_dead_owner_is_taken_over_at_once(tmp_path):
+    crashed = Journal(str(tmp_path / "journal.sqlite3"), owner=f"{socket.gethostname()}:{2 ** 22 + 1}")
+    run, _ = crashed.open_run("sweep:mint", tracker=None)
+    crashed.plan(run, [("PRIVATE_KEY2", {})])
+    assert Journal(str(tmp_path / "journal.sqlite3")).open_run("sweep:mint", tracker=None)[0] == run
+
+
+def main(directory, mode):
+    import contextlib
+    import io
+
+    from rate_limiter import configure_limiter
+    from tester2 import WalletManager
+
+    configure_limiter(os.environ["RPC_ENDPOINTS"], rate=100_000)
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = WalletManager(os.path.join(directory, "keys.env"),
+                                mint_cache_path=os.path.join(directory, "mints.sqlite3"),
+                                keystore_path=os.path.join(directory, "none.keystore"),
+                                journal_path=os.path.join(directory, "journal.sqlite3"))
+        if mode == "crash":
+            send_signed = manager.pipeline.send_signed
+
+            def send_then_die(*args, **kwargs):
+                signature, sent = send_signed(*args, **kwargs)
+                sent.result()
+                os._exit(CRASHED)
+            manager.pipeline.send_signed = send_then_die
+        sent = manager.perform_buy_trades(MINT, 0.01, 5, 0.0001, BOTS)
+        confirmed = manager.confirm_sent_transactions(timeout=30)
+    print(json.dumps({"sent": sent, "confirmed": confirmed}))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
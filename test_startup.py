@@ -0,0 +1,14 @@
+"""Cold-start budget of the one-shot entry points, the same measurement bench_startup.py reports."""
+import pytest
+
+from bench_startup import ENTRY_POINTS, RUNS, STARTUP_BUDGET_MS, cold_start
+
+
+@pytest.mark.parametrize("module", ENTRY_POINTS)
+def test_cold_start_within_budget(module, tmp_path):
+    env_file = tmp_path / "startup.env"
+    env_file.write_text("HEAD_HUNCHO_PRIVATE_KEY=\n")
+    keystore = str(tmp_path / "none.keystore")
+    # Best of RUNS: one slow sample is the machine, every sample slow is the code
+    best_ms = min(cold_start(module, str(env_file), keystore)[0] for _ in range(RUNS)) * 1e3
+    assert best_ms <= STARTUP_BUDGET_MS, f"{module} cold start took {best_ms:.1f} ms (budget {STARTUP_BUDGET_MS} ms)"
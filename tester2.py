@@ -1,168 +1,188 @@
-import os
-import base58
-import requests
-from solana.keypair import Keypair
-from solana.publickey import PublicKey
-from solana.rpc.api import Client
-from solana.rpc.commitment import Confirmed
-from solana.transaction import Transaction
-from solana.system_program import transfer, TransferParams
-from dotenv import load_dotenv
-import asyncio
-
-
-
-def get_associated_token_address(wallet_address, token_mint_address):
-    """Get the associated token address for a wallet and mint."""
-    return PublicKey.find_program_address(
-        [bytes(wallet_address), bytes(TOKEN_PROGRAM_ID), bytes(token_mint_address)],
-        ASSOCIATED_TOKEN_PROGRAM_ID,
-    )[0]
-
-class WalletManager:
-    def __init__(self, env_file='wallet_keys.env'):
-        load_dotenv(env_file)
-        self.keys = {
-            'HEAD_HUNCHO_PRIVATE_KEY': os.getenv('HEAD_HUNCHO_PRIVATE_KEY'),
-            'PRIVATE_KEY2': os.getenv('PRIVATE_KEY2'),
-            'PRIVATE_KEY3': os.getenv('PRIVATE_KEY3'),
-            'PRIVATE_KEY4': os.getenv('PRIVATE_KEY4'),
-            'PRIVATE_KEY5': os.getenv('PRIVATE_KEY5'),
-            'PRIVATE_KEY6': os.getenv('PRIVATE_KEY6'),
-            'PRIVATE_KEY7': os.getenv('PRIVATE_KEY7'),
-            'PRIVATE_KEY8': os.getenv('PRIVATE_KEY8'),
-        }
-        self.public_keys = {name: self.get_public_key_from_private(pk) for name, pk in self.keys.items()}
-        self.client = Client("https://api.mainnet-beta.solana.com")
+from instrumentation import log
+from wallet_base import WalletManagerBase
 
+
+class WalletManager(WalletManagerBase):
     def get_public_key_from_private(self, private_key_str):
-        private_key_bytes = base58.b58decode(private_key_str)
-        keypair = Keypair.from_secret_key(private_key_bytes)
-        return keypair.public_key
+        return self.registry.public_key(private_key_str)
 
     def get_sol_balance(self, public_key):
         response = self.client.get_balance(public_key)
         if response['result']:
             sol_balance = response['result']['value'] / 1e9  # Convert lamports to SOL
-            print(f"SOL Balance for {public_key}: {sol_balance} SOL")
+            log(f"SOL Balance for {public_key}: {sol_balance} SOL")
             return sol_balance
         else:
-            print(f"Error retrieving balance for {public_key}")
+            log(f"Error retrieving balance for {public_key}")
             return None
 
     def get_all_sol_balances(self):
-        return {name: self.get_sol_balance(pk) for name, pk in self.public_keys.items()}
-
-    def get_token_balance(self, wallet_address, mint_address):
-        url = "https://api.mainnet-beta.solana.com"
-        headers = {"Content-Type": "application/json"}
-        payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "getTokenAccountsByOwner",
-            "params": [
-                wallet_address,
-                {"mint": mint_address},
-                {"encoding": "jsonParsed"}
-            ]
-        }
-
-        response = requests.post(url, json=payload, headers=headers)
-        if response.status_code == 200:
-            try:
-                result = response.json()["result"]["value"]
-                if result:
-                    token_balance = result[0]["account"]["data"]["parsed"]["info"]["tokenAmount"]["uiAmount"]
-                    print(f"Token Balance: {token_balance} tokens")
-                    return token_balance
-                else:
-                    print("No token accounts found for the given mint address.")
-                    return None
-            except (IndexError, KeyError) as e:
-                print(f"Error extracting token balance: {e}")
-                return None
+        names = list(self.public_keys)
+        if self.portfolio is not None and self.portfolio.live():
+            lamports = [self.portfolio.lamports[self.portfolio.rows[name]] for name in names]
+        else:
+            lamports = self.batch_rpc.get_balances(self.public_keys[name] for name in names)
+        balances = {}
+        for name, value in zip(names, lamports):
+            public_key = self.public_keys[name]
+            if value is None:
+                log(f"Error retrieving balance for {public_key}")
+                balances[name] = None
+            else:
+                balances[name] = value / 1e9  # Convert lamports to SOL
+                log(f"SOL Balance for {public_key}: {balances[name]} SOL")
+        return balances
+
+    def fleet_snapshot(self, mint_address=None):
+        return self.batch_rpc.fleet_snapshot(self.public_keys, mint_address)
+
+    def watch_portfolio(self, mint_addresses=()):
+        """Start the live fleet portfolio; balance reads below are then served from it without RPC.
+
+        The bonding curves of `mint_addresses` are subscribed too, so quotes and trades on them skip the fetch.
+        """
+        from portfolio import Portfolio
+        for mint_address in mint_addresses:
+            self.quote_engine.subscribe(mint_address)
+        if self.portfolio is None:
+            self.portfolio = Portfolio(self.public_keys, mint_addresses, self.rpc_url, transport=self.transport,
+                                       batch_rpc=self.batch_rpc, registry=self.registry)
+            self.portfolio.start()
         else:
-            print(f"Error: {response.status_code} - {response.text}")
+            for mint_address in mint_addresses:
+                self.portfolio.add_mint(mint_address)
+        return self.portfolio
+
+    def get_token_amount(self, wallet_address, mint_address):
+        """Exact TokenAmount(amount, decimals) held by `wallet_address`; the decimals come with the balance read."""
+        if self.portfolio is not None and self.portfolio.tracks(wallet_address, mint_address):
+            token_amount = self.portfolio.token_amount(wallet_address, mint_address)
+        else:
+            # base64 + dataSlice: the exact u64 amount instead of a jsonParsed float
+            token_amount = self.batch_rpc.get_token_amounts([wallet_address], mint_address)[0]
+        if token_amount is None:
+            log("No token accounts found for the given mint address.")
             return None
+        log(f"Token Balance: {token_amount.ui_amount} tokens")
+        return token_amount
+
+    def get_token_balance(self, wallet_address, mint_address):
+        token_amount = self.get_token_amount(wallet_address, mint_address)
+        return None if token_amount is None else token_amount.ui_amount
 
     def get_quote(self, quote_type, mint, amount, slippage):
-        url_quote = "https://pumpapi.fun/api/quote"
-        payload_quote = {
-            "quote_type": quote_type,
-            "mint": mint,
-            "amount": amount,
-            "slippage": slippage
-        }
-        response = requests.post(url_quote, json=payload_quote)
-        if response.status_code == 200:
-            quote_data = response.json()
-            print(f"Quote: {quote_data}")
-            return quote_data
-        else:
-            print(f"Error: {response.status_code} - {response.text}")
+        # Priced locally from the cached bonding curve instead of a pumpapi round trip
+        try:
+            quote_data = self.quote_engine.quote(quote_type, mint, amount, slippage)
+        except Exception as e:
+            log(f"Error: {e}")
             return None
+        log(f"Quote: {quote_data}")
+        return quote_data
 
     def perform_buy_trade(self, mint, amount_in_sol, slippage, priority_fee, wallet_private_key):
-        
-     
-        url = "https://pumpapi.fun/api/trade"
-        payload = {
-            "trade_type": "buy",                    # Buy or sell 
-            "mint": fr"{mint}",            # Token mint address
-            "amount": 0.01,                         # Amount in SOL , if buying or of tokens if selling.
-            "slippage": 5,                          # Desired slippage 
-            "priorityFee": 0.003,                   # Value in SOL
-            "userPrivateKey": fr"{wallet_private_key}"   # Wallet private key 
-        }
-
-        response = requests.post(url, json=payload)
-
-        if response.status_code == 200:
-            transaction_id = response.json()["tx_hash"]
-            print(f"Transaction ID: {transaction_id}")
-            return True
-        else:
-            
-            print(f"Error: {response.status_code} - {response.text}")
+        # Built and signed locally; the private key never leaves this process
+        try:
+            trade_data = self.trade_engine.buy(wallet_private_key, mint, int(amount_in_sol * 1e9), slippage,
+                                               priority_fee)
+        except Exception as e:
+            log(f"Error: {e}")
             return False
-
-
-
-    def perform_sell_trade(self, wallet_address, mint_address, percentage, slippage):
-        balance_in_tokens = self.get_token_balance(wallet_address, mint_address)
-        if balance_in_tokens is None:
-            print("Failed to retrieve balance.")
+        log(f"Transaction ID: {trade_data['tx_hash']}")
+        return True
+
+    def perform_buy_trades(self, mint, amount_in_sol, slippage, priority_fee, names):
+        """Buy `amount_in_sol` of `mint` from each named wallet; returns {name: signature} of the acknowledged sends.
+
+        Journaled like the token sweep: after a crash the next call settles the interrupted run and only
+        buys from the wallets whose transaction never landed, whatever `names` it is given.
+        """
+        from journal import PLANNED
+        # A fleet buy is followed by quotes and sells on the same curve: keep it pushed from now on
+        self.quote_engine.subscribe(mint)
+        run, steps = self.journal.open_run(f"buy:{mint}", self.confirmations)
+        if steps:
+            todo = [(step.step, step.params["amount_lamports"]) for step in steps if step.state == PLANNED]
+            log(f"Resuming {run}: {len(todo)} of {len(steps)} buys left")
+        else:
+            todo = [(name, int(amount_in_sol * 1e9)) for name in names]
+            self.journal.plan(run, [(name, {"amount_lamports": lamports}) for name, lamports in todo])
+        signed = []
+        for name, lamports in todo:
+            keypair = self.registry.keypair(self.keys[name])
+            try:
+                transaction, _ = self.trade_engine.build_buy(keypair, mint, lamports, slippage, priority_fee)
+            except Exception as e:
+                log(f"Error building buy for {name}: {e}")
+                continue
+            signed.append((name, self.pipeline.sign(transaction, keypair)))
+        # Every signature is on disk before the first buy goes out
+        self.journal.mark_sent(run, [(name, signature, height) for name, (_, signature, height) in signed])
+        sends = [(name, signed_transaction[2], self.pipeline.send_signed(*signed_transaction, in_flight=False))
+                 for name, signed_transaction in signed]
+        results = {}
+        for name, height, (signature, sent) in sends:
+            # Tracked either way: even an unacknowledged send may have reached a leader
+            self.journal.track(run, [name], signature, height, self.confirmations)
+            try:
+                sent.result()
+            except Exception as e:
+                log(f"Buy from {name} may not have been sent: {e}")
+                continue
+            log(f"Buy from {name}: Transaction ID: {signature}")
+            results[name] = signature
+        self.journal.finish_if_done(run)
+        return results
+
+    def perform_sell_trade(self, wallet_address, mint_address, percentage, slippage, priority_fee=None):
+        # `wallet_address` may be a key name or a public key
+        try:
+            name = self.seller.resolve(wallet_address)
+        except Exception as e:
+            log(f"Error: {e}")
+            return None
+        balance = self.get_token_amount(str(self.public_keys[name]), mint_address)
+        if balance is None:
+            log("Failed to retrieve balance.")
             return None
 
-        amount_to_sell = balance_in_tokens * (percentage / 100)
-        print(f"Amount to sell in tokens: {amount_to_sell}")
+        # Integer basis-point split of the atomic balance: selling 100% leaves no float-truncation dust
+        amount_to_sell = balance.percent(percentage)
+        log(f"Amount to sell in tokens: {amount_to_sell.ui_amount}")
 
         quote = self.get_quote("sell", mint_address, amount_to_sell, slippage)
         if quote is None:
-            print("Failed to get a valid sell quote.")
+            log("Failed to get a valid sell quote.")
             return None
 
-        url_trade = "https://pumpapi.fun/api/trade"
-        payload_trade = {
-            "trade_type": "sell",
-            "mint": mint_address,
-            "amount": amount_to_sell,
-            "slippage": slippage,
-            "priorityFee": 0.003,
-            "userPrivateKey": self.keys[wallet_address]
-        }
-
-        response_trade = requests.post(url_trade, json=payload_trade)
-        if response_trade.status_code == 200:
-            trade_data = response_trade.json()
-            print(f"Sell Transaction ID: {trade_data['tx_hash']}")
-            return trade_data
-        else:
-            print(f"Error executing sell trade: {response_trade.status_code} - {response_trade.text}")
+        try:
+            trade_data = self.trade_engine.sell(self.keys[name], mint_address, amount_to_sell.amount,
+                                                slippage, priority_fee)
+        except Exception as e:
+            log(f"Error executing sell trade: {e}")
             return None
+        log(f"Sell Transaction ID: {trade_data['tx_hash']}")
+        return trade_data
+
+    def perform_batch_sell(self, plan, slippage, priority_fee=None, concurrency=None):
+        """Sell a [(wallet, mint, percentage)] plan across the fleet; returns the BatchSeller report."""
+        try:
+            report = self.seller.execute(plan, slippage, priority_fee, concurrency)
+        except Exception as e:
+            log(f"Error executing batch sell: {e}")
+            return None
+        for outcome in report["orders"]:
+            if outcome["ok"]:
+                log(f"Sold {outcome['percentage']}% of {outcome['mint']} from {outcome['wallet']}: {outcome['tx_hash']}")
+            else:
+                log(f"Sell of {outcome['mint']} from {outcome['wallet']} failed - {outcome['error']}")
+        return report
 
     def transfer_sol(self, from_private_key, to_public_key, amount_sol):
-        from_keypair = Keypair.from_secret_key(base58.b58decode(from_private_key))
+        from solana.publickey import PublicKey
+        from solana.system_program import TransferParams, transfer
+        from solana.transaction import Transaction
+        from_keypair = self.registry.keypair(from_private_key)
         to_pubkey = PublicKey(to_public_key)
         amount_lamports = int(amount_sol * 1e9)
 
@@ -177,81 +197,56 @@ class WalletManager:
             )
         )
 
-        response = self.client.send_transaction(transaction, from_keypair)
-        if response.get('result'):
-            print(f"Transaction successful: {response['result']}")
-            return response['result']
-        else:
-            print(f"Transaction failed: {response}")
-            return None
+        return self.send_transaction(transaction, from_keypair)
 
     async def top_up_bot_wallets(self, amount_sol):
-        head_huncho_private_key = self.keys['HEAD_HUNCHO_PRIVATE_KEY']
-        for name, public_key in self.public_keys.items():
-            if name != 'HEAD_HUNCHO_PRIVATE_KEY':
-                result = self.transfer_sol(head_huncho_private_key, public_key, amount_sol)
-                if result:
-                    print(f"Top up {name} ({public_key}): Successful, Transaction ID: {result}")
+        import asyncio
+        from solana.publickey import PublicKey
+        from solana.system_program import TransferParams, transfer
+        from compute_budget import priority_fee_lamports
+        from tx_packer import TransactionPacker
+        head_huncho_keypair = self.registry.keypair(self.keys['HEAD_HUNCHO_PRIVATE_KEY'])
+        bots = [(name, public_key) for name, public_key in self.public_keys.items() if name != 'HEAD_HUNCHO_PRIVATE_KEY']
+        # Pack the transfers into as few transactions as fit instead of one transaction per bot
+        items = [
+            (transfer(TransferParams(from_pubkey=head_huncho_keypair.public_key, to_pubkey=PublicKey(public_key),
+                                     lamports=int(amount_sol * 1e9))), [head_huncho_keypair])
+            for _, public_key in bots
+        ]
+        packer = TransactionPacker(head_huncho_keypair)
+        packed = packer.pack(items)
+        sends = [self.pipeline.send(entry.transaction, *entry.signers) for entry in packed]
+        results = await asyncio.gather(*(asyncio.wrap_future(sent) for _, sent in sends), return_exceptions=True)
+        for entry, (signature, _), result in zip(packed, sends, results):
+            for index in entry.indices:
+                name, public_key = bots[index]
+                if isinstance(result, Exception):
+                    log(f"Top up {name} ({public_key}): Failed - {result}")
                 else:
-                    print(f"Top up {name} ({public_key}): Failed")
-                await asyncio.sleep(2)
+                    log(f"Top up {name} ({public_key}): Successful, Transaction ID: {signature}")
+        # Signing prepended each transaction's compute budget, so the report prices what was actually paid
+        priority_fees = [priority_fee_lamports(entry.transaction) for entry in packed]
+        log(f"Packing: {packer.report(items, packed, sum(priority_fees) // max(len(priority_fees), 1))}")
+
+    def precompute_atas(self, mint_address):
+        return self.registry.precompute_atas(self.public_keys.values(), mint_address)
 
     def print_public_keys(self):
         for name, public_key in self.public_keys.items():
-            print(f"{name}: {public_key}")
-
-
-    def get_mint_decimals(self, mint_address):
-        mint_pubkey = PublicKey(mint_address)
-        mint_info = self.client.get_token_supply(mint_pubkey)
-        if 'result' in mint_info:
-            return mint_info['result']['value']['decimals']
-        else:
-            raise Exception(f"Failed to get mint decimals for {mint_address}")
+            log(f"{name}: {public_key}")
 
-    def transfer_tokens(self, from_private_key, to_public_key, mint_address, amount):
-        from_keypair = Keypair.from_secret_key(base58.b58decode(from_private_key))
-        from_pubkey = from_keypair.public_key
-        to_pubkey = PublicKey(to_public_key)
-        mint_pubkey = PublicKey(mint_address)
-        
-        # Get associated token accounts
-        from_token_account = get_associated_token_address(from_pubkey, mint_pubkey)
-        to_token_account = get_associated_token_address(to_pubkey, mint_pubkey)
-        
-        # Get the mint decimals
-        mint_decimals = self.get_mint_decimals(mint_address)
 
+    def transfer_tokens(self, from_private_key, to_public_key, mint_address, amount, decimals=None):
+        from solana.transaction import Transaction
+        from_keypair = self.registry.keypair(from_private_key)
         transaction = Transaction()
-        transaction.add(
-            transfer_checked(
-                TransferCheckedParams(
-                    program_id=TOKEN_PROGRAM_ID,
-                    source=from_token_account,
-                    mint=mint_pubkey,
-                    dest=to_token_account,
-                    owner=from_pubkey,
-                    amount=amount,
-                    decimals=mint_decimals
-                )
-            )
-        )
-
-        response = self.client.send_transaction(transaction, from_keypair)
-        if response.get('result'):
-            print(f"Transaction successful: {response['result']}")
-            return response['result']
-        else:
-            print(f"Transaction failed: {response}")
-            return None
-
+        transaction.add(self.token_transfer_instruction(from_keypair.public_key, to_public_key, mint_address, amount, decimals))
+        return self.send_transaction(transaction, from_keypair)
 
-
-
-
-    
 # Sample usage
 if __name__ == "__main__":
+    import asyncio
+
     wallet_manager = WalletManager()
 
     # Print public keys
@@ -259,21 +254,21 @@ if __name__ == "__main__":
 
     # Top up all bot wallets with 0.01 SOL if needed
     asyncio.run(wallet_manager.top_up_bot_wallets(0.01))
+    wallet_manager.confirm_sent_transactions()
 
     # Perform buy trade for 0.01 SOL of DpbbGCQSxTrQc6jPAbSHzptnnr2FbowwJGWE3aevTbev
     mint_address = "DpbbGCQSxTrQc6jPAbSHzptnnr2FbowwJGWE3aevTbev"
     amount_in_sol = 0.01
     slippage = 5
-    priority_fee = 0.003
-
-    for key_name in ['PRIVATE_KEY2', 'PRIVATE_KEY3', 'PRIVATE_KEY4', 'PRIVATE_KEY5', 'PRIVATE_KEY6', 'PRIVATE_KEY7', 'PRIVATE_KEY8']:
-        private_key = wallet_manager.keys[key_name]
-        print(f"Buying with {key_name}...")
-        trade_result = wallet_manager.perform_buy_trade(mint_address, amount_in_sol, slippage, priority_fee, private_key)
-        if trade_result:
-            print(f"Trade successful for {key_name}: {trade_result}")
-        else:
-            print(f"Trade failed for {key_name}")
+    priority_fee = "fast"  # a landing speed priced from recent fees, or a fixed amount in SOL
+
+    # Journaled, so re-running after a crash only buys from the wallets whose buy never landed
+    key_names = ['PRIVATE_KEY2', 'PRIVATE_KEY3', 'PRIVATE_KEY4', 'PRIVATE_KEY5', 'PRIVATE_KEY6', 'PRIVATE_KEY7', 'PRIVATE_KEY8']
+    trade_results = wallet_manager.perform_buy_trades(mint_address, amount_in_sol, slippage, priority_fee, key_names)
+    for key_name, signature in trade_results.items():
+        print(f"Trade sent for {key_name}: {signature}")
+    # Wait for the journal to record every buy's outcome before exiting
+    wallet_manager.confirm_sent_transactions()
 
     # # Transfer all tokens back to head huncho
     # wallet_manager.transfer_all_tokens_back_to_head_huncho(mint_address)
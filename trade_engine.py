@@ -0,0 +1,155 @@
+import struct
+
+from solana.publickey import PublicKey
+from solana.system_program import SYS_PROGRAM_ID
+from solana.sysvar import SYSVAR_RENT_PUBKEY
+from solana.transaction import AccountMeta, Transaction, TransactionInstruction
+from spl.token.constants import ASSOCIATED_TOKEN_PROGRAM_ID, TOKEN_PROGRAM_ID
+
+from bonding_curve import (
+    PUMP_EVENT_AUTHORITY, PUMP_FEE_RECIPIENT, PUMP_GLOBAL, PUMP_PROGRAM_ID, buy_tokens_out,
+    get_bonding_curve_address, sell_sol_out, sol_for_curve, with_slippage,
+)
+from compute_budget import priority_fee_instructions, set_compute_unit_limit, set_compute_unit_price
+from instrumentation import span
+from key_registry import get_associated_token_address, get_registry
+from priority_fees import DEFAULT_SPEED, PriorityFeeEstimator
+from quote_engine import QuoteEngine
+from rpc_batch import BatchRpc
+from transport import RPC_URL, get_transport
+from tx_pipeline import TxPipeline
+
+BUY_DISCRIMINATOR = bytes.fromhex("66063d1201daebea")
+SELL_DISCRIMINATOR = bytes.fromhex("33e685a4017f83ad")
+
+TRADE_COMPUTE_UNITS = 100_000  # limit used if a trade's shape cannot be simulated
+
+
+def create_associated_token_account_idempotent(payer, owner, mint):
+    """ATA program CreateIdempotent: a no-op when the account already exists."""
+    return TransactionInstruction(
+        keys=[
+            AccountMeta(pubkey=payer, is_signer=True, is_writable=True),
+            AccountMeta(pubkey=get_associated_token_address(owner, mint), is_signer=False, is_writable=True),
+            AccountMeta(pubkey=owner, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=mint, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=SYS_PROGRAM_ID, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
+        ],
+        program_id=ASSOCIATED_TOKEN_PROGRAM_ID,
+        data=bytes([1]),
+    )
+
+
+def _curve_accounts(user, mint):
+    bonding_curve = get_bonding_curve_address(mint)
+    return [
+        AccountMeta(pubkey=PUMP_GLOBAL, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=PUMP_FEE_RECIPIENT, is_signer=False, is_writable=True),
+        AccountMeta(pubkey=mint, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=bonding_curve, is_signer=False, is_writable=True),
+        AccountMeta(pubkey=get_associated_token_address(bonding_curve, mint), is_signer=False, is_writable=True),
+        AccountMeta(pubkey=get_associated_token_address(user, mint), is_signer=False, is_writable=True),
+        AccountMeta(pubkey=user, is_signer=True, is_writable=True),
+        AccountMeta(pubkey=SYS_PROGRAM_ID, is_signer=False, is_writable=False),
+    ]
+
+
+def buy_instruction(user, mint, token_amount, max_sol_cost):
+    keys = _curve_accounts(user, mint) + [
+        AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=SYSVAR_RENT_PUBKEY, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=PUMP_EVENT_AUTHORITY, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=PUMP_PROGRAM_ID, is_signer=False, is_writable=False),
+    ]
+    data = BUY_DISCRIMINATOR + struct.pack("<QQ", token_amount, max_sol_cost)
+    return TransactionInstruction(keys=keys, program_id=PUMP_PROGRAM_ID, data=data)
+
+
+def sell_instruction(user, mint, token_amount, min_sol_output):
+    keys = _curve_accounts(user, mint) + [
+        AccountMeta(pubkey=ASSOCIATED_TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=PUMP_EVENT_AUTHORITY, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=PUMP_PROGRAM_ID, is_signer=False, is_writable=False),
+    ]
+    data = SELL_DISCRIMINATOR + struct.pack("<QQ", token_amount, min_sol_output)
+    return TransactionInstruction(keys=keys, program_id=PUMP_PROGRAM_ID, data=data)
+
+
+class TradeEngine:
+    """Builds pump.fun buy/sell transactions locally, signs them with our own keypairs and submits over RPC.
+
+    Private keys never leave the process; the only network calls are the curve read and sendTransaction.
+    `priority_fee` is either a fixed amount in SOL or a landing speed ("economy", "normal", "fast",
+    "urgent"; None means normal) priced by the PriorityFeeEstimator from the curve's recent fees.
+    """
+
+    def __init__(self, pipeline=None, rpc_url=RPC_URL, transport=None, registry=None, quote_engine=None,
+                 fee_estimator=None):
+        self.rpc_url = rpc_url
+        self.transport = transport or get_transport()
+        self.pipeline = pipeline or TxPipeline(rpc_url, self.transport)
+        self.registry = registry or get_registry()
+        self.quote_engine = quote_engine or QuoteEngine(rpc_url, transport=self.transport)
+        self.fee_estimator = fee_estimator or PriorityFeeEstimator(BatchRpc(rpc_url, self.transport))
+
+    def get_curve(self, mint_address):
+        return self.quote_engine.get_state(mint_address)
+
+    def fee_instructions(self, mint, user, instructions, priority_fee):
+        units = self.pipeline.compute_budget.units(instructions, user, TRADE_COMPUTE_UNITS)
+        if priority_fee is None or isinstance(priority_fee, str):
+            # Every trade write-locks the fee recipient and the curve, so those set the going rate
+            accounts = (PUMP_FEE_RECIPIENT, get_bonding_curve_address(mint))
+            micro_lamports = self.fee_estimator.estimate(accounts, priority_fee or DEFAULT_SPEED)
+            return [set_compute_unit_limit(units), set_compute_unit_price(micro_lamports)]
+        return priority_fee_instructions(priority_fee, units)
+
+    def build_buy(self, keypair, mint_address, amount_lamports, slippage, priority_fee=0):
+        """Return (transaction, expected token amount) for spending `amount_lamports` on `mint_address`."""
+        with span("build", side="buy"):
+            return self._build_buy(keypair, mint_address, amount_lamports, slippage, priority_fee)
+
+    def _build_buy(self, keypair, mint_address, amount_lamports, slippage, priority_fee):
+        mint = PublicKey(mint_address)
+        user = keypair.public_key
+        token_amount = buy_tokens_out(self.get_curve(mint), sol_for_curve(amount_lamports))
+        if token_amount <= 0:
+            raise Exception(f"Bonding curve for {mint_address} cannot fill a buy of {amount_lamports} lamports")
+        instructions = [
+            create_associated_token_account_idempotent(user, user, mint),
+            buy_instruction(user, mint, token_amount, with_slippage(amount_lamports, slippage, up=True)),
+        ]
+        transaction = Transaction(fee_payer=user)
+        transaction.add(*self.fee_instructions(mint, user, instructions, priority_fee), *instructions)
+        return transaction, token_amount
+
+    def build_sell(self, keypair, mint_address, token_amount, slippage, priority_fee=0):
+        """Return (transaction, expected lamports) for selling `token_amount` atomic units."""
+        with span("build", side="sell"):
+            return self._build_sell(keypair, mint_address, token_amount, slippage, priority_fee)
+
+    def _build_sell(self, keypair, mint_address, token_amount, slippage, priority_fee):
+        mint = PublicKey(mint_address)
+        user = keypair.public_key
+        sol_out = sell_sol_out(self.get_curve(mint), token_amount)
+        instructions = [sell_instruction(user, mint, token_amount, with_slippage(sol_out, slippage, up=False))]
+        transaction = Transaction(fee_payer=user)
+        transaction.add(*self.fee_instructions(mint, user, instructions, priority_fee), *instructions)
+        return transaction, sol_out
+
+    def submit(self, transaction, keypair):
+        return self.pipeline.send_and_wait(transaction, keypair)
+
+    def buy(self, private_key, mint_address, amount_lamports, slippage, priority_fee=0):
+        with span("trade", side="buy"):
+            keypair = self.registry.keypair(private_key)
+            transaction, token_amount = self.build_buy(keypair, mint_address, amount_lamports, slippage, priority_fee)
+            return {"tx_hash": self.submit(transaction, keypair), "token_amount": token_amount}
+
+    def sell(self, private_key, mint_address, token_amount, slippage, priority_fee=0):
+        with span("trade", side="sell"):
+            keypair = self.registry.keypair(private_key)
+            transaction, sol_out = self.build_sell(keypair, mint_address, token_amount, slippage, priority_fee)
+            return {"tx_hash": self.submit(transaction, keypair), "sol_amount": sol_out}
@@ -0,0 +1,202 @@
+import sys
+import threading
+from importlib.util import find_spec
+from urllib.parse import urlsplit
+
+from rate_limiter import get_limiter
+
+# httpx, requests and solana's clients are imported on first use: together they are most of a cold start
+HTTP2_AVAILABLE = find_spec("h2") is not None  # httpx only negotiates HTTP/2 when h2 is installed
+
+RPC_URL = "https://api.mainnet-beta.solana.com"
+PUMPAPI_URL = "https://pumpapi.fun/api"
+
+DEFAULT_POOL_SIZE = 16
+DEFAULT_TIMEOUT = 10
+DEFAULT_RETRIES = 3  # extra attempts after a 429
+
+
+def ws_url_for(rpc_url, transport=None):
+    """Websocket URL for `rpc_url`; through an RpcRouter it is the routed endpoint's, so pushes and reads share a node."""
+    if hasattr(transport, "ws_url_for"):
+        return transport.ws_url_for(rpc_url)
+    return rpc_url.replace("https://", "wss://", 1).replace("http://", "ws://", 1)
+
+
+def _is_httpx(session):
+    httpx = sys.modules.get("httpx")
+    return httpx is not None and isinstance(session, httpx.Client)
+
+
+def transport_errors():
+    """Network errors of the HTTP clients loaded so far (one that was never imported cannot have raised)."""
+    errors = []
+    if "requests" in sys.modules:
+        errors.append(sys.modules["requests"].exceptions.RequestException)
+    if "httpx" in sys.modules:
+        errors.append(sys.modules["httpx"].HTTPError)
+    return tuple(errors)
+
+
+def _host(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class HttpTransport:
+    """Keep-alive connection pools, one per host, shared by every WalletManager network call."""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, http2=True, pool_sizes=None,
+                 retries=DEFAULT_RETRIES):
+        self.pool_size = pool_size
+        self.retries = retries
+        self.pool_sizes = pool_sizes or {}
+        self.timeout = timeout
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def session_for(self, url):
+        host = _host(url)
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = self._new_session(host)
+                    self._sessions[host] = session
+        return session
+
+    def _new_session(self, host):
+        pool_size = self.pool_sizes.get(urlsplit(host).hostname, self.pool_size)
+        if self.http2 and host.startswith("https://"):
+            import httpx
+            limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+            return httpx.Client(http2=True, limits=limits, timeout=self.timeout)
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def post(self, url, json=None, data=None, headers=None, timeout=None):
+        session = self.session_for(url)
+        timeout = timeout or self.timeout
+        if _is_httpx(session):
+            return self._send(url, session.post, url, json=json, content=data, headers=headers, timeout=timeout)
+        return self._send(url, session.post, url, json=json, data=data, headers=headers, timeout=timeout)
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        session = self.session_for(url)
+        return self._send(url, session.get, url, params=params, headers=headers, timeout=timeout or self.timeout)
+
+    def _send(self, url, method, *args, **kwargs):
+        limiter = get_limiter(url)
+        for attempt in range(self.retries + 1):
+            limiter.acquire()
+            response = method(*args, **kwargs)
+            if not limiter.on_response(response.status_code, response.headers) or attempt == self.retries:
+                return response
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_provider_class = None
+
+
+def pooled_provider_class():
+    """PooledHTTPProvider, defined on first use because solana's HTTPProvider imports requests and httpx."""
+    global _provider_class
+    if _provider_class is None:
+        import httpx
+        import requests
+        from solana.exceptions import SolanaRpcException, handle_exceptions
+        from solana.rpc.providers.http import HTTPProvider
+
+        class PooledHTTPProvider(HTTPProvider):
+            """solana-py HTTP provider that sends through an HttpTransport instead of a bare requests.post."""
+
+            def __init__(self, endpoint, transport, timeout=DEFAULT_TIMEOUT):
+                super().__init__(endpoint, timeout=timeout)
+                self.transport = transport
+
+            @handle_exceptions(SolanaRpcException, requests.exceptions.RequestException, httpx.HTTPError)
+            def make_request(self, method, *params):
+                request_kwargs = self._before_request(method=method, params=params, is_async=False)
+                raw_response = self.transport.post(**request_kwargs, timeout=self.timeout)
+                return self._after_request(raw_response=raw_response, method=method)
+
+        _provider_class = PooledHTTPProvider
+    return _provider_class
+
+
+_default_transport = None
+_default_lock = threading.Lock()
+
+
+def get_transport():
+    """Return the process-wide transport, creating it on first use."""
+    global _default_transport
+    if _default_transport is None:
+        with _default_lock:
+            if _default_transport is None:
+                _default_transport = HttpTransport()
+    return _default_transport
+
+
+def make_client(endpoint=RPC_URL, transport=None, timeout=DEFAULT_TIMEOUT):
+    """Build a solana Client whose RPC calls reuse the pooled connections of `transport`."""
+    from solana.rpc.api import Client
+    client = Client(endpoint, timeout=timeout)
+    client._provider = pooled_provider_class()(endpoint, transport or get_transport(), timeout=timeout)
+    return client
+
+
+def make_async_http(pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, http2=True):
+    """Pooled httpx.AsyncClient for AsyncWalletManager; one instance per event loop.
+
+    Every request waits on the host's shared RateLimiter and reports its status back to it.
+    """
+    import httpx
+
+    async def throttle(request):
+        await get_limiter(str(request.url)).acquire_async()
+
+    async def feedback(response):
+        get_limiter(str(response.request.url)).on_response(response.status_code, response.headers)
+
+    limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+    return httpx.AsyncClient(http2=http2 and HTTP2_AVAILABLE, limits=limits, timeout=timeout,
+                             event_hooks={"request": [throttle], "response": [feedback]})
+
+
+def make_async_client(endpoint=RPC_URL, http=None, timeout=DEFAULT_TIMEOUT):
+    """Build a solana AsyncClient that shares the connection pool of `http`."""
+    from solana.rpc.async_api import AsyncClient
+    client = AsyncClient(endpoint, timeout=timeout)
+    if http is not None:
+        unused, client._provider.session = client._provider.session, http
+        _close_unused(unused)
+    return client
+
+
+_closing = set()
+
+
+def _close_unused(session):
+    """Close an httpx.AsyncClient that never sent a request; from inside an event loop the close is scheduled on it."""
+    import asyncio
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(session.aclose())
+        return
+    task = loop.create_task(session.aclose())
+    _closing.add(task)  # the loop only keeps a weak reference to its tasks
+    task.add_done_callback(_closing.discard)
@@ -0,0 +1,95 @@
+from collections import namedtuple
+
+from solana.system_program import SYS_PROGRAM_ID
+from solana.transaction import Transaction
+from solana.utils import shortvec_encoding as shortvec
+from spl.token.constants import TOKEN_PROGRAM_ID
+
+PACKET_DATA_SIZE = 1232             # max bytes of a serialized transaction
+MAX_TRANSACTION_UNITS = 1_400_000   # compute units a single transaction may request
+LAMPORTS_PER_SIGNATURE = 5000
+DEFAULT_INSTRUCTION_UNITS = 200_000
+INSTRUCTION_UNITS = {
+    str(SYS_PROGRAM_ID): 150,
+    str(TOKEN_PROGRAM_ID): 6_200,
+}
+PLACEHOLDER_BLOCKHASH = "11111111111111111111111111111111"
+COMPUTE_BUDGET_SIZE = 52  # the ComputeBudget program key plus SetComputeUnitLimit/Price, prepended at signing
+
+PackedTransaction = namedtuple("PackedTransaction", ["transaction", "signers", "indices"])
+PackReport = namedtuple(
+    "PackReport",
+    ["instructions", "transactions", "naive_transactions", "signatures", "naive_signatures", "fees_saved_lamports"],
+)
+
+
+def transaction_size(instructions, fee_payer):
+    """Wire size in bytes of a transaction holding `instructions`, signatures included."""
+    transaction = Transaction(recent_blockhash=PLACEHOLDER_BLOCKHASH, fee_payer=fee_payer)
+    for instruction in instructions:
+        transaction.add(instruction)
+    message = transaction.compile_message()
+    signatures = message.header.num_required_signatures
+    return len(shortvec.encode_length(signatures)) + 64 * signatures + len(message.serialize())
+
+
+def instruction_units(instruction):
+    return INSTRUCTION_UNITS.get(str(instruction.program_id), DEFAULT_INSTRUCTION_UNITS)
+
+
+class TransactionPacker:
+    """Greedily groups instructions into as few transactions as the size and compute limits allow.
+
+    Items are `(instruction, signers)` pairs. `fee_payer` signs (and pays for) every packed transaction;
+    without one, the first signer of each transaction pays, so a multi-signer sweep needs no extra signature.
+    """
+
+    def __init__(self, fee_payer=None, max_size=PACKET_DATA_SIZE, max_units=MAX_TRANSACTION_UNITS,
+                 reserved_size=COMPUTE_BUDGET_SIZE):
+        self.fee_payer = fee_payer
+        self.max_size = max_size - reserved_size
+        self.max_units = max_units
+
+    def _fee_payer(self, batch):
+        return self.fee_payer or batch[0][1][0]
+
+    def _fits(self, batch):
+        instructions = [instruction for instruction, _ in batch]
+        if sum(instruction_units(instruction) for instruction in instructions) > self.max_units:
+            return False
+        return transaction_size(instructions, self._fee_payer(batch).public_key) <= self.max_size
+
+    def _build(self, batch, indices):
+        fee_payer = self._fee_payer(batch)
+        transaction = Transaction(fee_payer=fee_payer.public_key)
+        signers = {str(fee_payer.public_key): fee_payer}
+        for instruction, instruction_signers in batch:
+            transaction.add(instruction)
+            for signer in instruction_signers:
+                signers.setdefault(str(signer.public_key), signer)
+        # The fee payer has to sign first so signature order matches the compiled message
+        return PackedTransaction(transaction, list(signers.values()), indices)
+
+    def pack(self, items):
+        packed, batch, indices = [], [], []
+        for index, item in enumerate(items):
+            if batch and not self._fits(batch + [item]):
+                packed.append(self._build(batch, indices))
+                batch, indices = [], []
+            batch.append(item)
+            indices.append(index)
+        if batch:
+            packed.append(self._build(batch, indices))
+        return packed
+
+    def report(self, items, packed, priority_fee_lamports=0):
+        """Compare `packed` against sending every item as its own self-paid transaction.
+
+        `priority_fee_lamports` is what each packed transaction paid on top of its signatures, on average;
+        compute_budget.priority_fee_lamports reads it off a signed transaction.
+        """
+        naive_signatures = sum(len({str(signer.public_key) for signer in signers}) for _, signers in items)
+        signatures = sum(len(entry.signers) for entry in packed)
+        fees_saved = ((naive_signatures - signatures) * LAMPORTS_PER_SIGNATURE
+                      + (len(items) - len(packed)) * priority_fee_lamports)
+        return PackReport(len(items), len(packed), len(items), signatures, naive_signatures, fees_saved)
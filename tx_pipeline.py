@@ -0,0 +1,181 @@
+import base64
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import base58
+
+from instrumentation import log, span
+from rpc_codec import response_json
+from transport import RPC_URL, get_transport
+
+REFRESH_INTERVAL = 5.0    # seconds between background getLatestBlockhash calls
+BLOCKHASH_MAX_AGE = 45.0  # a blockhash lives ~150 blocks (60-90 s); stop handing it out well before that
+SEND_WORKERS = 8
+NEW_BLOCKHASH_WAIT = 2.0  # seconds a duplicate transaction waits for the next blockhash before failing
+SLOT_TIME = 0.4
+SIGNED_BLOCKHASHES = 4    # recent blockhashes whose signatures are remembered to catch duplicates
+
+
+def rpc_call(transport, url, method, params):
+    payload = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
+    response = transport.post(url, json=payload)
+    if response.status_code != 200:
+        raise Exception(f"Error: {response.status_code} - {response.text}")
+    body = response_json(response)
+    if "error" in body:
+        raise Exception(f"{method} failed: {body['error']}")
+    return body["result"]
+
+
+class BlockhashRefresher:
+    """Keeps a recent blockhash and its last valid block height ready so sends never wait on one."""
+
+    def __init__(self, rpc_url=RPC_URL, transport=None, interval=REFRESH_INTERVAL, max_age=BLOCKHASH_MAX_AGE,
+                 commitment="confirmed"):
+        self.rpc_url = rpc_url
+        self.transport = transport or get_transport()
+        self.interval = interval
+        self.max_age = max_age
+        self.commitment = commitment
+        self._current = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def fetch(self):
+        result = rpc_call(self.transport, self.rpc_url, "getLatestBlockhash", [{"commitment": self.commitment}])
+        value = result["value"]
+        self._current = (value["blockhash"], value["lastValidBlockHeight"], time.monotonic())
+        return self._current
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="blockhash-refresher", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.fetch()
+            except Exception as e:
+                log(f"Blockhash refresh failed: {e}")
+            self._stop.wait(self.interval)
+
+    def get(self):
+        """Return (blockhash, last_valid_block_height), only hitting the network if nothing fresh is cached."""
+        self.start()
+        current = self._current
+        if current is None or time.monotonic() - current[2] > self.max_age:
+            current = self.fetch()
+        return current[0], current[1]
+
+
+class TxPipeline:
+    """Signs transactions against the prefetched blockhash and sends them from a worker pool.
+
+    `send` returns the signature straight away (it is known once signed) together with a future for
+    the RPC's acknowledgement; confirmation is tracked separately via `in_flight`. A transaction that
+    does not set its own compute budget gets one sized by `compute_budget` just before signing.
+
+    Two identical transactions signed against one blockhash are one transaction to the chain, so a
+    signature already handed out for the current blockhash makes `sign` wait for the next blockhash
+    (up to NEW_BLOCKHASH_WAIT) instead of quietly returning the same signature twice.
+    """
+
+    def __init__(self, rpc_url=RPC_URL, transport=None, refresher=None, workers=SEND_WORKERS, skip_preflight=False,
+                 compute_budget=None):
+        from compute_budget import ComputeBudget
+        self.rpc_url = rpc_url
+        self.transport = transport or get_transport()
+        self.refresher = refresher or BlockhashRefresher(rpc_url, self.transport)
+        self.compute_budget = compute_budget or ComputeBudget(rpc_url, self.transport)
+        self.skip_preflight = skip_preflight
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="tx-send")
+        self.in_flight = {}
+        self._in_flight_lock = threading.Lock()
+        self._signed = OrderedDict()  # blockhash -> signatures signed against it
+        self._signed_lock = threading.Lock()
+
+    def sign(self, transaction, *signers):
+        self.compute_budget.apply(transaction)
+        with span("sign"):
+            blockhash, last_valid_block_height = self.refresher.get()
+            while True:
+                transaction.recent_blockhash = blockhash
+                transaction.sign(*signers)
+                signature = base58.b58encode(transaction.signature()).decode()
+                if self._claim(blockhash, signature):
+                    return transaction.serialize(), signature, last_valid_block_height
+                blockhash, last_valid_block_height = self._next_blockhash(blockhash, signature)
+
+    def _claim(self, blockhash, signature):
+        """Remember `signature` for `blockhash`; False if an identical transaction was already signed."""
+        with self._signed_lock:
+            signatures = self._signed.get(blockhash)
+            if signatures is None:
+                signatures = self._signed[blockhash] = set()
+                while len(self._signed) > SIGNED_BLOCKHASHES:
+                    self._signed.popitem(last=False)
+            if signature in signatures:
+                return False
+            signatures.add(signature)
+            return True
+
+    def _next_blockhash(self, stale, signature):
+        deadline = time.monotonic() + NEW_BLOCKHASH_WAIT
+        while True:
+            blockhash, last_valid_block_height, _ = self.refresher.fetch()
+            if blockhash != stale:
+                return blockhash, last_valid_block_height
+            if time.monotonic() > deadline:
+                raise Exception(f"Duplicate transaction {signature}: an identical one was already signed against "
+                                f"blockhash {stale} and no newer blockhash arrived")
+            time.sleep(SLOT_TIME)
+
+    def send_raw(self, raw_transaction):
+        options = {"encoding": "base64", "skipPreflight": self.skip_preflight, "preflightCommitment": "confirmed"}
+        encoded = base64.b64encode(raw_transaction).decode()
+        with span("send"):
+            return rpc_call(self.transport, self.rpc_url, "sendTransaction", [encoded, options])
+
+    def send(self, transaction, *signers):
+        """Sign now, send in the background; returns (signature, future of the RPC acknowledgement)."""
+        return self.send_signed(*self.sign(transaction, *signers))
+
+    def send_signed(self, raw_transaction, signature, last_valid_block_height, in_flight=True):
+        """Send what `sign` returned, e.g. once the signature has been journaled.
+
+        With `in_flight=False` the caller tracks the confirmation itself and take_in_flight never sees it.
+        """
+        if in_flight:
+            with self._in_flight_lock:
+                self.in_flight[signature] = last_valid_block_height
+        sent = self.executor.submit(self.send_raw, raw_transaction)
+        self.compute_budget.watch(raw_transaction, sent)
+        return signature, sent
+
+    def take_in_flight(self):
+        """Hand the signatures sent so far (with their last valid block heights) to a confirmation tracker."""
+        with self._in_flight_lock:
+            in_flight, self.in_flight = self.in_flight, {}
+        return in_flight
+
+    def send_and_wait(self, transaction, *signers):
+        signature, sent = self.send(transaction, *signers)
+        with span("send_wait"):
+            sent.result()
+        return signature
+
+    def close(self):
+        self.refresher.stop()
+        self.compute_budget.close()
+        self.executor.shutdown(wait=True)
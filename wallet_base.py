@@ -0,0 +1,159 @@
+from functools import cached_property
+from dotenv import load_dotenv
+from instrumentation import log
+from journal import JOURNAL_FILE
+from keystore import KEYSTORE_FILE, open_key_source
+from mint_cache import MINT_CACHE_FILE, MintCache
+from rpc_router import make_router
+from transport import RPC_URL, get_transport, make_client
+
+
+class WalletManagerBase:
+    """What every WalletManager shares: keys, the routed transport, and the clients, engines and caches wired from it.
+
+    helper, tester2 and wallet_manager each add their own operations on top.
+    """
+
+    def __init__(self, env_file='wallet_keys.env', transport=None, mint_cache_path=MINT_CACHE_FILE,
+                 keystore_path=KEYSTORE_FILE, journal_path=JOURNAL_FILE):
+        load_dotenv(env_file)
+        self.transport = make_router(transport or get_transport())
+        self.rpc_url = RPC_URL
+        self.mint_cache_path = mint_cache_path
+        self.journal_path = journal_path
+        self.key_source = open_key_source(env_file, keystore_path)
+        self.keys = self.key_source.private_keys()
+        self.public_keys = self.key_source.public_keys()
+        self.portfolio = None
+
+    # Clients, engines and caches are built on first use: a one-shot command only pays for what it touches
+    @cached_property
+    def registry(self):
+        from key_registry import get_registry
+        return get_registry()
+
+    @cached_property
+    def batch_rpc(self):
+        from rpc_batch import BatchRpc
+        return BatchRpc(self.rpc_url, self.transport, mint_cache=self.mint_cache)
+
+    @cached_property
+    def mint_cache(self):
+        return MintCache(self.mint_cache_path)
+
+    @cached_property
+    def journal(self):
+        from journal import Journal
+        return Journal(self.journal_path)
+
+    @cached_property
+    def client(self):
+        return make_client(self.rpc_url, self.transport)
+
+    @cached_property
+    def fee_estimator(self):
+        from priority_fees import PriorityFeeEstimator
+        estimator = PriorityFeeEstimator(self.batch_rpc)
+        estimator.start()  # sampling overlaps with building the rest, so the first trade rarely waits
+        return estimator
+
+    @cached_property
+    def pipeline(self):
+        from batch_sell import SELL_CONCURRENCY
+        from compute_budget import ComputeBudget
+        from tx_pipeline import TxPipeline
+        compute_budget = ComputeBudget(self.rpc_url, self.transport, self.fee_estimator)
+        # As many send workers as a batch sell keeps in flight, so its concurrency limit is the real one
+        return TxPipeline(self.rpc_url, self.transport, workers=SELL_CONCURRENCY, compute_budget=compute_budget)
+
+    @cached_property
+    def confirmations(self):
+        from confirmation_tracker import ConfirmationTracker
+        from solana.rpc.commitment import Confirmed
+        return ConfirmationTracker(self.rpc_url, self.transport, commitment=Confirmed)
+
+    @cached_property
+    def quote_engine(self):
+        from quote_engine import QuoteEngine
+        return QuoteEngine(self.rpc_url, transport=self.transport)
+
+    @cached_property
+    def trade_engine(self):
+        from trade_engine import TradeEngine
+        return TradeEngine(self.pipeline, self.rpc_url, self.transport, self.registry, self.quote_engine,
+                           self.fee_estimator)
+
+    @cached_property
+    def seller(self):
+        from batch_sell import BatchSeller
+        return BatchSeller(self.trade_engine, self.batch_rpc, self.keys, self.public_keys)
+
+    def fetch_mint_info(self, mint_address):
+        from solana.publickey import PublicKey
+        mint_pubkey = PublicKey(mint_address)
+        mint_info = self.client.get_token_supply(mint_pubkey)
+        if 'result' in mint_info:
+            value = mint_info['result']['value']
+            return value['decimals'], int(value['amount'])
+        else:
+            raise Exception(f"Failed to get mint decimals for {mint_address}")
+
+    def get_mint_decimals(self, mint_address):
+        return self.mint_cache.get_decimals(mint_address, self.fetch_mint_info)
+
+    def get_mint_supply(self, mint_address):
+        return self.mint_cache.get_supply(mint_address, self.fetch_mint_info)
+
+    def send_transaction(self, transaction, *signers):
+        # Signed against the prefetched blockhash, so no getRecentBlockhash round trip per send
+        try:
+            signature = self.pipeline.send_and_wait(transaction, *signers)
+        except Exception as e:
+            log(f"Transaction failed: {e}")
+            return None
+        log(f"Transaction successful: {signature}")
+        return signature
+
+    def confirm_sent_transactions(self, timeout=60):
+        """Wait until everything sent so far reaches Confirmed; one batched status poll covers all of them."""
+        from concurrent.futures import wait
+        futures = self.confirmations.track_pipeline(self.pipeline)
+        if "journal" in self.__dict__:
+            # Journaled sends are tracked by the journal itself, never twice over the pipeline
+            futures.update(self.journal.take_tracked())
+        wait(futures.values(), timeout=timeout)
+        results = {}
+        for signature, future in futures.items():
+            if future.done() and future.exception() is None:
+                log(f"Confirmed: {signature}")
+                results[signature] = True
+            else:
+                error = future.exception() if future.done() else "timed out"
+                log(f"Not confirmed: {signature} - {error}")
+                results[signature] = False
+        return results
+
+    def token_transfer_instruction(self, from_pubkey, to_public_key, mint_address, amount, decimals=None):
+        from solana.publickey import PublicKey
+        from spl.token.constants import TOKEN_PROGRAM_ID
+        from spl.token.instructions import TransferCheckedParams, transfer_checked
+        from key_registry import get_associated_token_address
+        from rpc_codec import TokenAmount
+        mint_pubkey = PublicKey(mint_address)
+        # A TokenAmount carries the decimals from its balance read, so no getAccountInfo on the mint
+        if isinstance(amount, TokenAmount):
+            amount, decimals = amount
+        # Get the mint decimals unless the caller already knows them
+        if decimals is None:
+            decimals = self.get_mint_decimals(mint_address)
+        return transfer_checked(
+            TransferCheckedParams(
+                program_id=TOKEN_PROGRAM_ID,
+                source=get_associated_token_address(from_pubkey, mint_pubkey),
+                mint=mint_pubkey,
+                dest=get_associated_token_address(PublicKey(to_public_key), mint_pubkey),
+                owner=from_pubkey,
+                amount=amount,
+                decimals=decimals
+            )
+        )
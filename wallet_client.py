@@ -0,0 +1,138 @@
+import json
+import os
+import socket
+import threading
+from concurrent.futures import Future, TimeoutError
+
+DAEMON_SOCKET_ENV = "PUMFUN_SOCKET"
+DAEMON_SOCKET = os.getenv(DAEMON_SOCKET_ENV, "wallet_daemon.sock")
+
+
+class WalletClient:
+    """Thin client for wallet_daemon: one JSON line per request over a persistent Unix socket connection.
+
+    Imports nothing but the standard library, so a script using it starts in milliseconds and each call
+    runs against the daemon's warm keys, connection pools and caches. Safe to share between threads:
+    their requests are pipelined over the one connection, and a reader thread hands each response to
+    the call waiting on its id, so a slow trade does not hold up a balance read behind it.
+    """
+
+    def __init__(self, socket_path=DAEMON_SOCKET, timeout=60):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._sock = None
+        self._ids = 0
+        self._pending = {}  # request id -> Future of its response
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        sock.settimeout(None)  # the reader idles between requests; each call enforces its own timeout
+        self._sock = sock
+        threading.Thread(target=self._read, args=(sock,), daemon=True).start()
+
+    def _read(self, sock):
+        try:
+            with sock.makefile("rb") as responses:
+                for line in responses:
+                    response = json.loads(line)
+                    with self._lock:
+                        future = self._pending.pop(response.get("id"), None)
+                    if future is not None:
+                        future.set_result(response)
+        except (OSError, ValueError):
+            pass
+        # The connection is gone: fail whatever was still waiting on it, and reconnect on the next call
+        with self._lock:
+            if self._sock is sock:
+                self._disconnect()
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(Exception("Wallet daemon closed the connection"))
+
+    def call(self, method, **params):
+        future = Future()
+        with self._lock:
+            if self._sock is None:
+                self._connect()
+            self._ids += 1
+            request_id = self._ids
+            self._pending[request_id] = future
+            request = {"id": request_id, "method": method, "params": params}
+            try:
+                self._sock.sendall(json.dumps(request).encode() + b"\n")
+            except OSError:
+                self._pending.pop(request_id, None)
+                self._disconnect()
+                raise
+        try:
+            response = future.result(timeout=self.timeout)
+        except TimeoutError:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            raise Exception(f"{method} got no response within {self.timeout}s")
+        if "error" in response:
+            raise Exception(f"{method} failed: {response['error']}")
+        return response["result"]
+
+    def _disconnect(self):
+        if self._sock is not None:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)  # wakes the reader thread
+            except OSError:
+                pass
+            self._sock.close()
+            self._sock = None
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    # --- operations -------------------------------------------------------------------------
+
+    def ping(self):
+        return self.call("ping")
+
+    def get_quote(self, quote_type, mint, amount, slippage):
+        return self.call("quote", quote_type=quote_type, mint=mint, amount=amount, slippage=slippage)
+
+    def get_sol_balance(self, wallet):
+        return self.call("sol_balance", wallet=wallet)
+
+    def get_all_sol_balances(self):
+        return self.call("sol_balances")
+
+    def get_token_balance(self, wallet, mint_address):
+        return self.call("token_balance", wallet=wallet, mint=mint_address)
+
+    def transfer_sol(self, from_wallet, to_public_key, amount_sol):
+        return self.call("transfer_sol", from_wallet=from_wallet, to=to_public_key, amount_sol=amount_sol)
+
+    def transfer_tokens(self, from_wallet, to_public_key, mint_address, amount, decimals=None):
+        return self.call("transfer_tokens", from_wallet=from_wallet, to=to_public_key, mint=mint_address,
+                         amount=amount, decimals=decimals)
+
+    def top_up_bot_wallets(self, amount_sol):
+        return self.call("top_up", amount_sol=amount_sol)
+
+    def sweep_tokens(self, mint_address):
+        return self.call("sweep", mint=mint_address)
+
+    def perform_buy_trade(self, mint, amount_in_sol, slippage, priority_fee, wallet):
+        return self.call("buy", mint=mint, amount_sol=amount_in_sol, slippage=slippage, priority_fee=priority_fee,
+                         wallet=wallet)
+
+    def perform_sell_trade(self, wallet, mint_address, percentage, slippage, priority_fee=None):
+        return self.call("sell", wallet=wallet, mint=mint_address, percentage=percentage, slippage=slippage,
+                         priority_fee=priority_fee)
+
+    def metrics(self):
+        return self.call("metrics")
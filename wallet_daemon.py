@@ -0,0 +1,209 @@
+import asyncio
+import json
+import os
+import socket
+import stat
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import log, metrics
+from journal import JOURNAL_FILE
+from keystore import KEYSTORE_FILE
+from mint_cache import MINT_CACHE_FILE
+from rpc_codec import loads
+from wallet_client import DAEMON_SOCKET
+
+DAEMON_WORKERS = 32  # requests served at once; slow sends and sweeps never hold up quotes or balances
+SHARED = ("registry", "batch_rpc", "fee_estimator", "mint_cache", "journal", "client", "pipeline", "confirmations")
+WARM = ("quote_engine", "fee_estimator", "trade_engine", "seller")
+
+
+class WalletDaemon:
+    """Keeps a WalletManager warm behind a Unix socket for wallet_client.WalletClient.
+
+    Keys, connection pools, the blockhash refresher, bonding-curve and mint caches and (optionally) the
+    live portfolio outlive any one script. Each request line is dispatched to a worker thread as soon as
+    it arrives, so a connection can have many requests in flight and responses come back by id.
+    """
+
+    def __init__(self, env_file='wallet_keys.env', socket_path=DAEMON_SOCKET, workers=DAEMON_WORKERS,
+                 mint_cache_path=MINT_CACHE_FILE, keystore_path=KEYSTORE_FILE, journal_path=JOURNAL_FILE, watch=()):
+        import tester2
+        import wallet_manager
+        self.socket_path = socket_path
+        self.trader = tester2.WalletManager(env_file, mint_cache_path=mint_cache_path, keystore_path=keystore_path,
+                                            journal_path=journal_path)
+        # The sweep lives on wallet_manager's manager; it shares the trader's router, pools and caches
+        self.sweeper = wallet_manager.WalletManager(env_file, self.trader.transport, mint_cache_path=mint_cache_path,
+                                                    keystore_path=keystore_path, journal_path=journal_path)
+        for name in SHARED:
+            setattr(self.sweeper, name, getattr(self.trader, name))
+        self.watch = list(watch)
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="wallet-daemon")
+        self.methods = {
+            "ping": self.ping,
+            "quote": self.quote,
+            "sol_balance": self.sol_balance,
+            "sol_balances": self.sol_balances,
+            "token_balance": self.token_balance,
+            "transfer_sol": self.transfer_sol,
+            "transfer_tokens": self.transfer_tokens,
+            "top_up": self.top_up,
+            "sweep": self.sweep,
+            "buy": self.buy,
+            "sell": self.sell,
+            "metrics": self.metrics,
+        }
+        self._server = None
+
+    def warm(self):
+        """Open the pools and caches up front so the first request is as fast as the rest."""
+        for name in WARM:
+            getattr(self.trader, name)
+        self.trader.pipeline.refresher.fetch()
+        self.trader.pipeline.refresher.start()
+        self.trader.fee_estimator.start()
+        if self.watch:
+            # Subscribes the watched mints' curves as well as the fleet's balances
+            self.trader.watch_portfolio(self.watch)
+            self.sweeper.portfolio = self.trader.portfolio
+
+    def _call(self, method, params):
+        try:
+            return method(**params)
+        finally:
+            confirmations = {}
+            if "pipeline" in self.trader.__dict__:
+                # Hand whatever the call sent to the shared tracker so the pipeline's in-flight map stays bounded
+                confirmations.update(self.trader.confirmations.track_pipeline(self.trader.pipeline))
+            if "journal" in self.trader.__dict__:
+                confirmations.update(self.trader.journal.take_tracked())  # the journal records these outcomes too
+            for signature, future in confirmations.items():
+                future.add_done_callback(lambda future, signature=signature: self._report(signature, future))
+
+    def _report(self, signature, future):
+        # The client already has its signature back, so a transaction that fails afterwards can only be logged
+        if future.exception() is not None:
+            log(f"Not confirmed: {signature} - {future.exception()}")
+
+    def _private_key(self, wallet):
+        return self.trader.keys[self.trader.seller.resolve(wallet)]
+
+    # --- operations -------------------------------------------------------------------------
+
+    def ping(self):
+        return "pong"
+
+    def quote(self, quote_type, mint, amount, slippage):
+        return self.trader.get_quote(quote_type, mint, amount, slippage)
+
+    def sol_balance(self, wallet):
+        return self.trader.get_sol_balance(str(self.trader.public_keys[self.trader.seller.resolve(wallet)]))
+
+    def sol_balances(self):
+        return self.trader.get_all_sol_balances()
+
+    def token_balance(self, wallet, mint):
+        return self.trader.get_token_balance(str(self.trader.public_keys[self.trader.seller.resolve(wallet)]), mint)
+
+    def transfer_sol(self, from_wallet, to, amount_sol):
+        return self.trader.transfer_sol(self._private_key(from_wallet), to, amount_sol)
+
+    def transfer_tokens(self, from_wallet, to, mint, amount, decimals=None):
+        return self.trader.transfer_tokens(self._private_key(from_wallet), to, mint, amount, decimals)
+
+    def top_up(self, amount_sol):
+        asyncio.run(self.trader.top_up_bot_wallets(amount_sol))
+        return True
+
+    def sweep(self, mint):
+        self.sweeper.transfer_all_tokens_back_to_head_huncho(mint)
+        return True
+
+    def buy(self, mint, amount_sol, slippage, priority_fee, wallet):
+        return self.trader.perform_buy_trade(mint, amount_sol, slippage, priority_fee, self._private_key(wallet))
+
+    def sell(self, wallet, mint, percentage, slippage, priority_fee=None):
+        return self.trader.perform_sell_trade(wallet, mint, percentage, slippage, priority_fee)
+
+    def metrics(self):
+        return metrics.summary()
+
+    # --- socket server ----------------------------------------------------------------------
+
+    def _claim_socket(self):
+        if not os.path.exists(self.socket_path):
+            return
+        if not stat.S_ISSOCK(os.stat(self.socket_path).st_mode):
+            raise Exception(f"{self.socket_path} exists and is not a socket")
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except ConnectionRefusedError:
+            os.unlink(self.socket_path)  # left behind by a daemon that did not shut down cleanly
+            return
+        finally:
+            probe.close()
+        raise Exception(f"A wallet daemon is already listening on {self.socket_path}")
+
+    async def _dispatch(self, line, writer):
+        request_id = None
+        try:
+            request = loads(line)
+            request_id = request.get("id")
+            method = self.methods.get(request.get("method"))
+            if method is None:
+                raise Exception(f"Unknown method {request.get('method')!r}")
+            params = request.get("params") or {}
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, self._call, method, params)
+            response = {"id": request_id, "result": result}
+        except Exception as e:
+            response = {"id": request_id, "error": f"{type(e).__name__}: {e}"}
+        writer.write(json.dumps(response, default=str).encode() + b"\n")
+        await writer.drain()
+
+    async def _handle_connection(self, reader, writer):
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(self._dispatch(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        self._claim_socket()
+        self._server = await asyncio.start_unix_server(self._handle_connection, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)  # the socket can move funds, so only our user may connect
+        log(f"Wallet daemon listening on {self.socket_path}")
+        async with self._server:
+            await self._server.serve_forever()
+
+    def run(self):
+        self.warm()
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.trader.pipeline.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+if __name__ == "__main__":
+    # python wallet_daemon.py [socket_path] [mint_to_watch ...]
+    socket_path = sys.argv[1] if len(sys.argv) > 1 else DAEMON_SOCKET
+    WalletDaemon(socket_path=socket_path, watch=sys.argv[2:]).run()
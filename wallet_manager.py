@@ -1,156 +1,145 @@
-import os
-import base58
-import requests
-import time
-from solana.keypair import Keypair
-from solana.publickey import PublicKey
-from solana.rpc.api import Client
-from solana.transaction import Transaction
-from solana.system_program import transfer, TransferParams
-from spl.token.constants import TOKEN_PROGRAM_ID, ASSOCIATED_TOKEN_PROGRAM_ID
-from spl.token.instructions import transfer_checked, TransferCheckedParams
-from dotenv import load_dotenv
-import asyncio
+from instrumentation import log
+from wallet_base import WalletManagerBase
 
-def get_associated_token_address(wallet_address, token_mint_address):
-    """Get the associated token address for a wallet and mint."""
-    return PublicKey.find_program_address(
-        [bytes(wallet_address), bytes(TOKEN_PROGRAM_ID), bytes(token_mint_address)],
-        ASSOCIATED_TOKEN_PROGRAM_ID,
-    )[0]
-
-class WalletManager:
-    def __init__(self, env_file='wallet_keys.env'):
-        load_dotenv(env_file)
-        self.keys = {
-            'HEAD_HUNCHO_PRIVATE_KEY': os.getenv('HEAD_HUNCHO_PRIVATE_KEY'),
-            'PRIVATE_KEY2': os.getenv('PRIVATE_KEY2'),
-            'PRIVATE_KEY3': os.getenv('PRIVATE_KEY3'),
-            'PRIVATE_KEY4': os.getenv('PRIVATE_KEY4'),
-            'PRIVATE_KEY5': os.getenv('PRIVATE_KEY5'),
-            'PRIVATE_KEY6': os.getenv('PRIVATE_KEY6'),
-            'PRIVATE_KEY7': os.getenv('PRIVATE_KEY7'),
-            'PRIVATE_KEY8': os.getenv('PRIVATE_KEY8'),
-        }
-        self.public_keys = {name: self.get_public_key_from_private(pk) for name, pk in self.keys.items()}
-        self.client = Client("https://api.mainnet-beta.solana.com")
 
+class WalletManager(WalletManagerBase):
     def get_public_key_from_private(self, private_key_str):
-        private_key_bytes = base58.b58decode(private_key_str)
-        keypair = Keypair.from_secret_key(private_key_bytes)
-        return keypair.public_key
+        return self.registry.public_key(private_key_str)
 
     def get_sol_balance(self, public_key):
         response = self.client.get_balance(public_key)
         if response['result']:
             sol_balance = response['result']['value'] / 1e9  # Convert lamports to SOL
-            print(f"SOL Balance for {public_key}: {sol_balance} SOL")
+            log(f"SOL Balance for {public_key}: {sol_balance} SOL")
             return sol_balance
         else:
-            print(f"Error retrieving balance for {public_key}")
+            log(f"Error retrieving balance for {public_key}")
             return None
 
     def get_all_sol_balances(self):
-        return {name: self.get_sol_balance(pk) for name, pk in self.public_keys.items()}
+        names = list(self.public_keys)
+        if self.portfolio is not None and self.portfolio.live():
+            lamports = [self.portfolio.lamports[self.portfolio.rows[name]] for name in names]
+        else:
+            lamports = self.batch_rpc.get_balances(self.public_keys[name] for name in names)
+        balances = {}
+        for name, value in zip(names, lamports):
+            public_key = self.public_keys[name]
+            if value is None:
+                log(f"Error retrieving balance for {public_key}")
+                balances[name] = None
+            else:
+                balances[name] = value / 1e9  # Convert lamports to SOL
+                log(f"SOL Balance for {public_key}: {balances[name]} SOL")
+        return balances
 
-    def get_token_balance(self, wallet_address, mint_address):
-        url = "https://api.mainnet-beta.solana.com"
-        headers = {"Content-Type": "application/json"}
-        payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "getTokenAccountsByOwner",
-            "params": [
-                wallet_address,
-                {"mint": mint_address},
-                {"encoding": "jsonParsed"}
-            ]
-        }
+    def fleet_snapshot(self, mint_address=None):
+        return self.batch_rpc.fleet_snapshot(self.public_keys, mint_address)
 
-        response = requests.post(url, json=payload, headers=headers)
-        if response.status_code == 200:
-            try:
-                result = response.json()["result"]["value"]
-                if result:
-                    token_balance = result[0]["account"]["data"]["parsed"]["info"]["tokenAmount"]["uiAmount"]
-                    print(f"Token Balance: {token_balance} tokens")
-                    return token_balance
-                else:
-                    print("No token accounts found for the given mint address.")
-                    return None
-            except (IndexError, KeyError) as e:
-                print(f"Error extracting token balance: {e}")
-                return None
+    def watch_portfolio(self, mint_addresses=()):
+        """Start the live fleet portfolio; balance reads below are then served from it without RPC."""
+        from portfolio import Portfolio
+        if self.portfolio is None:
+            self.portfolio = Portfolio(self.public_keys, mint_addresses, self.rpc_url, transport=self.transport,
+                                       batch_rpc=self.batch_rpc, registry=self.registry)
+            self.portfolio.start()
         else:
-            print(f"Error: {response.status_code} - {response.text}")
-            return None
+            for mint_address in mint_addresses:
+                self.portfolio.add_mint(mint_address)
+        return self.portfolio
 
-    def get_mint_decimals(self, mint_address):
-        mint_pubkey = PublicKey(mint_address)
-        mint_info = self.client.get_token_supply(mint_pubkey)
-        if 'result' in mint_info:
-            return mint_info['result']['value']['decimals']
+    def get_token_amount(self, wallet_address, mint_address):
+        """Exact TokenAmount(amount, decimals) held by `wallet_address`; the decimals come with the balance read."""
+        if self.portfolio is not None and self.portfolio.tracks(wallet_address, mint_address):
+            token_amount = self.portfolio.token_amount(wallet_address, mint_address)
         else:
-            raise Exception(f"Failed to get mint decimals for {mint_address}")
+            # base64 + dataSlice: the exact u64 amount instead of a jsonParsed float
+            token_amount = self.batch_rpc.get_token_amounts([wallet_address], mint_address)[0]
+        if token_amount is None:
+            log("No token accounts found for the given mint address.")
+            return None
+        log(f"Token Balance: {token_amount.ui_amount} tokens")
+        return token_amount
 
-    def transfer_tokens(self, from_private_key, to_public_key, mint_address, amount):
-        from_keypair = Keypair.from_secret_key(base58.b58decode(from_private_key))
-        from_pubkey = from_keypair.public_key
-        to_pubkey = PublicKey(to_public_key)
-        mint_pubkey = PublicKey(mint_address)
-        
-        # Get associated token accounts
-        from_token_account = get_associated_token_address(from_pubkey, mint_pubkey)
-        to_token_account = get_associated_token_address(to_pubkey, mint_pubkey)
-        
-        # Get the mint decimals
-        mint_decimals = self.get_mint_decimals(mint_address)
+    def get_token_balance(self, wallet_address, mint_address):
+        token_amount = self.get_token_amount(wallet_address, mint_address)
+        return None if token_amount is None else token_amount.ui_amount
 
+    def transfer_tokens(self, from_private_key, to_public_key, mint_address, amount, decimals=None):
+        from solana.transaction import Transaction
+        from_keypair = self.registry.keypair(from_private_key)
         transaction = Transaction()
-        transaction.add(
-            transfer_checked(
-                TransferCheckedParams(
-                    program_id=TOKEN_PROGRAM_ID,
-                    source=from_token_account,
-                    mint=mint_pubkey,
-                    dest=to_token_account,
-                    owner=from_pubkey,
-                    amount=amount,
-                    decimals=mint_decimals
-                )
-            )
-        )
+        transaction.add(self.token_transfer_instruction(from_keypair.public_key, to_public_key, mint_address, amount, decimals))
+        return self.send_transaction(transaction, from_keypair)
 
-        response = self.client.send_transaction(transaction, from_keypair)
-        if response.get('result'):
-            print(f"Transaction successful: {response['result']}")
-            return response['result']
+    def transfer_all_tokens_back_to_head_huncho(self, mint_address):
+        from journal import FAILED, PLANNED
+        from compute_budget import priority_fee_lamports
+        from tx_packer import TransactionPacker
+        head_huncho_public_key = self.public_keys['HEAD_HUNCHO_PRIVATE_KEY']
+        self.precompute_atas(mint_address)
+        # Journaled: a sweep that died halfway resumes its own run and only re-sends what never landed
+        run, steps = self.journal.open_run(f"sweep:{mint_address}", self.confirmations)
+        if steps:
+            names = [step.step for step in steps if step.state == PLANNED]
+            log(f"Resuming {run}: {len(names)} of {len(steps)} transfers left")
         else:
-            print(f"Transaction failed: {response}")
-            return None
+            names = [name for name in self.keys if name != 'HEAD_HUNCHO_PRIVATE_KEY']
+        # One batched request for every wallet still to sweep instead of a round trip per wallet
+        token_amounts = self.batch_rpc.get_token_amounts([self.public_keys[name] for name in names], mint_address)
+        holders = [(name, token_amount) for name, token_amount in zip(names, token_amounts)
+                   if token_amount and token_amount.amount > 0]
+        if steps:
+            emptied = [name for name, token_amount in zip(names, token_amounts)
+                       if not token_amount or not token_amount.amount]
+            if emptied:
+                self.journal.mark(run, emptied, FAILED, "no tokens left to transfer")
+        else:
+            self.journal.plan(run, [(name, {"amount": token_amount.amount, "decimals": token_amount.decimals})
+                                    for name, token_amount in holders])
+        # Packed multi-signer sweeps: several bots' transfers per transaction, the first bot pays the fee
+        items = []
+        for name, token_amount in holders:
+            from_keypair = self.registry.keypair(self.keys[name])
+            log(f"Transferring {token_amount.amount} atomic units from {self.public_keys[name]} to Head Huncho ({head_huncho_public_key})")
+            instruction = self.token_transfer_instruction(from_keypair.public_key, head_huncho_public_key, mint_address,
+                                                          token_amount)
+            items.append((instruction, [from_keypair]))
+        packer = TransactionPacker()
+        packed = packer.pack(items)
+        # Sign everything and journal the signatures in one commit before any of them is broadcast
+        signed = [self.pipeline.sign(entry.transaction, *entry.signers) for entry in packed]
+        self.journal.mark_sent(run, [(holders[index][0], signature, height)
+                                     for entry, (_, signature, height) in zip(packed, signed)
+                                     for index in entry.indices])
+        sends = [self.pipeline.send_signed(*signed_transaction, in_flight=False) for signed_transaction in signed]
+        for entry, (_, _, height), (signature, sent) in zip(packed, signed, sends):
+            try:
+                sent.result()
+                error = None
+            except Exception as e:
+                error = e
+            # Even a failed acknowledgement may have reached a leader; the chain decides the step's outcome
+            self.journal.track(run, [holders[index][0] for index in entry.indices], signature, height,
+                               self.confirmations)
+            for index in entry.indices:
+                name = holders[index][0]
+                public_key = self.public_keys[name]
+                if error is None:
+                    log(f"Transfer from {name} ({public_key}) to Head Huncho: Successful, Transaction ID: {signature}")
+                else:
+                    log(f"Error executing token transfer from {name} ({public_key}): {error}")
+        self.journal.finish_if_done(run)
+        # Signing prepended each transaction's compute budget, so the report prices what was actually paid
+        priority_fees = [priority_fee_lamports(entry.transaction) for entry in packed]
+        log(f"Packing: {packer.report(items, packed, sum(priority_fees) // max(len(priority_fees), 1))}")
 
-    def transfer_all_tokens_back_to_head_huncho(self, mint_address):
-        head_huncho_private_key = self.keys['HEAD_HUNCHO_PRIVATE_KEY']
-        head_huncho_public_key = self.get_public_key_from_private(head_huncho_private_key)
-        for name, private_key_str in self.keys.items():
-            if name != 'HEAD_HUNCHO_PRIVATE_KEY':
-                public_key = self.get_public_key_from_private(private_key_str)
-                balance_in_tokens = self.get_token_balance(str(public_key), mint_address)
-                if balance_in_tokens and balance_in_tokens > 0:
-                    mint_decimals = self.get_mint_decimals(mint_address)
-                    balance_in_atomic_units = int(balance_in_tokens * (10 ** mint_decimals))
-                    print(f"Transferring {balance_in_atomic_units} atomic units from {public_key} to Head Huncho ({head_huncho_public_key})")
-                    transfer_result = self.transfer_tokens(private_key_str, head_huncho_public_key, mint_address, balance_in_atomic_units)
-                    if transfer_result:
-                        print(f"Transfer from {name} ({public_key}) to Head Huncho: Successful, Transaction ID: {transfer_result}")
-                    else:
-                        print(f"Error executing token transfer from {name} ({public_key})")
-                # Add a delay to avoid rate limiting
-                time.sleep(5)
+    def precompute_atas(self, mint_address):
+        return self.registry.precompute_atas(self.public_keys.values(), mint_address)
 
     def print_public_keys(self):
         for name, public_key in self.public_keys.items():
-            print(f"{name}: {public_key}")
+            log(f"{name}: {public_key}")
 
 # Sample usage
 if __name__ == "__main__":
@@ -158,3 +147,4 @@ if __name__ == "__main__":
 
     mint_address = "DpbbGCQSxTrQc6jPAbSHzptnnr2FbowwJGWE3aevTbev"  # Replace with your mint address
     wallet_manager.transfer_all_tokens_back_to_head_huncho(mint_address)
+    wallet_manager.confirm_sent_transactions()